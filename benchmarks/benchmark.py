@@ -0,0 +1,343 @@
+"""
+Benchmarks of the public arvo functions at increasing input sizes.
+
+Each benchmark times a function on generated material of 10 to 100,000 notes, measures its peak
+memory with tracemalloc, and estimates how its running time scales with the input size (an
+exponent of 1 is linear, 2 quadratic). Larger sizes are skipped once a benchmark is predicted to
+exceed the time budget, as processes producing quadratic output quickly become impractical.
+
+Results are saved as JSON, and can be compared with the results of a previous run:
+
+    python benchmarks/benchmark.py --output after.json --compare before.json
+
+The script runs offline, from a checkout of the repository or with arvo installed.
+"""
+
+import argparse
+import datetime
+import gc
+import importlib.util  # music21 6 uses importlib.util without importing it
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
+
+import music21  # noqa: E402
+from music21 import scale  # noqa: E402
+from music21 import stream  # noqa: E402
+
+from arvo import isorhythm  # noqa: E402
+from arvo import minimalism  # noqa: E402
+from arvo import tintinnabuli  # noqa: E402
+from arvo import tools  # noqa: E402
+from arvo import transformations  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+QUARTER_LENGTHS = [0.25, 0.5, 1, 1.5]
+
+
+class Benchmark(NamedTuple):
+    """Function to benchmark.
+
+    Attributes:
+        name: The name of the benchmark.
+        setup: A function returning the arguments of the benchmarked function for an input size.
+          It is called before each run and is not timed.
+        function: The benchmarked function.
+    """
+
+    name: str
+    setup: Callable[[int], Sequence[Any]]
+    function: Callable[..., Any]
+
+
+def _pitches(size: int) -> List[int]:
+    generator = random.Random(size)
+    return [generator.randrange(48, 84) for _ in range(size)]
+
+
+def _quarter_lengths(size: int) -> List[float]:
+    generator = random.Random(-size)
+    return [generator.choice(QUARTER_LENGTHS) for _ in range(size)]
+
+
+def _stream(size: int) -> stream.Stream:
+    return isorhythm.create_isorhythm(_pitches(size), _quarter_lengths(size))
+
+
+def benchmarks() -> List[Benchmark]:
+    """Returns the benchmarks of the public arvo functions."""
+    cases = [
+        Benchmark(
+            "isorhythm.create_isorhythm",
+            lambda n: (_pitches(n), _quarter_lengths(n)),
+            isorhythm.create_isorhythm,
+        ),
+    ]
+    for process in ["additive_process", "subtractive_process"]:
+        for direction in minimalism.Direction:
+            cases.append(
+                Benchmark(
+                    f"minimalism.{process}[{direction.name}]",
+                    lambda n, direction=direction: (_stream(n), direction),
+                    getattr(minimalism, process),
+                )
+            )
+    for direction in [minimalism.Direction.FORWARD, minimalism.Direction.BACKWARD]:
+        cases.append(
+            Benchmark(
+                f"minimalism.scanning_process[{direction.name}]",
+                lambda n, direction=direction: (_stream(n), direction),
+                minimalism.scanning_process,
+            )
+        )
+    cases += [
+        Benchmark(
+            "transformations.scalar_transposition",
+            lambda n: (_stream(n), 3),
+            transformations.scalar_transposition,
+        ),
+        Benchmark(
+            "transformations.scalar_transposition[MajorScale]",
+            lambda n: (_stream(n), 3, scale.MajorScale("C")),
+            transformations.scalar_transposition,
+        ),
+        Benchmark(
+            "transformations.scalar_inversion",
+            lambda n: (_stream(n), "C4"),
+            transformations.scalar_inversion,
+        ),
+        Benchmark(
+            "transformations.retrograde",
+            lambda n: (_stream(n),),
+            transformations.retrograde,
+        ),
+        Benchmark(
+            "transformations.octave_shift",
+            lambda n: (_stream(n), 1),
+            transformations.octave_shift,
+        ),
+        Benchmark(
+            "tintinnabuli.create_t_voice",
+            lambda n: (_stream(n), ["A", "C", "E"]),
+            tintinnabuli.create_t_voice,
+        ),
+        Benchmark("tools.notes_to_stream", lambda n: (_pitches(n),), tools.notes_to_stream),
+        Benchmark(
+            "tools.durations_to_stream",
+            lambda n: (_quarter_lengths(n),),
+            tools.durations_to_stream,
+        ),
+        Benchmark(
+            "tools.convert_stream",
+            lambda n: (_stream(n), stream.Part),
+            tools.convert_stream,
+        ),
+        Benchmark(
+            "tools.merge_streams",
+            lambda n: (_stream(n), _stream(n)),
+            tools.merge_streams,
+        ),
+        Benchmark(
+            "tools.append_stream",
+            lambda n: (_stream(n), _stream(n)),
+            tools.append_stream,
+        ),
+        Benchmark("tools.note_index", lambda n: (_stream(n),), tools.note_index),
+        Benchmark(
+            "tools.ticks_per_quarter",
+            lambda n: (_quarter_lengths(n),),
+            tools.ticks_per_quarter,
+        ),
+        Benchmark("tools.bar", lambda n: (_stream(n), "4/4"), tools.bar),
+    ]
+    return cases
+
+
+def measure(benchmark: Benchmark, size: int, repeat: int) -> Dict[str, Any]:
+    """Times a benchmark and measures its peak memory at an input size.
+
+    Args:
+        benchmark: The benchmark to run.
+        size: The number of notes of the input.
+        repeat: The number of timed runs. The fastest run is kept.
+
+    Returns:
+        The result of the benchmark, with its time in seconds and peak memory in bytes.
+    """
+    times = []
+    for _ in range(repeat):
+        arguments = benchmark.setup(size)
+        gc.collect()
+        start = time.perf_counter()
+        benchmark.function(*arguments)
+        times.append(time.perf_counter() - start)
+
+    # Memory is measured in a separate run, as tracing allocations slows down the functions
+    arguments = benchmark.setup(size)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.function(*arguments)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"name": benchmark.name, "size": size, "seconds": min(times), "peak_bytes": peak}
+
+
+def scaling_exponent(results: Sequence[Dict[str, Any]]) -> Optional[float]:
+    """Estimates the exponent k of a running time growing as size ** k.
+
+    The exponent is the slope of the least-squares fit of log(time) against log(size). Results
+    under a millisecond are left out, as they mostly measure fixed costs.
+
+    Args:
+        results: The results of a benchmark at different sizes.
+
+    Returns:
+        The exponent, or None if fewer than two results can be used.
+    """
+    points = [
+        (math.log(result["size"]), math.log(result["seconds"]))
+        for result in results
+        if result["seconds"] >= 1e-3
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def run(
+    cases: Sequence[Benchmark], sizes: Sequence[int], repeat: int, budget: float
+) -> Dict[str, Any]:
+    """Runs benchmarks at increasing sizes.
+
+    Args:
+        cases: The benchmarks to run.
+        sizes: The input sizes, in increasing order.
+        repeat: The number of timed runs of each benchmark at each size.
+        budget: The time limit of a single run, in seconds. A size is skipped, along with the
+          following ones, when the run is predicted to take longer.
+
+    Returns:
+        The results of the benchmarks and information about the environment.
+    """
+    results = []
+    exponents = {}
+    skipped = {}
+    for benchmark in cases:
+        benchmark_results = []
+        for size in sizes:
+            if benchmark_results:
+                previous = benchmark_results[-1]
+                exponent = scaling_exponent(benchmark_results) or 1.0
+                predicted = previous["seconds"] * (size / previous["size"]) ** max(exponent, 1.0)
+                if predicted > budget:
+                    skipped[benchmark.name] = [s for s in sizes if s >= size]
+                    break
+            result = measure(benchmark, size, repeat)
+            benchmark_results.append(result)
+            print(
+                f"{benchmark.name:<55} {size:>7} notes {result['seconds']:>10.4f} s "
+                f"{result['peak_bytes'] / 2 ** 20:>9.1f} MiB",
+                flush=True,
+            )
+        results += benchmark_results
+        exponents[benchmark.name] = scaling_exponent(benchmark_results)
+    return {
+        "commit": _git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "music21": music21.VERSION_STR,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+        "exponents": exponents,
+        "skipped": skipped,
+    }
+
+
+def compare(current: Dict[str, Any], previous: Dict[str, Any]):
+    """Prints the ratios of the times of two runs.
+
+    Args:
+        current: The results of the current run.
+        previous: The results of the run to compare to.
+    """
+    previous_times = {
+        (result["name"], result["size"]): result["seconds"] for result in previous["results"]
+    }
+    print(f"\nCompared to {previous.get('commit') or 'previous run'} (ratio < 1 is faster):")
+    for result in current["results"]:
+        previous_time = previous_times.get((result["name"], result["size"]))
+        if previous_time:
+            ratio = result["seconds"] / previous_time
+            print(f"{result['name']:<55} {result['size']:>7} notes {ratio:>8.2f}x")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="input sizes, in notes"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size")
+    parser.add_argument(
+        "--budget", type=float, default=10.0, help="time limit of a single run, in seconds"
+    )
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--output", help="path of the JSON results")
+    parser.add_argument("--compare", help="path of the JSON results of a previous run")
+    arguments = parser.parse_args(argv)
+
+    cases = [benchmark for benchmark in benchmarks() if arguments.filter in benchmark.name]
+    report = run(cases, sorted(arguments.sizes), arguments.repeat, arguments.budget)
+
+    print("\nScaling exponents:")
+    for name, exponent in report["exponents"].items():
+        print(f"{name:<55} {'-' if exponent is None else f'{exponent:.2f}':>7}")
+    for name, sizes in report["skipped"].items():
+        print(f"Skipped {name} at {', '.join(map(str, sizes))} notes (over budget)")
+
+    output = arguments.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "results",
+        f"{report['commit'] or 'benchmark'}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            compare(report, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
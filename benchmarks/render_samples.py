@@ -0,0 +1,207 @@
+"""
+Headless rendering of the sample scores, timed by stage.
+
+Each sample in the samples directory is rebuilt with its build_score() function, without opening
+a score viewer, and written as MusicXML. The time spent in each stage is reported:
+
+    construction      building the streams with arvo and music21
+    transformations   scalar transpositions, inversions, retrogrades and t-voices
+    makeNotation      making measures, ties and beams, including music21's preparation of the
+                      score for export
+    MusicXML write    converting the prepared score to MusicXML and writing the file
+
+The written files are compared to the MusicXML files checked in with the samples, ignoring the
+encoding date and the randomly generated part ids, so that changes to the output of arvo are
+noticed. The script exits with status 1 if a file differs:
+
+    python benchmarks/render_samples.py --output-directory /tmp/samples
+"""
+
+import argparse
+import contextlib
+import glob
+import importlib.util  # music21 6 uses importlib.util without importing it
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import music21  # noqa: E402
+from music21.musicxml import m21ToXml  # noqa: E402
+
+SAMPLES_DIRECTORY = os.path.join(ROOT, "samples")
+STAGES = ["construction", "transformations", "makeNotation", "MusicXML write"]
+
+
+class Timer:
+    """Accumulated running times of named stages."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {name: 0.0 for name in STAGES}
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Context manager adding the time spent in its block to a stage.
+
+        Args:
+            name: The name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+
+def find_samples(directory: str = SAMPLES_DIRECTORY) -> List[str]:
+    """Returns the paths of the sample scripts, which have a MusicXML file of the same name."""
+    return [
+        path
+        for path in sorted(glob.glob(os.path.join(directory, "*", "*.py")))
+        if os.path.exists(path[: -len(".py")] + ".xml")
+    ]
+
+
+def load_sample(path: str):
+    """Imports a sample script as a module, without running its main block.
+
+    Args:
+        path: The path of the script.
+
+    Returns:
+        The module.
+    """
+    name = "sample_" + re.sub(r"\W", "_", os.path.splitext(os.path.basename(path))[0])
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def render(path: str, output: str) -> Dict[str, float]:
+    """Builds a sample score and writes it as MusicXML.
+
+    The export is split in the two steps of music21's Stream.write(): the preparation of the
+    score, which makes the notation of streams without measures, and the conversion to MusicXML.
+
+    Args:
+        path: The path of the sample script.
+        output: The path of the MusicXML file to write.
+
+    Returns:
+        The time spent in each stage, in seconds.
+    """
+    timer = Timer()
+    module = load_sample(path)
+    score = module.build_score(stage=timer.stage)
+    with timer.stage("makeNotation"):
+        exporter = m21ToXml.GeneralObjectExporter(score)
+        prepared = exporter.fromGeneralObject(score)
+    with timer.stage("MusicXML write"):
+        data = exporter.parseWellformedObject(prepared)
+        with open(output, "wb") as file:
+            file.write(data)
+    return timer.seconds
+
+
+def normalize(xml: str) -> List[str]:
+    """Returns the lines of a MusicXML document, without the parts that change with each write.
+
+    The encoding date is removed, and the part ids, which music21 generates randomly, are
+    renamed P1, P2... in order of appearance.
+    """
+    xml = re.sub(r"\s*<encoding-date>[^<]*</encoding-date>", "", xml)
+    part_ids: Dict[str, str] = {}
+
+    def rename(match: re.Match) -> str:
+        part_id = part_ids.setdefault(match.group(2), f"P{len(part_ids) + 1}")
+        return f'{match.group(1)}"{part_id}"'
+
+    xml = re.sub(r'(<(?:score-part|part) id=)"([^"]*)"', rename, xml)
+    return xml.splitlines()
+
+
+def compare(path: str, reference: str) -> Optional[Dict[str, Any]]:
+    """Compares a MusicXML file to a reference file.
+
+    Args:
+        path: The path of the file.
+        reference: The path of the reference file.
+
+    Returns:
+        None if the files are equivalent, otherwise the number of differing lines and the first
+        difference.
+    """
+    with open(path, encoding="utf-8") as file:
+        lines = normalize(file.read())
+    with open(reference, encoding="utf-8") as file:
+        reference_lines = normalize(file.read())
+    differences = [
+        index
+        for index in range(max(len(lines), len(reference_lines)))
+        if index >= len(lines)
+        or index >= len(reference_lines)
+        or lines[index] != reference_lines[index]
+    ]
+    if not differences:
+        return None
+    first = differences[0]
+    return {
+        "differing_lines": len(differences),
+        "line": first + 1,
+        "expected": reference_lines[first].strip() if first < len(reference_lines) else None,
+        "actual": lines[first].strip() if first < len(lines) else None,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--output-directory", help="directory of the written MusicXML files (default: temporary)"
+    )
+    parser.add_argument("--filter", default="", help="only render samples containing this text")
+    parser.add_argument("--json", help="path of a JSON report of the timings and differences")
+    arguments = parser.parse_args(argv)
+
+    output_directory = arguments.output_directory or tempfile.mkdtemp(prefix="arvo-samples-")
+    os.makedirs(output_directory, exist_ok=True)
+
+    report = {"music21": music21.VERSION_STR, "samples": []}
+    for path in find_samples():
+        name = os.path.splitext(os.path.basename(path))[0]
+        if arguments.filter not in name:
+            continue
+        output = os.path.join(output_directory, name + ".xml")
+        seconds = render(path, output)
+        difference = compare(output, path[: -len(".py")] + ".xml")
+        report["samples"].append(
+            {"name": name, "seconds": seconds, "output": output, "difference": difference}
+        )
+
+        print(f"{name}: {sum(seconds.values()):.2f} s")
+        for stage, stage_seconds in seconds.items():
+            print(f"    {stage:<16} {stage_seconds:>8.3f} s")
+        if difference is None:
+            print("    output matches the checked-in MusicXML")
+        else:
+            print(
+                f"    output differs from the checked-in MusicXML on "
+                f"{difference['differing_lines']} lines, first on line {difference['line']}:\n"
+                f"        expected {difference['expected']}\n"
+                f"        actual   {difference['actual']}"
+            )
+
+    if arguments.json:
+        with open(arguments.json, "w") as file:
+            json.dump(report, file, indent=2)
+    return int(any(sample["difference"] is not None for sample in report["samples"]))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -19,6 +19,7 @@ of musical direction.
 
 """
 
+import contextlib
 import copy
 from music21 import meter
 from music21 import stream
@@ -51,30 +52,6 @@ t_chord = ["A", "C", "E"]
 # Define a list of quarter note offsets for adding left-hand pedal notes
 bar_offsets = [0, 7, 16, 27, 34, 43, 54]
 
-# Build core scale pattern
-scale_pattern = isorhythm.create_isorhythm(
-    reference_scale.getPitches("C#6", "G5") + reference_scale.getPitches("F6", "C#6"),
-    [2, 1, 1, 1, 1, 1, 1, 3],
-)
-
-# --------------------------------------------------------------------------------------------------
-# Build the core melody for one section
-# --------------------------------------------------------------------------------------------------
-# Create additive process
-core_melody = minimalism.additive_process(
-    scale_pattern, direction=minimalism.Direction.INWARD, iterations_start=2
-)
-
-# Add time signatures
-core_melody.insert(0, meter.TimeSignature("7/4"))
-core_melody.insert(7, meter.TimeSignature("9/4"))
-core_melody.insert(16, meter.TimeSignature("11/4"))
-
-# Append inverted version for the second half
-tools.append_stream(
-    core_melody, transformations.scalar_inversion(core_melody, "C#6", reference_scale)
-)
-
 
 # --------------------------------------------------------------------------------------------------
 # Define function to add two bars interlude (this uses only normal music21 elements)
@@ -110,108 +87,162 @@ def _left_hand_interlude():
     return lh_interlude
 
 
-# --------------------------------------------------------------------------------------------------
-# Build the piece
-# --------------------------------------------------------------------------------------------------
-# Create streams
-right_hand = stream.Part()
-left_hand = stream.Part()
-
-left_hand.clef = clef.TrebleClef()
-
-# Main Loop to build the nine sections
-for section_index in range(8):
-    # Right hand
-    # -----------------------------------------------------------------------------------------
-    # Create the m-voice
-    m_voice = transformations.scalar_transposition(
-        core_melody, section_index * -2, reference_scale
-    )
-
-    # Create the t-voice
-    t_voice = tintinnabuli.create_t_voice(
-        m_voice, t_chord, position=2, direction=tintinnabuli.Direction.DOWN
-    )
+def build_score(stage=None):
+    """Builds the score.
 
-    # Merge and append right hand streams
-    tools.append_stream(right_hand, tools.merge_streams(m_voice, t_voice).chordify())
+    Args:
+        stage: Optional; A function returning a context manager around each stage of the build,
+          given its name. It is used to time the stages (see benchmarks/render_samples.py).
 
-    # Append right hand interlude
-    tools.append_stream(right_hand, _right_hand_interlude())
-    if section_index < 6:
-        right_hand.append(clef.TrebleClef())  # Add treble clef except for last section
+    Returns:
+        The score.
+    """
+    if stage is None:
+        stage = lambda name: contextlib.nullcontext()
 
-    # Left hand
     # ----------------------------------------------------------------------------------------------
-    # Create the second m-voice
-    m_voice2 = transformations.scalar_transposition(m_voice, -9, reference_scale)
-
-    # Create the pedal
-    bottom_pedal = stream.Voice()
-    top_pedal = stream.Stream()
-
-    for i in range(6):
-        # Define notes to use depending on the section
-        if section_index in (0, 2):
-            bottom_pedal_note = chord.Chord(["A3", "E4"])
-        elif section_index in (1, 3):
-            bottom_pedal_note = note.Note("A3")
-            top_pedal_note = note.Note("E4")
-        elif 3 < section_index < 7:
-            bottom_pedal_note = note.Note("A2")
-            top_pedal_note = note.Note("E3")
-        else:
-            bottom_pedal_note = note.Note("A2")
-
-        # Insert bottom pedal note in separate lower voice
-        bottom_pedal.insert(bar_offsets[i], bottom_pedal_note)
-        bottom_pedal_note.duration = duration.Duration(
-            bar_offsets[i + 1] - bar_offsets[i]
+    # Build the core melody for one section
+    # ----------------------------------------------------------------------------------------------
+    with stage("construction"):
+        # Build core scale pattern
+        scale_pattern = isorhythm.create_isorhythm(
+            reference_scale.getPitches("C#6", "G5") + reference_scale.getPitches("F6", "C#6"),
+            [2, 1, 1, 1, 1, 1, 1, 3],
         )
 
-        # Insert top pedal note in m-voice chords
-        if section_index not in (0, 2, 7):
-            top_pedal_note2 = copy.deepcopy(top_pedal_note)
-            top_pedal.insert(bar_offsets[i], top_pedal_note)
-            top_pedal_note.duration = duration.Duration(2)
-            top_pedal.insert(bar_offsets[i + 1] - 3, top_pedal_note2)
-            top_pedal_note2.duration = duration.Duration(3)
-            m_voice2 = tools.merge_streams(m_voice2, top_pedal).chordify()
-
-    # Merge and append left hand streams
-    if section_index != 2:
-        lh = tools.merge_streams(
-            tools.convert_stream(m_voice2, stream.Voice), bottom_pedal
+        # Create additive process
+        core_melody = minimalism.additive_process(
+            scale_pattern, direction=minimalism.Direction.INWARD, iterations_start=2
         )
-        lh.makeMeasures(inPlace=True, finalBarline=None)
-    else:
-        lh = tools.merge_streams(m_voice2, bottom_pedal).chordify(addTies=False)
-        lh.makeMeasures(inPlace=True, finalBarline=None)
-    tools.append_stream(left_hand, lh)
-
-    # Append left hand interlude
-    if section_index < 3:
-        left_hand.append(clef.BassClef())
-    tools.append_stream(left_hand, _left_hand_interlude())
-    if section_index < 2:
-        left_hand.append(clef.TrebleClef())
 
-# --------------------------------------------------------------------------------------------------
-# Build final score
-# --------------------------------------------------------------------------------------------------
+        # Add time signatures
+        core_melody.insert(0, meter.TimeSignature("7/4"))
+        core_melody.insert(7, meter.TimeSignature("9/4"))
+        core_melody.insert(16, meter.TimeSignature("11/4"))
 
-right_hand.makeMeasures(inPlace=True)
-score = tools.merge_streams(right_hand, left_hand, stream_class=stream.Score)
-piano_staff_group = layout.StaffGroup(
-    [right_hand, left_hand], name="Piano", abbreviation="Pno.", symbol="brace"
-)
-score.insert(0, piano_staff_group)
-score.metadata = metadata.Metadata()
-score.metadata.title = "Fratres (Piano Part)"
-score.metadata.composer = "Arvo Pärt"
+    with stage("transformations"):
+        # Append inverted version for the second half
+        tools.append_stream(
+            core_melody, transformations.scalar_inversion(core_melody, "C#6", reference_scale)
+        )
 
-# --------------------------------------------------------------------------------------------------
-# Output xml file and show score in MuseScore
-# --------------------------------------------------------------------------------------------------
-score.write(fp="arvo_part_fratres.xml")
-score.show()
+    # ----------------------------------------------------------------------------------------------
+    # Build the piece
+    # ----------------------------------------------------------------------------------------------
+    with stage("construction"):
+        # Create streams
+        right_hand = stream.Part()
+        left_hand = stream.Part()
+
+        left_hand.clef = clef.TrebleClef()
+
+    # Main Loop to build the nine sections
+    for section_index in range(8):
+        # Right hand
+        # -----------------------------------------------------------------------------------------
+        with stage("transformations"):
+            # Create the m-voice
+            m_voice = transformations.scalar_transposition(
+                core_melody, section_index * -2, reference_scale
+            )
+
+            # Create the t-voice
+            t_voice = tintinnabuli.create_t_voice(
+                m_voice, t_chord, position=2, direction=tintinnabuli.Direction.DOWN
+            )
+
+        with stage("construction"):
+            # Merge and append right hand streams
+            tools.append_stream(right_hand, tools.merge_streams(m_voice, t_voice).chordify())
+
+        with stage("makeNotation"):
+            # Append right hand interlude
+            tools.append_stream(right_hand, _right_hand_interlude())
+            if section_index < 6:
+                right_hand.append(clef.TrebleClef())  # Add treble clef except for last section
+
+        # Left hand
+        # ------------------------------------------------------------------------------------------
+        with stage("transformations"):
+            # Create the second m-voice
+            m_voice2 = transformations.scalar_transposition(m_voice, -9, reference_scale)
+
+        with stage("construction"):
+            # Create the pedal
+            bottom_pedal = stream.Voice()
+            top_pedal = stream.Stream()
+
+            for i in range(6):
+                # Define notes to use depending on the section
+                if section_index in (0, 2):
+                    bottom_pedal_note = chord.Chord(["A3", "E4"])
+                elif section_index in (1, 3):
+                    bottom_pedal_note = note.Note("A3")
+                    top_pedal_note = note.Note("E4")
+                elif 3 < section_index < 7:
+                    bottom_pedal_note = note.Note("A2")
+                    top_pedal_note = note.Note("E3")
+                else:
+                    bottom_pedal_note = note.Note("A2")
+
+                # Insert bottom pedal note in separate lower voice
+                bottom_pedal.insert(bar_offsets[i], bottom_pedal_note)
+                bottom_pedal_note.duration = duration.Duration(
+                    bar_offsets[i + 1] - bar_offsets[i]
+                )
+
+                # Insert top pedal note in m-voice chords
+                if section_index not in (0, 2, 7):
+                    top_pedal_note2 = copy.deepcopy(top_pedal_note)
+                    top_pedal.insert(bar_offsets[i], top_pedal_note)
+                    top_pedal_note.duration = duration.Duration(2)
+                    top_pedal.insert(bar_offsets[i + 1] - 3, top_pedal_note2)
+                    top_pedal_note2.duration = duration.Duration(3)
+                    m_voice2 = tools.merge_streams(m_voice2, top_pedal).chordify()
+
+            # Merge left hand streams
+            if section_index != 2:
+                lh = tools.merge_streams(
+                    tools.convert_stream(m_voice2, stream.Voice), bottom_pedal
+                )
+            else:
+                lh = tools.merge_streams(m_voice2, bottom_pedal).chordify(addTies=False)
+
+        with stage("makeNotation"):
+            # Append left hand streams
+            lh.makeMeasures(inPlace=True, finalBarline=None)
+            tools.append_stream(left_hand, lh)
+
+            # Append left hand interlude
+            if section_index < 3:
+                left_hand.append(clef.BassClef())
+            tools.append_stream(left_hand, _left_hand_interlude())
+            if section_index < 2:
+                left_hand.append(clef.TrebleClef())
+
+    # ----------------------------------------------------------------------------------------------
+    # Build final score
+    # ----------------------------------------------------------------------------------------------
+    with stage("makeNotation"):
+        right_hand.makeMeasures(inPlace=True)
+
+    with stage("construction"):
+        score = tools.merge_streams(right_hand, left_hand, stream_class=stream.Score)
+        piano_staff_group = layout.StaffGroup(
+            [right_hand, left_hand], name="Piano", abbreviation="Pno.", symbol="brace"
+        )
+        score.insert(0, piano_staff_group)
+        score.metadata = metadata.Metadata()
+        score.metadata.title = "Fratres (Piano Part)"
+        score.metadata.composer = "Arvo Pärt"
+
+    return score
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------
+    # Output xml file and show score in MuseScore
+    # ----------------------------------------------------------------------------------------------
+    score = build_score()
+    score.write(fp="arvo_part_fratres.xml")
+    score.show()
@@ -13,6 +13,8 @@ output is 100% identical to the original score.
 
 """
 
+import contextlib
+
 from music21 import chord
 from music21 import clef
 from music21 import duration
@@ -122,81 +124,104 @@ cello_notes = ["C4", "E4", "D4", "F#4", "Bb3"]
 cello_durations = [2, 1.5, 2, 2, 0.5, 0.5, 1.5, 0.5, 0.5, 0.5, 0.5, 1.5, 0.5, 0.5, 2]
 
 
-# --------------------------------------------------------------------------------------------------
-# Create isorhythms
-# --------------------------------------------------------------------------------------------------
-
-piano_right_hand = isorhythm.create_isorhythm(
-    piano_right_hand_chords, piano_durations, length=167
-)
-piano_left_hand = isorhythm.create_isorhythm(
-    piano_left_hand_chords, piano_durations, length=167
-)
-cello = isorhythm.create_isorhythm(cello_notes, cello_durations, length=109)
-
-# --------------------------------------------------------------------------------------------------
-# Add time signatures, rests, clefs...
-# --------------------------------------------------------------------------------------------------
-
-piano_right_hand.insertAndShift(0, note.Rest(duration=duration.Duration(2)))
-piano_right_hand.insert(0, meter.TimeSignature("3/4"))
-piano_right_hand.insert(key.KeySignature(-2))
-piano_right_hand.notes[len(piano_right_hand.notes) - 1].duration = duration.Duration(
-    1.25
-)
-piano_right_hand.makeMeasures(inPlace=True)
-
-piano_left_hand.insertAndShift(0, note.Rest(duration=duration.Duration(2)))
-piano_left_hand.insert(key.KeySignature(-2))
-piano_left_hand.insert(0, meter.TimeSignature("3/4"))
-piano_left_hand.notes[len(piano_left_hand.notes) - 1].duration = duration.Duration(1.25)
-piano_left_hand.insert(0, clef.BassClef())
-for n in piano_left_hand.notes:
-    if n.pitches == chord.Chord(["F4", "G#4", "Bb4"]).pitches:
-        piano_left_hand.insert(n.offset, clef.TrebleClef())
-    if n.pitches == chord.Chord(["Ab3", "C#4"]).pitches:
-        piano_left_hand.insert(n.offset, clef.BassClef())
-piano_left_hand.makeMeasures(inPlace=True)
-
-cello.insertAndShift(0, note.Rest(duration=duration.Duration(5.5)))
-cello.insert(0, meter.TimeSignature("3/4"))
-cello.insert(key.KeySignature(-2))
-cello.insert(0, clef.TenorClef())
-cello.notes[len(cello.notes) - 1].duration = duration.Duration(2.5)  # Extend final note
-for n in cello.notes:
-    harmonicNote = note.Note()
-    harmonicNote.pitch.ps = n.pitch.ps + 5
-    harmonicNote.notehead = "diamond"
-    harmonicNote.noteheadFill = "no"
-    c = chord.Chord(notes=[n, harmonicNote], duration=n.duration)
-    cello.insert(n.offset, c)
-    cello.remove(n)
-cello.makeMeasures(inPlace=True)
-
-# --------------------------------------------------------------------------------------------------
-# Build final score
-# --------------------------------------------------------------------------------------------------
-
-piano_right_hand = tools.convert_stream(piano_right_hand, stream.Part)
-piano_left_hand = tools.convert_stream(piano_left_hand, stream.Part)
-cello = tools.convert_stream(cello, stream.Part)
-cello.partName = "Vc."
-score = tools.merge_streams(
-    cello, piano_right_hand, piano_left_hand, stream_class=stream.Score
-)
-piano_staff_group = layout.StaffGroup(
-    [piano_right_hand, piano_left_hand],
-    name="Piano",
-    abbreviation="Pno.",
-    symbol="brace",
-)
-score.insert(0, piano_staff_group)
-score.metadata = metadata.Metadata()
-score.metadata.title = "Liturgie de Cristal"
-score.metadata.composer = "Olivier Messiaen"
-
-# --------------------------------------------------------------------------------------------------
-# Output xml file and show score in MuseScore
-# --------------------------------------------------------------------------------------------------
-score.write(fp="olivier_messiaen_quatuor.xml")
-score.show()
+def build_score(stage=None):
+    """Builds the score.
+
+    Args:
+        stage: Optional; A function returning a context manager around each stage of the build,
+          given its name. It is used to time the stages (see benchmarks/render_samples.py).
+
+    Returns:
+        The score.
+    """
+    if stage is None:
+        stage = lambda name: contextlib.nullcontext()
+
+    # ----------------------------------------------------------------------------------------------
+    # Create isorhythms
+    # ----------------------------------------------------------------------------------------------
+    with stage("construction"):
+        piano_right_hand = isorhythm.create_isorhythm(
+            piano_right_hand_chords, piano_durations, length=167
+        )
+        piano_left_hand = isorhythm.create_isorhythm(
+            piano_left_hand_chords, piano_durations, length=167
+        )
+        cello = isorhythm.create_isorhythm(cello_notes, cello_durations, length=109)
+
+    # ----------------------------------------------------------------------------------------------
+    # Add time signatures, rests, clefs...
+    # ----------------------------------------------------------------------------------------------
+    with stage("construction"):
+        piano_right_hand.insertAndShift(0, note.Rest(duration=duration.Duration(2)))
+        piano_right_hand.insert(0, meter.TimeSignature("3/4"))
+        piano_right_hand.insert(key.KeySignature(-2))
+        piano_right_hand.notes[len(piano_right_hand.notes) - 1].duration = duration.Duration(
+            1.25
+        )
+    with stage("makeNotation"):
+        piano_right_hand.makeMeasures(inPlace=True)
+
+    with stage("construction"):
+        piano_left_hand.insertAndShift(0, note.Rest(duration=duration.Duration(2)))
+        piano_left_hand.insert(key.KeySignature(-2))
+        piano_left_hand.insert(0, meter.TimeSignature("3/4"))
+        piano_left_hand.notes[len(piano_left_hand.notes) - 1].duration = duration.Duration(1.25)
+        piano_left_hand.insert(0, clef.BassClef())
+        for n in piano_left_hand.notes:
+            if n.pitches == chord.Chord(["F4", "G#4", "Bb4"]).pitches:
+                piano_left_hand.insert(n.offset, clef.TrebleClef())
+            if n.pitches == chord.Chord(["Ab3", "C#4"]).pitches:
+                piano_left_hand.insert(n.offset, clef.BassClef())
+    with stage("makeNotation"):
+        piano_left_hand.makeMeasures(inPlace=True)
+
+    with stage("construction"):
+        cello.insertAndShift(0, note.Rest(duration=duration.Duration(5.5)))
+        cello.insert(0, meter.TimeSignature("3/4"))
+        cello.insert(key.KeySignature(-2))
+        cello.insert(0, clef.TenorClef())
+        cello.notes[len(cello.notes) - 1].duration = duration.Duration(2.5)  # Extend final note
+        for n in cello.notes:
+            harmonicNote = note.Note()
+            harmonicNote.pitch.ps = n.pitch.ps + 5
+            harmonicNote.notehead = "diamond"
+            harmonicNote.noteheadFill = "no"
+            c = chord.Chord(notes=[n, harmonicNote], duration=n.duration)
+            cello.insert(n.offset, c)
+            cello.remove(n)
+    with stage("makeNotation"):
+        cello.makeMeasures(inPlace=True)
+
+    # ----------------------------------------------------------------------------------------------
+    # Build final score
+    # ----------------------------------------------------------------------------------------------
+    with stage("construction"):
+        piano_right_hand = tools.convert_stream(piano_right_hand, stream.Part)
+        piano_left_hand = tools.convert_stream(piano_left_hand, stream.Part)
+        cello = tools.convert_stream(cello, stream.Part)
+        cello.partName = "Vc."
+        score = tools.merge_streams(
+            cello, piano_right_hand, piano_left_hand, stream_class=stream.Score
+        )
+        piano_staff_group = layout.StaffGroup(
+            [piano_right_hand, piano_left_hand],
+            name="Piano",
+            abbreviation="Pno.",
+            symbol="brace",
+        )
+        score.insert(0, piano_staff_group)
+        score.metadata = metadata.Metadata()
+        score.metadata.title = "Liturgie de Cristal"
+        score.metadata.composer = "Olivier Messiaen"
+
+    return score
+
+
+if __name__ == "__main__":
+    # ----------------------------------------------------------------------------------------------
+    # Output xml file and show score in MuseScore
+    # ----------------------------------------------------------------------------------------------
+    score = build_score()
+    score.write(fp="olivier_messiaen_quatuor.xml")
+    score.show()
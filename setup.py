@@ -11,5 +11,6 @@ setup(
     author='Georges Dimitrov',
     author_email='georges.dimitrov@gmail.com',
     description='Python library for procedural music composition',
-    install_requires=['music21']
+    python_requires='>=3.9',
+    install_requires=['music21', 'numpy']
 )
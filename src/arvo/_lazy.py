@@ -0,0 +1,50 @@
+"""
+Deferred module imports, used to keep importing arvo cheap.
+
+Importing any music21 submodule imports the whole music21 package, which dominates the start-up
+time of short-lived scripts. Arvo modules therefore bind their music21 dependencies through
+LazyModule proxies, which only perform the import the first time one of their attributes is
+accessed.
+"""
+
+import importlib
+import importlib.util  # music21 relies on importlib.util being loaded by someone else.
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the named module on first attribute access.
+
+    Once loaded, the attributes of the real module are copied on the proxy, so subsequent
+    accesses are plain attribute lookups.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+            self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def load(name: str) -> LazyModule:
+    """Returns a proxy for the named module, deferring its import until first use.
+
+    Args:
+        name: Absolute name of the module to import, for example "music21.stream".
+
+    Returns:
+        A LazyModule proxy for the module.
+    """
+    return LazyModule(name)
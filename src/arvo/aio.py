@@ -0,0 +1,144 @@
+"""
+Coroutine versions of the arvo generation functions, for asyncio applications.
+
+Generating a section can take seconds, which would block the event loop if done in a coroutine.
+The functions of this module take the same arguments as their counterparts in the other arvo
+modules, and run them in an executor:
+
+    section = await aio.additive_process(pattern, Direction.INWARD, progress=report)
+
+By default, the default executor of the event loop is used. Another executor can be set for all
+calls with set_executor(), or for one call with the executor argument.
+
+With thread executors, the processes of the minimalism module are cancelled at the end of their
+current iteration when the awaiting task is cancelled, and report their progress to an optional
+callback, which is called in the event loop with the number of completed iterations. Other
+functions can only be cancelled before they start. Process executors support neither.
+
+In threads, the functions run in a copy of the context of the awaiting task, so the caches set with
+cache.use() and the record() blocks of the instrument module apply to them as to direct calls.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Optional
+
+from arvo import isorhythm
+from arvo import minimalism
+from arvo import tintinnabuli
+from arvo import transformations
+
+
+__all__ = [
+    "set_executor",
+    "run",
+    "additive_process",
+    "subtractive_process",
+    "scanning_process",
+    "create_isorhythm",
+    "create_t_voice",
+    "scalar_transposition",
+    "scalar_inversion",
+    "retrograde",
+    "octave_shift",
+]
+
+_executor: Optional[concurrent.futures.Executor] = None
+
+
+def set_executor(executor: Optional[concurrent.futures.Executor]):
+    """Sets the executor running the functions of the module.
+
+    Args:
+        executor: The executor, or None to use the default executor of the event loop.
+    """
+    global _executor
+    _executor = executor
+
+
+async def run(
+    function: Callable[..., Any],
+    *args: Any,
+    executor: Optional[concurrent.futures.Executor] = None,
+    progress: Optional[Callable[[int], Any]] = None,
+    **kwargs: Any,
+) -> Any:
+    """Runs a generation function in an executor.
+
+    Args:
+        function: The function to run.
+        *args: The positional arguments of the function.
+        executor: Optional; The executor to use. By default, the executor set with set_executor()
+          is used.
+        progress: Optional; A function called in the event loop with the number of completed
+          iterations, for functions taking a progress argument.
+        **kwargs: The keyword arguments of the function.
+
+    Returns:
+        The result of the function.
+
+    Raises:
+        TypeError: If a progress callback is given for a function that doesn't report progress.
+        ValueError: If a progress callback is given with a process executor.
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = _executor
+    if "progress" in inspect.signature(function).parameters:
+        if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            if progress is not None:
+                raise ValueError("progress callbacks are not supported with process executors")
+        else:
+            cancelled = threading.Event()
+
+            def report(iteration: int):
+                # Called by the function in the executor thread at the end of each iteration
+                if cancelled.is_set():
+                    raise asyncio.CancelledError
+                if progress is not None:
+                    loop.call_soon_threadsafe(progress, iteration)
+
+            kwargs["progress"] = report
+            try:
+                return await _run_in_executor(loop, executor, function, args, kwargs)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+    elif progress is not None:
+        raise TypeError(f"{function.__qualname__}() does not report its progress")
+    return await _run_in_executor(loop, executor, function, args, kwargs)
+
+
+def _run_in_executor(loop, executor, function, args, kwargs) -> asyncio.Future:
+    # Runs the function in the executor. In threads, the function runs in a copy of the context of
+    # the caller, as with asyncio.to_thread(), so that cache.use() and instrument.record() apply.
+    call = functools.partial(function, *args, **kwargs)
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        return loop.run_in_executor(executor, call)
+    return loop.run_in_executor(executor, contextvars.copy_context().run, call)
+
+
+def _coroutine(function: Callable[..., Any]) -> Callable[..., Any]:
+    # Coroutine running a function with run(), with the name and documentation of the function.
+    @functools.wraps(function)
+    async def wrapper(*args, executor=None, progress=None, **kwargs):
+        return await run(function, *args, executor=executor, progress=progress, **kwargs)
+
+    return wrapper
+
+
+additive_process = _coroutine(minimalism.additive_process)
+subtractive_process = _coroutine(minimalism.subtractive_process)
+scanning_process = _coroutine(minimalism.scanning_process)
+create_isorhythm = _coroutine(isorhythm.create_isorhythm)
+create_t_voice = _coroutine(tintinnabuli.create_t_voice)
+scalar_transposition = _coroutine(transformations.scalar_transposition)
+scalar_inversion = _coroutine(transformations.scalar_inversion)
+retrograde = _coroutine(transformations.retrograde)
+octave_shift = _coroutine(transformations.octave_shift)
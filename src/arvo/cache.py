@@ -0,0 +1,345 @@
+"""
+Content-addressed on-disk cache for generated streams.
+
+The processes and transformations of arvo opt into the cache with the cached decorator. When a
+cache is in use, their results are stored on disk under a hash of the function, the arvo version,
+the notes of the input streams and the other parameters, so that regenerating a piece only
+recomputes the sections whose inputs changed:
+
+    with cache.use("build/cache"):
+        section_a = minimalism.additive_process(pattern_a)
+        ...
+
+Results are stored as event files (see arvo.io), which keep offsets and durations exact along
+with the spelling of the pitches and the ties. Only event tables and flat streams, parts and voices
+of plain notes, chords and rests are stored, and they are loaded with their class. Other results,
+such as notes with lyrics, articulations or velocities, are returned without being cached.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import enum
+import functools
+import hashlib
+import inspect
+import numbers
+import os
+import tempfile
+from typing import Any, Callable, Optional, Tuple, Type, Union
+
+import arvo
+from arvo import _lazy
+from arvo import distributions
+from arvo import io
+from arvo import tools
+
+numpy = _lazy.load("numpy")
+chord = _lazy.load("music21.chord")
+note = _lazy.load("music21.note")
+pitch = _lazy.load("music21.pitch")
+scale = _lazy.load("music21.scale")
+stream = _lazy.load("music21.stream")
+duration = _lazy.load("music21.duration")
+
+
+__all__ = ["Cache", "cached", "use", "active_cache", "key"]
+
+# Default size limit of a cache directory, in bytes.
+DEFAULT_MAX_SIZE = 1 << 30
+
+_FILE_SUFFIX = ".events"
+
+# Classes of the streams that can be stored, which are rebuilt with the same class
+_STREAM_CLASSES = ("Stream", "Part", "Voice")
+
+_active_cache = contextvars.ContextVar("arvo_cache", default=None)
+
+
+class Cache:
+    """Directory of cached streams, evicting the least recently used ones above a size limit.
+
+    Args:
+        directory: The directory where the streams are stored. It is created if needed.
+        max_size: Optional; The maximum total size of the cached files, in bytes. Default is
+          1 GiB.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key_: str) -> Optional[io.EventTable]:
+        """Returns the events stored under a key.
+
+        Args:
+            key_: The key of the events, as returned by key().
+
+        Returns:
+            The memory-mapped EventTable, or None if the key is not in the cache.
+        """
+        entry = self._lookup(key_)
+        return None if entry is None else entry[0]
+
+    def _lookup(self, key_: str) -> Optional[Tuple[io.EventTable, Type[stream.Stream]]]:
+        # Entries record the class of the stored stream in their name
+        for class_name in _STREAM_CLASSES:
+            path = self._path(key_, class_name)
+            try:
+                events = io.load_events(path)
+            except FileNotFoundError:
+                continue
+            # Reading marks the file as recently used
+            os.utime(path)
+            self.hits += 1
+            return events, getattr(stream, class_name)
+        self.misses += 1
+        return None
+
+    def put(self, key_: str, result: Union[stream.Stream, io.EventTable]) -> bool:
+        """Stores a result under a key, then evicts old entries if the cache is too large.
+
+        Args:
+            key_: The key of the result, as returned by key().
+            result: The stream or EventTable to store.
+
+        Returns:
+            True if the result was stored, False if it can't be stored without losing elements.
+        """
+        class_name = "Stream"
+        if not isinstance(result, io.EventTable):
+            if not _is_event_stream(result):
+                return False
+            class_name = type(result).__name__
+            result = io.EventTable.from_stream(result)
+        path = self._path(key_, class_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first, so concurrent readers never see partial files.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(file_descriptor)
+        io.save_events(result, temporary_path)
+        os.replace(temporary_path, path)
+        self.evict()
+        return True
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache fits in its size limit."""
+        entries = []
+        total_size = 0
+        for directory_entry in os.scandir(self.directory):
+            if not directory_entry.is_dir():
+                continue
+            for file_entry in os.scandir(directory_entry.path):
+                if file_entry.name.endswith(_FILE_SUFFIX):
+                    stat = file_entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, file_entry.path))
+                    total_size += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total_size -= size
+
+    def clear(self):
+        """Deletes all entries of the cache."""
+        max_size, self.max_size = self.max_size, -1
+        self.evict()
+        self.max_size = max_size
+
+    def _path(self, key_: str, class_name: str = "Stream") -> str:
+        name = key_ if class_name == "Stream" else f"{key_}.{class_name}"
+        return os.path.join(self.directory, key_[:2], name + _FILE_SUFFIX)
+
+
+@contextlib.contextmanager
+def use(cache: Union[Cache, str, os.PathLike], max_size: int = DEFAULT_MAX_SIZE):
+    """Context manager enabling a cache for the cached functions called within it.
+
+    Args:
+        cache: A Cache, or the directory of the cache to use.
+        max_size: Optional; The maximum size of the cache in bytes, when a directory is given.
+          Default is 1 GiB.
+
+    Yields:
+        The Cache in use.
+    """
+    if not isinstance(cache, Cache):
+        cache = Cache(cache, max_size)
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def active_cache() -> Optional[Cache]:
+    """Returns the cache in use, or None if caching is disabled."""
+    return _active_cache.get()
+
+
+def cached(function: Callable[..., stream.Stream]) -> Callable[..., stream.Stream]:
+    """Decorator making a stream-generating function use the active cache.
+
+    Without an active cache, the function is called directly. Calls with in_place or lazy set,
+    with arguments that can't be fingerprinted (such as iterators, which calling the function
+    consumes), or with distributions but no seed, are never cached.
+
+    Args:
+        function: The function to decorate.
+
+    Returns:
+        The decorated function.
+    """
+    signature = inspect.signature(function)
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        cache = _active_cache.get()
+        if cache is None:
+            return function(*args, **kwargs)
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        if arguments.arguments.get("in_place") or arguments.arguments.get("lazy"):
+            return function(*args, **kwargs)
+        # Without a seed, values drawn from distributions change with each call
+        if "seed" in arguments.arguments and arguments.arguments["seed"] is None and any(
+            isinstance(value, distributions.Distribution)
+            for value in arguments.arguments.values()
+        ):
+            return function(*args, **kwargs)
+        # Progress callbacks don't change the result
+        parameters = {
+            parameter_name: value
+            for parameter_name, value in arguments.arguments.items()
+            if parameter_name != "progress"
+        }
+        try:
+            key_ = key(name, **parameters)
+        except TypeError:
+            return function(*args, **kwargs)
+        entry = cache._lookup(key_)
+        if entry is None:
+            result = function(*args, **kwargs)
+            cache.put(key_, result)
+            return result
+        events, stream_class = entry
+        # Functions return event tables when given event tables
+        if any(isinstance(value, io.EventTable) for value in arguments.arguments.values()):
+            return events
+        return events.to_stream(stream_class)
+
+    return wrapper
+
+
+def key(function_name: str, **parameters: Any) -> str:
+    """Returns the cache key of a function call.
+
+    Args:
+        function_name: The qualified name of the function.
+        **parameters: The parameters of the call. Streams are fingerprinted by their content.
+
+    Returns:
+        A hexadecimal SHA-256 digest.
+
+    Raises:
+        TypeError: If a parameter can't be fingerprinted.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{function_name}\0{arvo.__version__}\0".encode())
+    for parameter_name in sorted(parameters):
+        digest.update(f"{parameter_name}=".encode())
+        _fingerprint(parameters[parameter_name], digest)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _fingerprint(value: Any, digest: "hashlib._Hash"):
+    if value is None or isinstance(value, (bool, str, numbers.Number)):
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+    elif isinstance(value, enum.Enum):
+        digest.update(f"{type(value).__qualname__}.{value.name}".encode())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}[".encode())
+        for item in value:
+            _fingerprint(item, digest)
+            digest.update(b",")
+        digest.update(b"]")
+    elif isinstance(value, (stream.Stream, tools.NoteIndex)):
+        stream_ = tools.source_stream(value)
+        digest.update(f"{type(stream_).__name__}:".encode())
+        flat_stream = stream_.flat
+        for element in flat_stream.elements:
+            if not isinstance(element, note.GeneralNote):
+                offset = flat_stream.elementOffset(element)
+                digest.update(f"{type(element).__name__}@{offset};".encode())
+        # Event tables leave out lyrics, articulations... which are fingerprinted by event number
+        for event_number, element in enumerate(io.event_elements(flat_stream)):
+            extra_data = _extra_data(element)
+            if extra_data:
+                digest.update(f"{event_number}:{extra_data!r};".encode())
+        _fingerprint(io.EventTable.from_stream(flat_stream), digest)
+    elif isinstance(value, io.EventTable):
+        digest.update(f"EventTable:{value.ppq}:".encode())
+        for column_name, dtype in io.COLUMNS:
+            digest.update(numpy.ascontiguousarray(value[column_name], dtype=dtype).tobytes())
+    elif isinstance(value, pitch.Pitch):
+        digest.update(f"Pitch:{value.nameWithOctave}".encode())
+    elif isinstance(value, note.GeneralNote):
+        pitches = ",".join(p.nameWithOctave for p in value.pitches)
+        digest.update(f"{type(value).__name__}:{pitches}:{value.quarterLength}".encode())
+    elif isinstance(value, duration.Duration):
+        digest.update(f"Duration:{value.quarterLength}".encode())
+    elif isinstance(value, scale.ConcreteScale):
+        pitches = ",".join(p.nameWithOctave for p in value.pitches)
+        digest.update(f"{type(value).__qualname__}:{pitches}".encode())
+    elif isinstance(value, distributions.Distribution):
+        digest.update(f"{type(value).__qualname__}(".encode())
+        _fingerprint(value.parameters, digest)
+        digest.update(b")")
+    else:
+        raise TypeError(f"cannot fingerprint {type(value).__name__} objects")
+
+
+def _is_event_stream(stream_: stream.Stream) -> bool:
+    # Streams are stored in the cache as event tables, so only flat streams of notes, chords and
+    # rests without other data can be stored. They are loaded with their class.
+    return (
+        type(stream_).__name__ in _STREAM_CLASSES
+        and type(stream_) is getattr(stream, type(stream_).__name__)
+        and stream_.isFlat
+        and all(
+            isinstance(element, (note.Note, note.Rest, chord.Chord))
+            and not _extra_data(element)
+            for element in stream_.elements
+        )
+    )
+
+
+def _extra_data(element: note.GeneralNote) -> tuple:
+    # Returns the data of a note, chord or rest that event tables don't keep, empty if there is
+    # none. Chords also return the data of their notes.
+    volume = getattr(element, "_volume", None)
+    extra_data = (
+        tuple(lyric.text for lyric in element.lyrics),
+        tuple(type(articulation).__name__ for articulation in element.articulations),
+        tuple(type(expression).__name__ for expression in element.expressions),
+        None if volume is None else volume.velocityScalar,
+        element.duration.isGrace,
+        getattr(element, "notehead", "normal"),
+        getattr(element, "noteheadFill", None),
+        getattr(element, "stemDirection", "unspecified"),
+    )
+    if extra_data == ((), (), (), None, False, "normal", None, "unspecified"):
+        extra_data = ()
+    if isinstance(element, chord.Chord):
+        note_data = tuple(_extra_data(note_) for note_ in element.notes)
+        if any(note_data):
+            extra_data += note_data
+    return extra_data
@@ -0,0 +1,191 @@
+"""
+Probability distributions for the parameters of the processes.
+
+The processes of the minimalism module accept distributions in place of their step values,
+repetitions and directions, and draw a new value for each iteration. Draws come from NumPy
+generators seeded with the seed of the call, and are made in batches rather than one at a time,
+so rendering many variants of a process is cheap:
+
+    for seed in range(1000):
+        variant = minimalism.additive_process(
+            pattern,
+            direction=distributions.Choice(
+                [minimalism.Direction.FORWARD, minimalism.Direction.BACKWARD], weights=[3, 1]
+            ),
+            step_value=distributions.Poisson(1.5, offset=1),
+            seed=seed,
+            lazy=True,
+        )
+
+Each parameter draws from its own generator, spawned from the seed, so the values of one
+parameter don't depend on the distributions of the others. With the same seed and NumPy version,
+a process gives the same result in every run and every process.
+"""
+
+from __future__ import annotations
+
+import abc
+from typing import Any, Iterator, List, Optional, Sequence, Union
+
+from arvo import _lazy
+
+numpy = _lazy.load("numpy")
+
+
+__all__ = ["Distribution", "Poisson", "Uniform", "Choice", "generators", "BATCH_SIZE"]
+
+# Number of values drawn at once from a generator
+BATCH_SIZE = 256
+
+
+class Distribution(abc.ABC):
+    """Base class of the distributions, which implement sample() and parameters."""
+
+    @abc.abstractmethod
+    def sample(self, generator: numpy.random.Generator, size: int) -> List[Any]:
+        """Draws values from the distribution.
+
+        Args:
+            generator: The NumPy generator to draw from.
+            size: The number of values.
+
+        Returns:
+            A list of values.
+        """
+
+    def values(
+        self, generator: numpy.random.Generator, batch_size: int = BATCH_SIZE
+    ) -> Iterator[Any]:
+        """Generates an unbounded sequence of values, drawn in batches.
+
+        Args:
+            generator: The NumPy generator to draw from.
+            batch_size: Optional; The number of values drawn at once. Default is BATCH_SIZE.
+
+        Returns:
+            An iterator over the values.
+        """
+        while True:
+            yield from self.sample(generator, batch_size)
+
+    @property
+    @abc.abstractmethod
+    def parameters(self) -> tuple:
+        """The parameters of the distribution, which identify it in cache keys."""
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and other.parameters == self.parameters
+
+    def __hash__(self) -> int:
+        return hash((type(self), self.parameters))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}{self.parameters!r}"
+
+
+class Poisson(Distribution):
+    """Poisson distribution of integers, shifted by an offset.
+
+    Args:
+        mean: The mean of the Poisson distribution, before the offset is added.
+        offset: Optional; The value added to the draws, for example 1 for steps that always move
+          forward. Default is 0.
+
+    Raises:
+        ValueError: If the mean is negative.
+    """
+
+    def __init__(self, mean: float, offset: int = 0):
+        if mean < 0:
+            raise ValueError(f"the mean of a Poisson distribution can't be negative: {mean}")
+        self.mean = mean
+        self.offset = offset
+
+    def sample(self, generator: numpy.random.Generator, size: int) -> List[int]:
+        return (generator.poisson(self.mean, size) + self.offset).tolist()
+
+    @property
+    def parameters(self) -> tuple:
+        return (self.mean, self.offset)
+
+
+class Uniform(Distribution):
+    """Uniform distribution of the integers between two bounds, included.
+
+    Args:
+        low: The smallest value.
+        high: The largest value.
+
+    Raises:
+        ValueError: If high is smaller than low.
+    """
+
+    def __init__(self, low: int, high: int):
+        if high < low:
+            raise ValueError(f"empty range of values: {low} to {high}")
+        self.low = low
+        self.high = high
+
+    def sample(self, generator: numpy.random.Generator, size: int) -> List[int]:
+        return generator.integers(self.low, self.high, size, endpoint=True).tolist()
+
+    @property
+    def parameters(self) -> tuple:
+        return (self.low, self.high)
+
+
+class Choice(Distribution):
+    """Weighted choice between values, such as step values or process directions.
+
+    Args:
+        choices: The values to choose from.
+        weights: Optional; The relative weights of the values. By default, all the values are
+          equally likely.
+
+    Raises:
+        ValueError: If there are no values, if the weights don't match the values, or if they
+          are negative or all zero.
+    """
+
+    def __init__(self, choices: Sequence[Any], weights: Optional[Sequence[float]] = None):
+        self.choices = tuple(choices)
+        if not self.choices:
+            raise ValueError("no values to choose from")
+        self.weights = None if weights is None else tuple(weights)
+        if self.weights is None:
+            self._probabilities = None
+            return
+        if len(self.weights) != len(self.choices):
+            raise ValueError(
+                f"{len(self.weights)} weights given for {len(self.choices)} values"
+            )
+        weights_array = numpy.asarray(self.weights, dtype=float)
+        if (weights_array < 0).any() or weights_array.sum() <= 0:
+            raise ValueError(f"weights must be positive: {weights}")
+        self._probabilities = weights_array / weights_array.sum()
+
+    def sample(self, generator: numpy.random.Generator, size: int) -> List[Any]:
+        indices = generator.choice(len(self.choices), size, p=self._probabilities)
+        return [self.choices[index] for index in indices.tolist()]
+
+    @property
+    def parameters(self) -> tuple:
+        return (self.choices, self.weights)
+
+
+def generators(
+    seed: Optional[Union[int, Sequence[int]]], count: int
+) -> List[numpy.random.Generator]:
+    """Returns independent generators derived from a seed.
+
+    Args:
+        seed: The seed, or None for unpredictable generators.
+        count: The number of generators.
+
+    Returns:
+        A list of NumPy generators. The same seed always gives the same generators, and each
+        generator keeps its stream when more are requested.
+    """
+    children = numpy.random.SeedSequence(seed).spawn(count)
+    return [numpy.random.default_rng(child) for child in children]
+
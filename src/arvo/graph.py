@@ -0,0 +1,263 @@
+"""
+Module for building pieces as graphs of sections.
+
+Sections are declared as nodes over arvo functions, with other nodes as their inputs, and a
+scheduler computes them, running independent sections in parallel in a process pool:
+
+    graph = Graph()
+    pattern = graph.add(isorhythm.create_isorhythm, pitches, durations)
+    section_a = graph.add(minimalism.additive_process, pattern, Direction.INWARD)
+    section_b = graph.add(transformations.retrograde, section_a)
+    section_c = graph.add(transformations.scalar_inversion, section_a, "C#6", reference_scale)
+    score = graph.score({"Violin": [section_a, section_b, section_c]})
+
+Results are passed between processes as event tables (see arvo.io) rather than pickled streams,
+so only the notes, chords and rests of the sections are kept. Nodes declared twice with the same
+function and inputs are computed once. If a cache is in use (see arvo.cache), the workers use it
+too.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import itertools
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from arvo import _lazy
+from arvo import cache
+from arvo import io
+from arvo import tools
+
+stream = _lazy.load("music21.stream")
+
+
+__all__ = ["Node", "Graph"]
+
+
+class Node:
+    """Section of a graph: the result of a function applied to values and other nodes.
+
+    Nodes are created by Graph.add().
+
+    Args:
+        function: The function computing the section.
+        args: The positional arguments of the function.
+        kwargs: The keyword arguments of the function.
+        name: The name of the node.
+        key: The key identifying the declaration of the node in its graph.
+    """
+
+    def __init__(
+        self,
+        function: Callable[..., Any],
+        args: tuple,
+        kwargs: Dict[str, Any],
+        name: str,
+        key: str,
+    ):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.name = name
+        self.key = key
+
+    @property
+    def dependencies(self) -> List[Node]:
+        """The nodes used as arguments of the function, without repetitions."""
+        found = []
+        for value in itertools.chain(self.args, self.kwargs.values()):
+            for node in _nodes_in(value):
+                if node not in found:
+                    found.append(node)
+        return found
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class Graph:
+    """Sections of a piece and their dependencies."""
+
+    def __init__(self):
+        self._nodes: Dict[str, Node] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add(
+        self, function: Callable[..., Any], *args: Any, name: Optional[str] = None, **kwargs: Any
+    ) -> Node:
+        """Declares a section.
+
+        The function is called with the given arguments, in which nodes, including nodes in lists
+        and tuples, are replaced by the streams of their sections. Functions run in worker
+        processes, so they must be defined at the top level of a module.
+
+        Args:
+            function: The function computing the section, which should return a stream.
+            *args: The positional arguments of the function.
+            name: Optional; The name of the node. By default, the name of the function and
+              the number of the node are used.
+            **kwargs: The keyword arguments of the function.
+
+        Returns:
+            The node of the section. If the same function was already added with the same
+            arguments, its node is returned.
+        """
+        function_name = f"{function.__module__}.{function.__qualname__}"
+        try:
+            key = cache.key(
+                function_name,
+                args=_placeholders(args),
+                kwargs=_placeholders(tuple(sorted(kwargs.items()))),
+            )
+        except TypeError:
+            # Arguments that can't be fingerprinted, such as iterators, make the node unique
+            key = f"{function_name}#{next(self._counter)}"
+        if key not in self._nodes:
+            node_name = name or f"{function.__qualname__}-{len(self._nodes)}"
+            self._nodes[key] = Node(function, args, kwargs, node_name, key)
+        return self._nodes[key]
+
+    def run(self, *nodes: Node, workers: Optional[int] = None) -> List[Any]:
+        """Computes sections and the sections they depend on.
+
+        Args:
+            *nodes: The nodes of the sections.
+            workers: Optional; The number of worker processes. With 0, the sections are computed
+              in the current process. By default, there is one worker per processor.
+
+        Returns:
+            The streams of the sections, in the order of the nodes.
+        """
+        results = self._compute(nodes, workers)
+        return [_materialize(results[node]) for node in nodes]
+
+    def score(
+        self, parts: Mapping[str, Sequence[Node]], workers: Optional[int] = None
+    ) -> stream.Score:
+        """Computes sections and assembles them into a score.
+
+        Args:
+            parts: The sections of each part, in order, by part name.
+            workers: Optional; The number of worker processes, as in run().
+
+        Returns:
+            A Score with one Part per name, in which the sections are appended one after another.
+        """
+        nodes = [node for sections in parts.values() for node in sections]
+        results = self._compute(nodes, workers)
+        score = stream.Score()
+        for part_name, sections in parts.items():
+            part = stream.Part(id=part_name)
+            part.partName = part_name
+            # Sections used several times need their own copies of the notes
+            tools.append_stream(part, *[_materialize(results[node]) for node in sections])
+            score.insert(0, part)
+        return score
+
+    def _compute(self, nodes: Iterable[Node], workers: Optional[int]) -> Dict[Node, Any]:
+        # Computes the nodes and their dependencies, starting each node as soon as its
+        # dependencies are computed. Stream results are kept as event tables.
+        waiting = {}
+        to_visit = list(nodes)
+        while to_visit:
+            node = to_visit.pop()
+            if self._nodes.get(node.key) is not node:
+                raise ValueError(f"{node!r} is not a node of the graph")
+            if node not in waiting:
+                waiting[node] = set(node.dependencies)
+                to_visit.extend(node.dependencies)
+        active_cache = cache.active_cache()
+
+        results = {}
+        if workers == 0:
+            executor = _SerialExecutor()
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(workers)
+        with executor:
+            running = {}
+            try:
+                while waiting or running:
+                    ready = [node for node, dependencies in waiting.items() if not dependencies]
+                    for node in ready:
+                        del waiting[node]
+                        future = executor.submit(
+                            _run_node,
+                            node.function,
+                            _substitute(node.args, results),
+                            _substitute(node.kwargs, results),
+                            active_cache,
+                        )
+                        running[future] = node
+                    done, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        node = running.pop(future)
+                        results[node] = future.result()
+                        for dependencies in waiting.values():
+                            dependencies.discard(node)
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+        return results
+
+
+class _SerialExecutor(concurrent.futures.Executor):
+    # Executor running the functions in the current process when they are submitted
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exception:
+            future.set_exception(exception)
+        return future
+
+
+def _run_node(function, args, kwargs, active_cache):
+    # Computes a section in a worker process, converting event tables from and to streams
+    args = _substitute(args, {}, _materialize)
+    kwargs = _substitute(kwargs, {}, _materialize)
+    with contextlib.nullcontext() if active_cache is None else cache.use(active_cache):
+        result = function(*args, **kwargs)
+    if isinstance(result, (stream.Stream, tools.NoteIndex)):
+        return io.EventTable.from_stream(result)
+    return result
+
+
+def _nodes_in(value) -> Iterable[Node]:
+    if isinstance(value, Node):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _nodes_in(item)
+
+
+def _placeholders(value):
+    # Replaces nodes with strings identifying them, so that the arguments can be fingerprinted
+    if isinstance(value, Node):
+        return f"arvo.graph.Node:{value.key}"
+    if isinstance(value, (list, tuple)):
+        return type(value)(_placeholders(item) for item in value)
+    return value
+
+
+def _substitute(value, results: Dict[Node, Any], convert: Callable[[Any], Any] = lambda x: x):
+    # Replaces nodes with their results, in nested lists, tuples and dicts
+    if isinstance(value, Node):
+        return results[value]
+    if isinstance(value, (list, tuple)):
+        return type(value)(_substitute(item, results, convert) for item in value)
+    if isinstance(value, dict):
+        return {name: _substitute(item, results, convert) for name, item in value.items()}
+    return convert(value)
+
+
+def _materialize(value):
+    if isinstance(value, io.EventTable):
+        return value.to_stream()
+    return value
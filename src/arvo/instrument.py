@@ -0,0 +1,294 @@
+"""
+Instrumentation of the arvo functions, for finding the slow steps of a piece.
+
+Within a record() block, each call to an arvo process, transformation or stream helper is
+measured: its wall time, the number of notes it receives and returns, and the number of deep
+copies, reference scale steps (ConcreteScale.next() calls) and stream insertions it causes:
+
+    with instrument.record() as stats:
+        score = build_score()
+    for name, totals in stats.by_function().items():
+        print(name, totals.calls, totals.seconds, totals.deepcopies)
+
+Each measured call can also be sent to callbacks, for instance to forward it to a metrics
+system. Outside record() blocks, the instrumented functions only pay for one context variable
+lookup.
+
+Deep copies, scale steps and insertions are counted by wrapping copy.deepcopy(),
+ConcreteScale.next() and Stream.coreGuardBeforeAddElement(), which every way of adding elements
+to a stream goes through, while at least one record() block is active in any thread. They are
+only counted in the threads and tasks that are recording.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import copy
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Sequence
+
+from arvo import _lazy
+
+note = _lazy.load("music21.note")
+scale = _lazy.load("music21.scale")
+stream = _lazy.load("music21.stream")
+numpy = _lazy.load("numpy")
+io = _lazy.load("arvo.io")
+tools = _lazy.load("arvo.tools")
+
+
+__all__ = ["CallStats", "FunctionStats", "Stats", "record", "instrumented"]
+
+# Counters of the calls being measured in the current context, outermost first
+_frames = contextvars.ContextVar("arvo_instrument_frames", default=())
+# Stats of the record() blocks active in the current context, outermost first
+_recorders = contextvars.ContextVar("arvo_instrument_recorders", default=())
+
+_patch_lock = threading.Lock()
+_patch_count = 0
+_originals: Dict[str, Any] = {}
+# Set while copy.deepcopy() runs in a thread, so that its recursive calls aren't counted
+_copying = threading.local()
+
+
+class CallStats(NamedTuple):
+    """Measurements of a call to an arvo function.
+
+    Counts include the calls made by nested arvo functions, which are also recorded separately.
+
+    Attributes:
+        function: The qualified name of the function.
+        seconds: The wall time of the call.
+        notes_in: The number of notes and chords in the streams, note indexes and event tables
+          passed to the function.
+        notes_out: The number of notes and chords in the result.
+        deepcopies: The number of copy.deepcopy() calls, not counting recursive ones.
+        scale_next_calls: The number of ConcreteScale.next() calls.
+        inserts: The number of elements added to streams.
+        depth: The number of instrumented calls the call was made from.
+    """
+
+    function: str
+    seconds: float
+    notes_in: int
+    notes_out: int
+    deepcopies: int
+    scale_next_calls: int
+    inserts: int
+    depth: int
+
+
+class FunctionStats(NamedTuple):
+    """Totals of the calls to an arvo function.
+
+    Attributes:
+        calls: The number of calls.
+        seconds: The total wall time.
+        notes_in: The total number of notes received.
+        notes_out: The total number of notes returned.
+        deepcopies: The total number of deep copies.
+        scale_next_calls: The total number of ConcreteScale.next() calls.
+        inserts: The total number of elements added to streams.
+    """
+
+    calls: int
+    seconds: float
+    notes_in: int
+    notes_out: int
+    deepcopies: int
+    scale_next_calls: int
+    inserts: int
+
+
+class Stats:
+    """Calls measured in a record() block.
+
+    Args:
+        callbacks: Optional; Functions called with the CallStats of each call, when it returns.
+    """
+
+    def __init__(self, callbacks: Sequence[Callable[[CallStats], Any]] = ()):
+        self.calls: List[CallStats] = []
+        self.callbacks = list(callbacks)
+
+    def add(self, call: CallStats):
+        """Records a call and sends it to the callbacks.
+
+        Args:
+            call: The measurements of the call.
+        """
+        self.calls.append(call)
+        for callback in self.callbacks:
+            callback(call)
+
+    def by_function(self) -> Dict[str, FunctionStats]:
+        """Returns the totals of the calls of each function, by decreasing total time."""
+        totals = {}
+        for call in self.calls:
+            current = totals.get(call.function, (0, 0.0, 0, 0, 0, 0, 0))
+            totals[call.function] = tuple(
+                total + value for total, value in zip(current, (1,) + tuple(call[1:7]))
+            )
+        return {
+            name: FunctionStats(*values)
+            for name, values in sorted(totals.items(), key=lambda item: -item[1][1])
+        }
+
+    @property
+    def seconds(self) -> float:
+        """The total wall time of the outermost calls."""
+        return sum(call.seconds for call in self.calls if call.depth == 0)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {len(self.calls)} calls, {self.seconds:.3f} s>"
+
+
+@contextlib.contextmanager
+def record(*callbacks: Callable[[CallStats], Any]) -> Iterator[Stats]:
+    """Context manager measuring the arvo functions called within it.
+
+    Blocks can be nested: calls are recorded by all the active blocks.
+
+    Args:
+        *callbacks: Functions called with the CallStats of each call, when it returns.
+
+    Yields:
+        The Stats of the block, which are filled as the functions return.
+    """
+    stats = Stats(callbacks)
+    _install()
+    token = _recorders.set(_recorders.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _recorders.reset(token)
+        _uninstall()
+
+
+def instrumented(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator measuring the calls to a function made within record() blocks.
+
+    Args:
+        function: The function to decorate.
+
+    Returns:
+        The decorated function.
+    """
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        recorders = _recorders.get()
+        if not recorders:
+            return function(*args, **kwargs)
+        outer_frames = _frames.get()
+        notes_in = sum(_count_notes(value) for value in (*args, *kwargs.values()))
+        counters = _Counters()
+        token = _frames.set(outer_frames + (counters,))
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _frames.reset(token)
+        call = CallStats(
+            name,
+            seconds,
+            notes_in,
+            _count_notes(result),
+            counters.deepcopies,
+            counters.scale_next_calls,
+            counters.inserts,
+            len(outer_frames),
+        )
+        for stats in recorders:
+            stats.add(call)
+        return result
+
+    return wrapper
+
+
+class _Counters:
+    __slots__ = ("deepcopies", "scale_next_calls", "inserts")
+
+    def __init__(self):
+        self.deepcopies = 0
+        self.scale_next_calls = 0
+        self.inserts = 0
+
+
+def _count_notes(value) -> int:
+    # Counted outside of the measured calls, so flattening streams here isn't recorded
+    token = _frames.set(())
+    try:
+        if isinstance(value, (list, tuple)):
+            return sum(_count_notes(item) for item in value)
+        if isinstance(value, tools.NoteIndex):
+            return len(value)
+        if isinstance(value, stream.Stream):
+            if not getattr(value, "materialized", True):
+                # Lazy streams are counted without being built
+                return len(tools.note_index(value))
+            return len(value.flat.notes)
+        if isinstance(value, io.EventTable):
+            return len(numpy.unique(value["event"][value["kind"] != io.REST]))
+        if isinstance(value, note.NotRest):
+            return 1
+        return 0
+    finally:
+        _frames.reset(token)
+
+
+def _install():
+    # Wraps the counted functions while at least one record() block is active
+    global _patch_count
+    with _patch_lock:
+        _patch_count += 1
+        if _patch_count > 1:
+            return
+        # The originals are kept after uninstalling, for the wrappers still running in other threads
+        _originals["deepcopy"] = copy.deepcopy
+        _originals["next"] = scale.ConcreteScale.next
+        _originals["coreGuardBeforeAddElement"] = stream.Stream.coreGuardBeforeAddElement
+        copy.deepcopy = _counting_deepcopy
+        scale.ConcreteScale.next = _counting_next
+        stream.Stream.coreGuardBeforeAddElement = _counting_guard
+
+
+def _uninstall():
+    global _patch_count
+    with _patch_lock:
+        _patch_count -= 1
+        if _patch_count > 0:
+            return
+        copy.deepcopy = _originals["deepcopy"]
+        scale.ConcreteScale.next = _originals["next"]
+        stream.Stream.coreGuardBeforeAddElement = _originals["coreGuardBeforeAddElement"]
+
+
+def _counting_deepcopy(x, memo=None, *args):
+    # copy.deepcopy() calls itself through the module attribute, so nested calls come back here
+    if getattr(_copying, "active", False):
+        return _originals["deepcopy"](x, memo, *args)
+    for counters in _frames.get():
+        counters.deepcopies += 1
+    _copying.active = True
+    try:
+        return _originals["deepcopy"](x, memo, *args)
+    finally:
+        _copying.active = False
+
+
+def _counting_next(self, *args, **kwargs):
+    for counters in _frames.get():
+        counters.scale_next_calls += 1
+    return _originals["next"](self, *args, **kwargs)
+
+
+def _counting_guard(self, *args, **kwargs):
+    for counters in _frames.get():
+        counters.inserts += 1
+    return _originals["coreGuardBeforeAddElement"](self, *args, **kwargs)
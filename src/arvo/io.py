@@ -0,0 +1,477 @@
+"""
+Module for reading and writing streams of events in a compact binary format.
+
+An event file stores the notes, chords and rests of a stream as columns of fixed-size values:
+offsets and durations in integer ticks, pitch numbers and spellings, ties and voice numbers. The
+columns are laid out so that numpy.memmap can open them directly, which makes loading a file of
+millions of notes nearly free and lets worker processes share generated material through the
+file system.
+
+Loaded files are EventTable objects, which the transformations and write_midi() process without
+creating music21 notes. EventTable.to_stream() creates the notes when they are needed.
+"""
+
+from __future__ import annotations
+
+import fractions
+import os
+import struct
+from typing import Callable, Dict, List, Optional, Type, Union
+
+from arvo import _lazy
+from arvo import tools
+
+numpy = _lazy.load("numpy")
+chord = _lazy.load("music21.chord")
+common = _lazy.load("music21.common")
+defaults = _lazy.load("music21.defaults")
+note = _lazy.load("music21.note")
+pitch = _lazy.load("music21.pitch")
+stream = _lazy.load("music21.stream")
+tie = _lazy.load("music21.tie")
+
+
+__all__ = ["EventTable", "event_elements", "save_events", "load_events", "write_midi"]
+
+MAGIC = b"ARVOEVT\0"
+VERSION = 1
+
+# Columns of version 1 files, in file order. Each column starts on an 8-byte boundary.
+COLUMNS = (
+    ("offset", "<i8"),  # Offset in ticks
+    ("duration", "<i8"),  # Duration in ticks
+    ("event", "<u4"),  # Number of the note, chord or rest the row belongs to
+    ("kind", "u1"),  # NOTE, CHORD or REST
+    ("voice", "<u2"),  # Voice number, 0 outside of voices
+    ("tie", "u1"),  # Index in TIES
+    ("midi", "<f4"),  # Pitch space number, NaN for rests
+    ("step", "u1"),  # Index in STEPS
+    ("alter", "<f4"),  # Accidental alteration, NaN without accidental
+    ("octave", "<i2"),  # NO_OCTAVE without explicit octave
+    ("microtone", "<f4"),  # Microtone in cents
+)
+_HEADER_DTYPE = [
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("columns", "<u4"),
+    ("ppq", "<u8"),
+    ("length", "<u8"),
+]
+
+NOTE, CHORD, REST = range(3)
+TIES = (None, "start", "stop", "continue", "let-ring")
+STEPS = "CDEFGAB"
+NO_OCTAVE = -(1 << 15)
+
+# MIDI channels of the voices, skipping the percussion channel
+_CHANNELS = [channel for channel in range(1, 17) if channel != 10]
+_NOTE_OFF = 0x80
+_NOTE_ON = 0x90
+_END_OF_TRACK = b"\x00\xff\x2f\x00"
+
+
+class EventTable:
+    """Columns of events, one row per pitch and one row per rest.
+
+    The rows of a chord share the same event number, offset and duration. Rows are sorted by
+    offset. Tables can be indexed by column name to get the column arrays, which are read-only
+    for loaded files.
+
+    Args:
+        columns: The column arrays, by name, as in COLUMNS.
+        ppq: The number of ticks per quarter note.
+    """
+
+    def __init__(self, columns: Dict[str, numpy.ndarray], ppq: int):
+        self.columns = columns
+        self.ppq = ppq
+
+    @classmethod
+    def from_stream(cls, stream_: Union[stream.Stream, tools.NoteIndex]) -> EventTable:
+        """Creates the table of the notes, chords and rests of a stream.
+
+        Notes in voices get the number of their voice within its container, counting from 1.
+        In streams of several parts, such as scores, each voice of each part gets its own number,
+        so that the parts stay separate.
+        Other elements are ignored.
+
+        Args:
+            stream_: The stream to convert, or its NoteIndex.
+
+        Returns:
+            A new EventTable.
+        """
+        elements = _events(stream_)
+        ppq = tools.ticks_per_quarter(
+            quarter_length
+            for offset, _, element in elements
+            for quarter_length in (offset, element.duration.quarterLength)
+        )
+        rows = []
+        for event_number, (offset, voice, element) in enumerate(elements):
+            # Offsets and durations are whole numbers of ticks, so the products are exact
+            offset_ticks = round(offset * ppq)
+            duration_ticks = round(element.duration.quarterLength * ppq)
+            if isinstance(element, note.Rest):
+                rows.append(
+                    (offset_ticks, duration_ticks, event_number, REST, voice, 0,
+                     numpy.nan, 0, numpy.nan, NO_OCTAVE, 0.0)
+                )
+                continue
+            kind = CHORD if isinstance(element, chord.Chord) else NOTE
+            tie_index = TIES.index(None if element.tie is None else element.tie.type)
+            for pitch_ in element.pitches:
+                rows.append(
+                    (offset_ticks, duration_ticks, event_number, kind, voice, tie_index)
+                    + _encode_pitch(pitch_)
+                )
+        records = numpy.array(rows, dtype=list(COLUMNS))
+        return cls({name: numpy.ascontiguousarray(records[name]) for name, _ in COLUMNS}, ppq)
+
+    def __len__(self) -> int:
+        return len(self.columns["offset"])
+
+    def __getitem__(self, column: str) -> numpy.ndarray:
+        return self.columns[column]
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {len(self)} rows, {self.ppq} ticks per quarter>"
+
+    @property
+    def offsets(self) -> numpy.ndarray:
+        """The offsets of the rows, in quarter lengths."""
+        return self.columns["offset"] / self.ppq
+
+    @property
+    def durations(self) -> numpy.ndarray:
+        """The durations of the rows, in quarter lengths."""
+        return self.columns["duration"] / self.ppq
+
+    @property
+    def highest_time(self) -> fractions.Fraction:
+        """The end of the last event, in quarter lengths."""
+        if not len(self):
+            return fractions.Fraction(0)
+        end = int((self.columns["offset"] + self.columns["duration"]).max())
+        return fractions.Fraction(end, self.ppq)
+
+    def pitch(self, row: int) -> pitch.Pitch:
+        """Creates the pitch of a row.
+
+        Args:
+            row: The index of the row, which must not be a rest.
+
+        Returns:
+            A new Pitch object.
+        """
+        return _decode_pitch(
+            self.columns["step"][row],
+            self.columns["alter"][row],
+            self.columns["octave"][row],
+            self.columns["microtone"][row],
+        )
+
+    def replace(self, **columns: numpy.ndarray) -> EventTable:
+        """Returns a table sharing the columns of this table except for the given ones.
+
+        Args:
+            **columns: The new column arrays, by name.
+
+        Returns:
+            A new EventTable.
+        """
+        return EventTable({**self.columns, **columns}, self.ppq)
+
+    def map_pitches(self, function: Callable[[pitch.Pitch], None]) -> EventTable:
+        """Returns a table with a function applied to the pitches of the events.
+
+        The function is called once per distinct spelling, on a Pitch that it modifies in place,
+        so that large tables are transformed without creating their notes.
+
+        Args:
+            function: The function modifying a pitch.
+
+        Returns:
+            A new EventTable.
+        """
+        spelling = numpy.stack(
+            [
+                self.columns["step"].astype(float),
+                self.columns["alter"],
+                self.columns["octave"].astype(float),
+                self.columns["microtone"],
+            ],
+            axis=1,
+        )
+        sounding = self.columns["kind"] != REST
+        # NaN alterations would never compare equal, so they are replaced by a sentinel
+        keys = numpy.where(numpy.isnan(spelling), numpy.inf, spelling)[sounding]
+        unique_keys, inverse = numpy.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        new_rows = []
+        for step, alter, octave, microtone in unique_keys:
+            if alter == numpy.inf:
+                alter = numpy.nan
+            pitch_ = _decode_pitch(step, alter, octave, microtone)
+            function(pitch_)
+            new_rows.append(_encode_pitch(pitch_))
+        new_columns = {}
+        for column_number, name in enumerate(["midi", "step", "alter", "octave", "microtone"]):
+            column = self.columns[name].copy()
+            if new_rows:
+                values = numpy.array([row[column_number] for row in new_rows], dtype=column.dtype)
+                column[sounding] = values[inverse]
+            new_columns[name] = column
+        return self.replace(**new_columns)
+
+    def to_stream(self, stream_class: Optional[Type[stream.Stream]] = None) -> stream.Stream:
+        """Creates the notes, chords and rests of the table.
+
+        Args:
+            stream_class: Optional; The class of the created stream, for example stream.Part.
+              Default is stream.Stream.
+
+        Returns:
+            A flat stream, or a stream of Voices if the table has several voices.
+        """
+        if stream_class is None:
+            stream_class = stream.Stream
+        voices = numpy.unique(self.columns["voice"])
+        if len(voices) <= 1:
+            return self._voice_stream(stream_class, None)
+        container = stream_class()
+        for voice in voices:
+            voice_stream = self._voice_stream(stream.Voice, voice)
+            voice_stream.id = int(voice)
+            container.insert(0, voice_stream)
+        return container
+
+    def _voice_stream(self, stream_class, voice) -> stream.Stream:
+        builder = tools.StreamBuilder(stream_class())
+        columns = self.columns
+        rows = range(len(self)) if voice is None else numpy.flatnonzero(columns["voice"] == voice)
+        event_pitches = []
+        for position, row in enumerate(rows):
+            kind = columns["kind"][row]
+            if kind != REST:
+                event_pitches.append(self.pitch(row))
+            # Chords are complete on their last row
+            next_row = rows[position + 1] if position + 1 < len(rows) else None
+            if next_row is not None and columns["event"][next_row] == columns["event"][row]:
+                continue
+            if kind == REST:
+                element = note.Rest()
+            elif kind == NOTE:
+                element = note.Note(event_pitches[0])
+            else:
+                element = chord.Chord(event_pitches)
+            element.duration = tools.to_duration(
+                fractions.Fraction(int(columns["duration"][row]), self.ppq)
+            )
+            if columns["tie"][row]:
+                element.tie = tie.Tie(TIES[columns["tie"][row]])
+            builder.insert(fractions.Fraction(int(columns["offset"][row]), self.ppq), element)
+            event_pitches = []
+        return builder.commit()
+
+
+def event_elements(stream_: Union[stream.Stream, tools.NoteIndex]) -> List[note.GeneralNote]:
+    """Returns the notes, chords and rests of a stream in the order of their event numbers.
+
+    Args:
+        stream_: The stream, or its NoteIndex.
+
+    Returns:
+        The elements, the element of event number n at position n in the table of the stream.
+    """
+    return [element for _, _, element in _events(stream_)]
+
+
+def save_events(
+    events: Union[EventTable, stream.Stream, tools.NoteIndex], path: Union[str, os.PathLike]
+):
+    """Writes events to a file.
+
+    Args:
+        events: The EventTable to write, or a stream or NoteIndex to convert.
+        path: The path of the file.
+    """
+    if not isinstance(events, EventTable):
+        events = EventTable.from_stream(events)
+    header = numpy.zeros(1, dtype=_HEADER_DTYPE)
+    header[0] = (MAGIC, VERSION, len(COLUMNS), events.ppq, len(events))
+    with open(path, "wb") as file:
+        file.write(header.tobytes())
+        position = header.nbytes
+        for name, dtype in COLUMNS:
+            padding = -position % 8
+            file.write(b"\0" * padding)
+            data = numpy.ascontiguousarray(events[name], dtype=dtype).tobytes()
+            file.write(data)
+            position += padding + len(data)
+
+
+def load_events(path: Union[str, os.PathLike]) -> EventTable:
+    """Opens a file written by save_events().
+
+    The file is memory-mapped: the columns of the table are read-only views of the file, which is
+    only read as they are accessed.
+
+    Args:
+        path: The path of the file.
+
+    Returns:
+        The EventTable of the file.
+
+    Raises:
+        ValueError: If the file is not an event file, or was written by a newer version.
+    """
+    data = numpy.memmap(path, dtype=numpy.uint8, mode="r")
+    header_size = numpy.dtype(_HEADER_DTYPE).itemsize
+    if len(data) < header_size or bytes(data[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{os.fspath(path)!r} is not an event file")
+    header = data[:header_size].view(_HEADER_DTYPE)[0]
+    if header["version"] > VERSION:
+        raise ValueError(f"unsupported event file version {header['version']}")
+    length = int(header["length"])
+    columns = {}
+    position = header_size
+    for name, dtype in COLUMNS:
+        position += -position % 8
+        size = length * numpy.dtype(dtype).itemsize
+        columns[name] = data[position:position + size].view(dtype)
+        position += size
+    return EventTable(columns, int(header["ppq"]))
+
+
+def write_midi(
+    events: Union[EventTable, stream.Stream, tools.NoteIndex],
+    path: Union[str, os.PathLike],
+    velocity: int = 90,
+):
+    """Writes events to a standard MIDI file, with one track per voice.
+
+    The tracks are encoded directly from the columns of the table. Tied notes are merged, and
+    pitches are rounded to the nearest semitone.
+
+    Args:
+        events: The EventTable to write, or a stream or NoteIndex to convert.
+        path: The path of the MIDI file.
+        velocity: Optional; The velocity of the notes. Default is 90.
+
+    Raises:
+        ValueError: If the time between two MIDI events is too long to be encoded.
+    """
+    if not isinstance(events, EventTable):
+        events = EventTable.from_stream(events)
+    # MIDI resolutions are limited to 15 bits
+    midi_ppq = events.ppq if events.ppq < (1 << 15) else defaults.ticksPerQuarter
+    sounding = events["kind"] != REST
+    ties = events["tie"][sounding]
+    starts = events["offset"][sounding] * midi_ppq // events.ppq
+    ends = (events["offset"][sounding] + events["duration"][sounding]) * midi_ppq // events.ppq
+    pitches = numpy.rint(events["midi"][sounding]).astype(numpy.uint8)
+    voices = events["voice"][sounding]
+    # Tied notes start with their first note and end with their last note
+    has_start = (ties != TIES.index("stop")) & (ties != TIES.index("continue"))
+    has_end = (ties != TIES.index("start")) & (ties != TIES.index("continue"))
+    tracks = []
+    for track_number, voice in enumerate(numpy.unique(voices)):
+        channel = _CHANNELS[track_number % len(_CHANNELS)] - 1
+        note_offs = (voices == voice) & has_end
+        note_ons = (voices == voice) & has_start
+        times = numpy.concatenate([ends[note_offs], starts[note_ons]])
+        statuses = numpy.concatenate(
+            [
+                numpy.full(note_offs.sum(), _NOTE_OFF | channel, numpy.uint8),
+                numpy.full(note_ons.sum(), _NOTE_ON | channel, numpy.uint8),
+            ]
+        )
+        # Note offs come before note ons at the same time
+        order = numpy.lexsort((statuses, times))
+        messages = numpy.stack(
+            [
+                statuses,
+                numpy.concatenate([pitches[note_offs], pitches[note_ons]]),
+                numpy.where(statuses == _NOTE_ON | channel, velocity, 0).astype(numpy.uint8),
+            ],
+            axis=1,
+        )[order]
+        deltas = numpy.diff(times[order], prepend=0)
+        tracks.append(_encode_track(deltas, messages))
+    with open(path, "wb") as file:
+        file.write(b"MThd" + struct.pack(">LHHH", 6, 1, len(tracks), midi_ppq))
+        for track in tracks:
+            file.write(b"MTrk" + struct.pack(">L", len(track)) + track)
+
+
+def _encode_track(deltas: numpy.ndarray, messages: numpy.ndarray) -> bytes:
+    # Encodes the delta times as MIDI variable-length quantities, followed by the messages
+    if len(deltas) and deltas.max() >= 1 << 28:
+        raise ValueError("time between MIDI events too long")
+    groups = numpy.stack([(deltas >> shift) & 0x7F for shift in (21, 14, 7, 0)], axis=1)
+    groups[:, :3] |= 0x80
+    lengths = 1 + sum((deltas >= 1 << shift).astype(int) for shift in (7, 14, 21))
+    included = numpy.arange(4) >= 4 - lengths[:, numpy.newaxis]
+    data = numpy.concatenate([groups.astype(numpy.uint8), messages], axis=1)
+    mask = numpy.concatenate([included, numpy.ones(messages.shape, bool)], axis=1)
+    return data[mask].tobytes() + _END_OF_TRACK
+
+
+def _events(stream_):
+    # Returns the (offset, voice, element) triples of the notes and rests, sorted by offset. In
+    # streams of several parts, the voices of each part get their own numbers, from 1.
+    collected = []
+    _collect(tools.source_stream(stream_), 0, None, 0, collected)
+    if len({id(part) for _, part, _, _ in collected}) > 1:
+        numbers = {}
+        for _, part, voice, _ in collected:
+            numbers.setdefault((id(part), voice), len(numbers) + 1)
+        elements = [
+            (offset, numbers[id(part), voice], element)
+            for offset, part, voice, element in collected
+        ]
+    else:
+        elements = [(offset, voice, element) for offset, _, voice, element in collected]
+    elements.sort(key=lambda item: item[0])
+    return elements
+
+
+def _collect(container, base_offset, part, voice, elements):
+    # Collects the (offset, part, voice, element) tuples of the notes and rests of a stream,
+    # recursively. Voices are numbered within their container, from 1.
+    voice_count = 0
+    for element in container:
+        offset = container.elementOffset(element)
+        if base_offset:
+            offset = common.opFrac(base_offset + fractions.Fraction(offset))
+        if isinstance(element, stream.Voice):
+            voice_count += 1
+            _collect(element, offset, part, voice_count, elements)
+        elif isinstance(element, stream.Part):
+            _collect(element, offset, element, voice, elements)
+        elif isinstance(element, stream.Stream):
+            _collect(element, offset, part, voice, elements)
+        elif isinstance(element, note.GeneralNote) and not isinstance(element, note.Unpitched):
+            elements.append((offset, part, voice, element))
+
+
+def _encode_pitch(pitch_: pitch.Pitch) -> tuple:
+    return (
+        pitch_.ps,
+        STEPS.index(pitch_.step),
+        numpy.nan if pitch_.accidental is None else pitch_.accidental.alter,
+        NO_OCTAVE if pitch_.octave is None else pitch_.octave,
+        0.0 if pitch_._microtone is None else pitch_.microtone.cents,
+    )
+
+
+def _decode_pitch(step, alter, octave, microtone) -> pitch.Pitch:
+    pitch_ = pitch.Pitch(STEPS[int(step)])
+    if not numpy.isnan(alter):
+        pitch_.accidental = pitch.Accidental(float(alter))
+    if octave != NO_OCTAVE:
+        pitch_.octave = int(octave)
+    if microtone:
+        pitch_.microtone = float(microtone)
+    return pitch_
@@ -2,84 +2,142 @@
 Functions for generating isorhythmic constructions from pitch and rhythm sequences.
 """
 
+from __future__ import annotations
+
 import copy
+import itertools
 import numbers
-from typing import Optional, Union, Sequence
-
-from music21 import stream
-from music21 import duration
-from music21 import pitch
-from music21 import note
-from music21 import chord
+from typing import Any, Callable, Iterable, Iterator, Optional, Union, Sequence
 
+from arvo import _lazy
+from arvo import cache
+from arvo import instrument
 from arvo import tools
 
+stream = _lazy.load("music21.stream")
+duration = _lazy.load("music21.duration")
+pitch = _lazy.load("music21.pitch")
+note = _lazy.load("music21.note")
+chord = _lazy.load("music21.chord")
+plans = _lazy.load("arvo.plans")
+
 
 __all__ = ["create_isorhythm"]
 
 
+@instrument.instrumented
+@cache.cached
 def create_isorhythm(
     pitches: Union[
-        stream.Stream, Sequence[Union[numbers.Number, str, pitch.Pitch, note.Note, chord.Chord]]
+        stream.Stream,
+        tools.NoteIndex,
+        Iterable[Union[numbers.Number, str, pitch.Pitch, note.Note, chord.Chord]],
     ],
     durations: Union[
-        stream.Stream, Sequence[Union[numbers.Number, duration.Duration, note.Note, chord.Chord]]
+        stream.Stream,
+        tools.NoteIndex,
+        Iterable[Union[numbers.Number, duration.Duration, note.Note, chord.Chord]],
     ],
     length: Optional[int] = None,
+    lazy: bool = False,
 ) -> stream.Stream:
 
     """Creates an isorhythmic construction from pitches and durations sequences.
 
     Args:
-        pitches: The stream or Sequence containing pitch information. Sequence can consist of
-          pitch classes (0-11), midi note numbers (12+), note names (str), music21 Pitch objects
-          or music21 Note objects.
-        durations: The stream or Sequence containing duration information. Sequence can consist
-          of numeric values (1 = quarter note), music21 Duration objects or music21 Note objects.
+        pitches: The stream, NoteIndex or Sequence containing pitch information. Sequence can
+          consist of pitch classes (0-11), midi note numbers (12+), note names (str), music21
+          Pitch objects or music21 Note objects. Other iterables, such as generators, are
+          consumed lazily without looping.
+        durations: The stream, NoteIndex or Sequence containing duration information. Sequence
+          can consist of numeric values (1 = quarter note), music21 Duration objects or music21
+          Note objects. Other iterables, such as generators built with the sequences module, are
+          consumed lazily without looping.
         length: Optional; The length of the resulting stream, expressed in isorhythmic elements.
           By default, the process continues until the cycle is completed. For example, provided a
           color of 5 pitches and a talea of 7 rhythms, this function will, by default, return an
-          isorhythm of 35 elements.
+          isorhythm of 35 elements. Required if pitches or durations are iterators; the process
+          also stops if they are exhausted.
+        lazy: Optional; If true, returns a plans.ProcessStream, whose notes are only built when
+          its elements are accessed. Each talea cycle is an iteration of the stream. Default is
+          False.
 
     Returns:
         The stream created by the isorhythmic process.
+
+    Raises:
+        TypeError: If an item of an iterator of pitches or durations can't be converted.
     """
 
-    # Create pitches list
-    if not isinstance(pitches, stream.Stream):
-        pitches = tools.notes_to_stream(pitches)
-    color_list = []
-    for element in pitches.flat.notes:
-        color_list.append(element)
+    # Create pitches values. Streams and sequences loop, while other iterables (such as
+    # generators) are consumed lazily without looping.
+    if not isinstance(pitches, (stream.Stream, tools.NoteIndex, Sequence)):
+        colors, color_period = _converted(pitches, tools.to_note, "pitch"), None
+    else:
+        if not isinstance(pitches, (stream.Stream, tools.NoteIndex)):
+            pitches = tools.notes_to_stream(pitches)
+        color_list = list(tools.note_index(pitches).notes)
+        colors, color_period = itertools.cycle(color_list), len(color_list)
 
-    # Create durations list
-    if not isinstance(durations, stream.Stream):
-        durations = tools.durations_to_stream(durations)
-    talea_list = []
-    for element in durations.flat.notes:
-        talea_list.append(element.duration)
+    # Create durations values. When the talea is known, the offsets are computed in integer ticks.
+    ppq = None
+    if not isinstance(durations, (stream.Stream, tools.NoteIndex, Sequence)):
+        taleas, talea_period = _converted(durations, tools.to_duration, "duration"), None
+    else:
+        if not isinstance(durations, (stream.Stream, tools.NoteIndex)):
+            durations = tools.durations_to_stream(durations)
+        talea_list = [element.duration for element in tools.note_index(durations).notes]
+        taleas, talea_period = itertools.cycle(talea_list), len(talea_list)
+        ppq = tools.ticks_per_quarter(talea.quarterLength for talea in talea_list)
+
+    if length is None and (color_period is None or talea_period is None):
+        raise ValueError("length must be provided when pitches or durations are iterators")
 
     # Initialize function variables
-    color_index = 0
-    talea_index = 0
-    current_length = 0
-    post_stream = stream.Stream()
+    builder = tools.StreamBuilder(ppq=ppq)
+    plan = None
+    if lazy:
+        # Looping colors and taleas are recorded once, and referred to by index
+        plan = plans.Plan(
+            color_list if color_period is not None else (),
+            talea_list if talea_period is not None else (),
+        )
 
     # Loop
-    while True:
-        current_element = copy.deepcopy(color_list[color_index])
-        current_element.duration = talea_list[talea_index]
-        post_stream.append(current_element)
-        color_index += 1
-        if color_index == len(color_list):
-            color_index = 0
-        talea_index += 1
-        if talea_index == len(talea_list):
-            talea_index = 0
-        current_length += 1
-        if length is None and color_index == 0 and talea_index == 0:
+    for current_length, (color, talea) in enumerate(zip(colors, taleas), 1):
+        if plan is not None:
+            plan.append(
+                (current_length - 1) % color_period
+                if color_period is not None
+                else plan.add_note(copy.deepcopy(color)),
+                (current_length - 1) % talea_period
+                if talea_period is not None
+                else plan.add_duration(talea),
+            )
+            if talea_period is not None and current_length % talea_period == 0:
+                plan.end_iteration()
+        else:
+            current_element = copy.deepcopy(color)
+            current_element.duration = talea
+            builder.append(current_element)
+        if (
+            length is None
+            and current_length % color_period == 0
+            and current_length % talea_period == 0
+        ):
             break
         if length is not None and current_length == length:
             break
 
-    return post_stream
+    if plan is not None:
+        return plans.ProcessStream(plan)
+    return builder.commit()
+
+
+def _converted(values: Iterable[Any], convert: Callable[[Any], Any], kind: str) -> Iterator[Any]:
+    # Converts the items of an iterator as they are consumed, rejecting the unsupported ones
+    for value in values:
+        converted = convert(value)
+        if converted is None:
+            raise TypeError(f"cannot convert {value!r} to a {kind}")
+        yield converted
@@ -0,0 +1,201 @@
+"""
+Module for playing arvo material live.
+
+play() turns notes into timestamped note-on and note-off events, and sends them in real time to a
+sink: any callable taking a LiveEvent, such as a function forwarding them to a MIDI port:
+
+    port = mido.open_output()
+
+    def sink(event):
+        port.send(mido.Message(event.type, note=event.pitch, velocity=event.velocity))
+
+    live.play(minimalism.additive_process(pattern), sink, bpm=96)
+
+The material can be a stream, or an iterable producing notes and streams one after another, so
+that sections can be generated while the previous ones are playing. It is consumed a little ahead
+of time, within a lookahead window, and events are sent when they are due according to a
+monotonic clock.
+"""
+
+from __future__ import annotations
+
+import collections
+import heapq
+import math
+import statistics
+import time
+from typing import Callable, Iterable, Iterator, NamedTuple, Union
+
+from arvo import _lazy
+from arvo import io
+from arvo import tools
+
+note = _lazy.load("music21.note")
+stream = _lazy.load("music21.stream")
+
+
+__all__ = ["LiveEvent", "PlaybackStats", "play"]
+
+# Events due in less than this many seconds are sent without waiting, as sleeping for shorter
+# times is unreliable.
+_TOLERANCE = 1e-6
+
+
+class LiveEvent(NamedTuple):
+    """Note-on or note-off event.
+
+    Attributes:
+        time: The time of the event in seconds, from the start of the playback.
+        type: "note_on" or "note_off".
+        pitch: The MIDI note number.
+        velocity: The velocity of the event, 0 for note-offs.
+    """
+
+    time: float
+    type: str
+    pitch: int
+    velocity: int
+
+
+class PlaybackStats(NamedTuple):
+    """Timing statistics of a playback.
+
+    Jitter is the delay between the time an event was due and the time it was sent, in seconds.
+
+    Attributes:
+        events: The number of events sent.
+        mean_jitter: The mean jitter.
+        max_jitter: The maximum jitter.
+        stdev_jitter: The standard deviation of the jitter.
+    """
+
+    events: int
+    mean_jitter: float
+    max_jitter: float
+    stdev_jitter: float
+
+
+def play(
+    material: Union[stream.Stream, tools.NoteIndex, io.EventTable, Iterable],
+    sink: Callable[[LiveEvent], object],
+    bpm: float = 120,
+    lookahead: float = 0.1,
+    velocity: int = 90,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], object] = time.sleep,
+) -> PlaybackStats:
+    """Plays material in real time, sending its note events to a sink.
+
+    Tied notes are merged, and pitches are rounded to the nearest semitone.
+
+    Args:
+        material: A stream, NoteIndex or EventTable, or an iterable of notes, chords, rests and
+          streams, which are played one after another.
+        sink: The function receiving the events.
+        bpm: Optional; The tempo, in quarter notes per minute. Default is 120.
+        lookahead: Optional; How far ahead of time the material is consumed, in seconds. The first
+          events are sent after this delay. Default is 0.1.
+        velocity: Optional; The velocity of the note-on events. Default is 90.
+        clock: Optional; The clock, returning seconds. Default is time.monotonic.
+        sleep: Optional; The function waiting a number of seconds. Default is time.sleep.
+
+    Returns:
+        The timing statistics of the playback.
+    """
+    seconds_per_quarter = 60 / bpm
+    timeline = _timeline(material, velocity)
+    pending = collections.deque()
+    jitters = []
+    start = clock() + lookahead
+    exhausted = False
+    while True:
+        now = clock() - start
+        # Consume the material up to the end of the lookahead window
+        while not exhausted and (not pending or pending[-1].time <= now + lookahead):
+            timed_event = next(timeline, None)
+            if timed_event is None:
+                exhausted = True
+            else:
+                offset, type_, pitch_, event_velocity = timed_event
+                pending.append(
+                    LiveEvent(float(offset) * seconds_per_quarter, type_, pitch_, event_velocity)
+                )
+        if not pending:
+            break
+        delay = pending[0].time - now
+        if delay > _TOLERANCE:
+            sleep(min(delay, lookahead))
+            continue
+        event = pending.popleft()
+        jitters.append(max(-delay, 0.0))
+        sink(event)
+    if not jitters:
+        return PlaybackStats(0, 0.0, 0.0, 0.0)
+    return PlaybackStats(
+        len(jitters),
+        statistics.fmean(jitters),
+        max(jitters),
+        statistics.pstdev(jitters),
+    )
+
+
+def _timeline(material, velocity: int) -> Iterator[tuple]:
+    # Generates the (offset, type, pitch, velocity) tuples of the note events of the material, in
+    # time order. Note-offs come before note-ons at the same offset.
+    note_offs = []
+    for offset, quarter_length, pitches, tie_type in _notes(material):
+        while note_offs and note_offs[0][0] <= offset:
+            end, pitch_ = heapq.heappop(note_offs)
+            yield end, "note_off", pitch_, 0
+        for pitch_ in pitches:
+            if tie_type not in ("stop", "continue"):
+                yield offset, "note_on", pitch_, velocity
+            if tie_type not in ("start", "continue"):
+                heapq.heappush(note_offs, (offset + quarter_length, pitch_))
+    while note_offs:
+        end, pitch_ = heapq.heappop(note_offs)
+        yield end, "note_off", pitch_, 0
+
+
+def _notes(material) -> Iterator[tuple]:
+    # Generates the (offset, quarter length, MIDI pitches, tie type) tuples of the notes, chords
+    # and rests of the material, by offset.
+    if isinstance(material, io.EventTable):
+        yield from _table_notes(material, 0)
+        return
+    if isinstance(material, (stream.Stream, tools.NoteIndex)):
+        material = [material]
+    position = 0
+    for item in material:
+        if isinstance(item, (stream.Stream, tools.NoteIndex, io.EventTable)):
+            if not isinstance(item, io.EventTable):
+                item = io.EventTable.from_stream(item)
+            yield from _table_notes(item, position)
+            position += item.highest_time
+        elif isinstance(item, note.GeneralNote):
+            pitches = [_midi(pitch_.ps) for pitch_ in getattr(item, "pitches", ())]
+            tie_type = None if item.tie is None else item.tie.type
+            yield position, item.duration.quarterLength, pitches, tie_type
+            position += item.duration.quarterLength
+        else:
+            raise TypeError(f"cannot play {type(item).__name__} objects")
+
+
+def _table_notes(events: io.EventTable, position) -> Iterator[tuple]:
+    first_row = 0
+    for row in range(len(events)):
+        if row and events["event"][row] != events["event"][row - 1]:
+            first_row = row
+        # Chords are complete on their last row
+        if row + 1 < len(events) and events["event"][row + 1] == events["event"][row]:
+            continue
+        if events["kind"][row] == io.REST:
+            continue
+        offset = position + events["offset"][row] / events.ppq
+        quarter_length = events["duration"][row] / events.ppq
+        pitches = [_midi(ps) for ps in events["midi"][first_row:row + 1]]
+        yield offset, quarter_length, pitches, io.TIES[events["tie"][row]]
+
+
+def _midi(ps: float) -> int:
+    return int(math.floor(ps + 0.5))
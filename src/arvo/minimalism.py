@@ -2,16 +2,25 @@
 Module for generative mathematical processes, such addition or subtraction.
 """
 
+from __future__ import annotations
+
 import math
 import copy
 import enum
-from typing import Optional, Union, Sequence
-
-from music21 import stream
+import itertools
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
+from arvo import _lazy
+from arvo import cache
+from arvo import distributions
+from arvo import instrument
 from arvo import sequences
 from arvo import tools
 
+numpy = _lazy.load("numpy")
+stream = _lazy.load("music21.stream")
+plans = _lazy.load("arvo.plans")
+
 
 __all__ = [
     "Direction",
@@ -51,14 +60,21 @@ class StepMode(enum.Enum):
     ABSOLUTE = 2
 
 
+@instrument.instrumented
+@cache.cached
 def additive_process(
-    original_stream: stream.Stream,
-    direction: Direction = Direction.FORWARD,
-    step_value: Union[int, Sequence[int]] = 1,
+    original_stream: Union[stream.Stream, tools.NoteIndex],
+    direction: Union[
+        Direction, Iterable[Direction], distributions.Distribution
+    ] = Direction.FORWARD,
+    step_value: Union[int, Iterable[int], distributions.Distribution] = 1,
     step_mode: StepMode = StepMode.RELATIVE,
-    repetitions: Union[int, Sequence[int]] = 1,
+    repetitions: Union[int, Iterable[int], distributions.Distribution] = 1,
     iterations_start: Optional[int] = None,
     iterations_end: Optional[int] = None,
+    progress: Optional[Callable[[int], Any]] = None,
+    lazy: bool = False,
+    seed: Optional[int] = None,
 ) -> stream.Stream:
     """Applies an additive process to a stream.
 
@@ -66,55 +82,67 @@ def additive_process(
     chord objects are included.
 
     Args:
-        original_stream: The original stream to process.
+        original_stream: The original stream to process, or its NoteIndex.
         direction: Optional; Determines the direction of the additive process. Default is FORWARD.
+          If provided a sequence of directions or a distribution, the direction changes each
+          iteration, as the step parameter does.
         step_value: Optional; Determines the number of elements added each iteration. Default is
-          1. If provided a sequence of numbers (for example, sequences.PRIMES), the step parameter
-          will cycle through the sequence each iteration, looping if it reaches the end of the
-          sequence.
+          1. If provided a sequence of numbers, the step parameter will cycle through the sequence
+          each iteration, looping if it reaches the end of the sequence. Unbounded sequences (for
+          example, sequences.PRIMES) and iterators are consumed without looping, and the process
+          stops if they are exhausted. If provided a distribution (see the distributions module),
+          a step is drawn each iteration, and ABSOLUTE mode requires iterations_end.
         step_mode: Optional; Determines the step mode. In RELATIVE mode, step determines the
           amount of elements added each iteration relative to the previous iteration. In
           ABSOLUTE mode, step determines the amount of elements added each iteration relative
-          to the starting point.
+          to the starting point. Unless iterations_end is set, a process in ABSOLUTE mode stops
+          after one cycle of a looping step sequence, and once the values of an unbounded
+          sequence or iterator stop increasing.
         repetitions: Optional; Determines the number of times each segment is repeated before
-          moving to the next iteration. Default is 1. If provided a sequence of numbers (for
-          example, sequences.PRIMES), the repetitions parameter will cycle through the sequence
-          each iteration, looping if it reaches the end of the sequence.
+          moving to the next iteration. Default is 1. If provided a sequence of numbers, the
+          repetitions parameter will cycle through the sequence each iteration, looping if it
+          reaches the end of the sequence. Unbounded sequences and iterators are consumed without
+          looping. If provided a distribution, a number is drawn each iteration.
         iterations_start: Optional; Starts the process at the specified iteration. By default,
           additive processes start at iteration 1.
         iterations_end: Optional; Stops the process at the specified iteration. By default, the
           process runs until the original stream is completed or an infinite loop is detected.
+        progress: Optional; A function called with the number of completed iterations after each
+          iteration. It can stop the process by raising an exception.
+        lazy: Optional; If true, returns a plans.ProcessStream, whose notes are only built when
+          its elements are accessed. Default is False.
+        seed: Optional; The seed of the random generators the distributions are drawn from. The
+          same seed always gives the same result. By default, the result is unpredictable.
     Returns:
         The new stream created by the additive process.
-    """
 
-    # Check step type and initialize step sequence.
-    if isinstance(step_value, int):
-        step_sequence = [step_value]
-    elif isinstance(step_value, Sequence):
-        step_sequence = step_value
-    step_index = 0
+    Raises:
+        ValueError: If the step values are drawn from a distribution in ABSOLUTE mode, without
+          iterations_end.
+    """
 
-    # Check repetitions type and initialize repetitions sequence.
-    if isinstance(repetitions, int):
-        repetitions_sequence = [repetitions]
-    elif isinstance(repetitions, Sequence):
-        repetitions_sequence = repetitions
-    repetitions_index = 0
+    # Initialize step, repetitions and direction values.
+    _check_step_value(step_value, step_mode, iterations_end)
+    (step_values, step_period), (repetitions_values, _), (directions, _) = _process_parameters(
+        seed, step_value, repetitions, direction
+    )
 
     # Initialize function variables.
-    post_stream = stream.Stream()
-    original_notes = original_stream.flat.notes
+    original_notes = tools.note_index(original_stream)
     original_length = len(original_notes)
+    ppq = _ticks_per_quarter(original_notes)
+    builder = tools.StreamBuilder(ppq=ppq)
+    plan = plans.Plan(original_notes.notes) if lazy else None
     iteration_index = 0
     position1 = 0
     position2 = 0
-    current_length = step_sequence[0]
+    current_length = next(step_values)
     completed = False
 
     while not completed:
-        current_stream = stream.Stream()
-
+        direction = next(directions, None)
+        if direction is None:
+            break
         # Determine boundaries of segment to use for the current iteration, depending on direction.
         if direction is Direction.FORWARD:
             position1 = 0
@@ -153,53 +181,69 @@ def additive_process(
 
         # Build the current iteration, repeating the segment the amount of times defined
         # #by the repetitions sequence.
+        repetition_count = next(repetitions_values, None)
+        if repetition_count is None:
+            break
         if iterations_start is None or iteration_index + 1 >= iterations_start:
-            for _ in range(repetitions_sequence[repetitions_index]):
-                if direction == Direction.INWARD:
-                    for i in range(0, position1):
-                        current_stream.append(copy.deepcopy(original_notes[i]))
-                    for i in range(position2, original_length):
-                        current_stream.append(copy.deepcopy(original_notes[i]))
-                else:
-                    for i in range(position1, position2):
-                        current_stream.append(copy.deepcopy(original_notes[i]))
-
-        # Add iteration to final sequence.
-        tools.append_stream(post_stream, current_stream)
+            if direction == Direction.INWARD:
+                segments = (range(0, position1), range(position2, original_length))
+            else:
+                segments = (range(position1, position2),)
+            for _ in range(repetition_count):
+                for segment in segments:
+                    _add_segment(builder, plan, original_notes, segment)
+            if plan is not None:
+                plan.end_iteration()
 
         # Increment iteration index, stopping if iterations parameter has been set and reached.
         iteration_index += 1
         if iterations_end is not None and iteration_index == iterations_end:
             completed = True
+        if progress is not None:
+            progress(iteration_index)
+
+        # Infinite loop check: in ABSOLUTE mode, stop once a looping step sequence wraps around.
+        if (
+            iterations_end is None
+            and step_mode == StepMode.ABSOLUTE
+            and step_period is not None
+            and iteration_index % step_period == 0
+        ):
+            completed = True
 
-        # Increment step and repetition indexes, looping if the end of the sequence is reached.
-        step_index += 1
-        if step_index > len(step_sequence) - 1:
-            step_index = 0
-            # Infinite loop check
-            if iterations_end is None and step_mode == StepMode.ABSOLUTE:
-                completed = True
-        repetitions_index += 1
-        if repetitions_index > len(repetitions_sequence) - 1:
-            repetitions_index = 0
-
-        # Update segment length
-        if step_mode == StepMode.RELATIVE:
-            current_length += step_sequence[step_index]
+        # Update segment length, stopping if the step values are exhausted. In ABSOLUTE mode, step
+        # values that don't loop stop the process once they stop increasing, as they might never
+        # reach the end of the stream.
+        step = next(step_values, None)
+        if step is None:
+            completed = True
+        elif step_mode == StepMode.RELATIVE:
+            current_length += step
         elif step_mode == StepMode.ABSOLUTE:
-            current_length = step_sequence[step_index]
+            if iterations_end is None and step_period is None and step <= current_length:
+                completed = True
+            current_length = step
 
-    return post_stream
+    if plan is not None:
+        return plans.ProcessStream(plan)
+    return builder.commit()
 
 
+@instrument.instrumented
+@cache.cached
 def subtractive_process(
-    original_stream: stream.Stream,
-    direction: Direction = Direction.FORWARD,
-    step_value: Union[int, Sequence[int]] = 1,
+    original_stream: Union[stream.Stream, tools.NoteIndex],
+    direction: Union[
+        Direction, Iterable[Direction], distributions.Distribution
+    ] = Direction.FORWARD,
+    step_value: Union[int, Iterable[int], distributions.Distribution] = 1,
     step_mode: StepMode = StepMode.RELATIVE,
-    repetitions: Union[int, Sequence[int]] = 1,
+    repetitions: Union[int, Iterable[int], distributions.Distribution] = 1,
     iterations_start: Optional[int] = None,
     iterations_end: Optional[int] = None,
+    progress: Optional[Callable[[int], Any]] = None,
+    lazy: bool = False,
+    seed: Optional[int] = None,
 ) -> stream.Stream:
     """Applies an subtractive process to a stream.
 
@@ -207,50 +251,61 @@ def subtractive_process(
     chord objects are included.
 
     Args:
-        stream: The original stream to process.
+        original_stream: The original stream to process, or its NoteIndex.
         direction: Optional; The direction of the subtractive process. Default is Direction.FORWARD.
+          If provided a sequence of directions or a distribution, the direction changes each
+          iteration, as the step parameter does.
         step_value: Optional; Determines the number of elements subtracted each iteration. Default
-         is 1. If provided a sequence of numbers (for example, sequences.PRIMES), the step
-         parameter will cycle through the sequence each iteration, looping if it reaches the
-         end of the sequence.
+         is 1. If provided a sequence of numbers, the step parameter will cycle through the
+         sequence each iteration, looping if it reaches the end of the sequence. Unbounded
+         sequences (for example, sequences.PRIMES) and iterators are consumed without looping,
+         and the process stops if they are exhausted. If provided a distribution (see the
+         distributions module), a step is drawn each iteration, and ABSOLUTE mode requires
+         iterations_end.
         step_mode: Optional; Determines the step mode. In RELATIVE mode, step determines the amount
           of elements subtracted each iteration relative to the previous iteration. In ABSOLUTE
           mode, step determines the amount of elements subtracted each iteration relative to the
-          starting point.
+          starting point. Unless iterations_end is set, a process in ABSOLUTE mode stops after one
+          cycle of a looping step sequence, and once the values of an unbounded sequence or
+          iterator stop increasing.
         repetitions: Optional; Determines the number of times each segment is repeated before moving
-          to the next iteration. Default is 1. If provided a sequence of numbers (for example,
-          sequences.PRIMES), the repetitions parameter will cycle through the sequence each
-          iteration, looping if it reaches the end of the sequence.
+          to the next iteration. Default is 1. If provided a sequence of numbers, the repetitions
+          parameter will cycle through the sequence each iteration, looping if it reaches the end
+          of the sequence. Unbounded sequences and iterators are consumed without looping. If
+          provided a distribution, a number is drawn each iteration.
         iterations_start: Optional; Starts the process at the specified iteration. By default
           subtractive processes start at iteration 0.
         iterations_end: Optional; Determines the number of iterations to do before the process
           stops. By default, the process runs until the original stream disappears. Note that the
           subtractive process starts with the complete stream, so the first iteration results in
           the second segment.
+        progress: Optional; A function called with the number of completed iterations after each
+          iteration. It can stop the process by raising an exception.
+        lazy: Optional; If true, returns a plans.ProcessStream, whose notes are only built when
+          its elements are accessed. Default is False.
+        seed: Optional; The seed of the random generators the distributions are drawn from. The
+          same seed always gives the same result. By default, the result is unpredictable.
 
     Returns:
         The new stream created by the subtractive process.
 
+    Raises:
+        ValueError: If the step values are drawn from a distribution in ABSOLUTE mode, without
+          iterations_end.
     """
 
-    # Check step type and initialize step sequence.
-    if isinstance(step_value, int):
-        step_sequence = [step_value]
-    elif isinstance(step_value, Sequence):
-        step_sequence = step_value
-    step_index = -1
-
-    # Check repetitions type and initialize repetitions sequence.
-    if isinstance(repetitions, int):
-        repetitions_sequence = [repetitions]
-    elif isinstance(repetitions, Sequence):
-        repetitions_sequence = repetitions
-    repetitions_index = 0
+    # Initialize step, repetitions and direction values.
+    _check_step_value(step_value, step_mode, iterations_end)
+    (step_values, step_period), (repetitions_values, _), (directions, _) = _process_parameters(
+        seed, step_value, repetitions, direction
+    )
 
     # Initialize function variables.
-    post_stream = stream.Stream()
-    original_notes = original_stream.flat.notes
+    original_notes = tools.note_index(original_stream)
     original_length = len(original_notes)
+    ppq = _ticks_per_quarter(original_notes)
+    builder = tools.StreamBuilder(ppq=ppq)
+    plan = plans.Plan(original_notes.notes) if lazy else None
     iteration_index = -1
     position1 = 0
     position2 = 0
@@ -258,8 +313,9 @@ def subtractive_process(
     completed = False
 
     while not completed:
-        current_stream = stream.Stream()
-
+        direction = next(directions, None)
+        if direction is None:
+            break
         # Determine boundaries of segment to use for the current iteration, depending on direction.
         if direction is Direction.FORWARD:
             position1 = current_length
@@ -300,55 +356,128 @@ def subtractive_process(
 
         # Build the current iteration, repeating the segment the amount of times defined
         # by the repetitions sequence.
+        repetition_count = next(repetitions_values, None)
+        if repetition_count is None:
+            break
         if iterations_start is None or iteration_index + 1 >= iterations_start:
-            for _ in range(repetitions_sequence[repetitions_index]):
-                if direction is Direction.OUTWARD:
-                    for i in range(0, position1):
-                        current_stream.append(copy.deepcopy(original_notes[i]))
-                    for i in range(position2, original_length):
-                        current_stream.append(copy.deepcopy(original_notes[i]))
-                else:
-                    for i in range(position1, position2):
-                        current_stream.append(copy.deepcopy(original_notes[i]))
-
-        # Add iteration to final sequence.
-        tools.append_stream(post_stream, current_stream)
+            if direction is Direction.OUTWARD:
+                segments = (range(0, position1), range(position2, original_length))
+            else:
+                segments = (range(position1, position2),)
+            for _ in range(repetition_count):
+                for segment in segments:
+                    _add_segment(builder, plan, original_notes, segment)
+            if plan is not None:
+                plan.end_iteration()
 
         # Increment iteration index, stopping if iterations parameter has been set and reached.
         iteration_index += 1
         if iterations_end is not None and iteration_index == iterations_end:
             completed = True
+        if progress is not None:
+            progress(iteration_index + 1)
+
+        # Infinite loop check: in ABSOLUTE mode, stop once a looping step sequence wraps around.
+        if (
+            iterations_end is None
+            and step_mode == StepMode.ABSOLUTE
+            and step_period is not None
+            and iteration_index > 0
+            and iteration_index % step_period == 0
+        ):
+            completed = True
 
-        # Increment step and repetition indexes, looping if the end of the sequence is reached.
-        step_index += 1
-        if step_index > len(step_sequence) - 1:
-            step_index = 0
-            # Infinite loop check
-            if iterations_end is None and step_mode == StepMode.ABSOLUTE:
-                completed = True
-        repetitions_index += 1
-        if repetitions_index > len(repetitions_sequence) - 1:
-            repetitions_index = 0
-
-        # Update segment length
-        if step_mode == StepMode.RELATIVE:
-            current_length += step_sequence[step_index]
+        # Update segment length, stopping if the step values are exhausted. In ABSOLUTE mode, step
+        # values that don't loop stop the process once they stop increasing, as they might never
+        # reach the end of the stream.
+        step = next(step_values, None)
+        if step is None:
+            completed = True
+        elif step_mode == StepMode.RELATIVE:
+            current_length += step
         elif step_mode == StepMode.ABSOLUTE:
-            current_length = step_sequence[step_index]
-
-    return post_stream
+            if iterations_end is None and step_period is None and step <= current_length:
+                completed = True
+            current_length = step
+
+    if plan is not None:
+        return plans.ProcessStream(plan)
+    return builder.commit()
+
+
+def _add_segment(
+    builder: tools.StreamBuilder,
+    plan: Optional[plans.Plan],
+    notes: tools.NoteIndex,
+    segment: range,
+):
+    # Copies a segment of the original notes to the result, or records it in the plan of a lazy
+    # result.
+    if plan is not None:
+        plan.extend(segment)
+    else:
+        for i in segment:
+            builder.append(copy.deepcopy(notes[i]))
+
+
+def _ticks_per_quarter(notes: tools.NoteIndex) -> int:
+    # The processes only reorder the original notes, so their durations define the timeline.
+    return tools.ticks_per_quarter(note_.duration.quarterLength for note_ in notes)
+
+
+def _check_step_value(step_value: Any, step_mode: StepMode, iterations_end: Optional[int]):
+    # In ABSOLUTE mode, a process stops once its segment covers the stream, which random steps
+    # might never do, so drawing them needs a number of iterations.
+    if (
+        isinstance(step_value, distributions.Distribution)
+        and step_mode == StepMode.ABSOLUTE
+        and iterations_end is None
+    ):
+        raise ValueError(f"steps drawn from {step_value!r} need iterations_end in ABSOLUTE mode")
+
+
+def _process_parameters(
+    seed: Optional[int], *values: Any
+) -> List[Tuple[Iterator[Any], Optional[int]]]:
+    # Returns the values of the parameters of a process. Each parameter drawn from a distribution
+    # gets its own generator, so that its values only depend on the seed.
+    if any(isinstance(value, distributions.Distribution) for value in values):
+        generators = distributions.generators(seed, len(values))
+    else:
+        generators = [None] * len(values)
+    return [_parameter_values(value, generator) for value, generator in zip(values, generators)]
+
+
+def _parameter_values(
+    value: Union[int, Direction, Iterable[Any], distributions.Distribution],
+    generator: Optional[numpy.random.Generator] = None,
+) -> Tuple[Iterator[Any], Optional[int]]:
+    # Returns an iterator over the successive values of a process parameter, along with the
+    # period after which the values loop. Finite sequences loop, while other iterables (such as
+    # the unbounded sequences of the sequences module) are consumed without looping, and
+    # distributions are drawn from the generator.
+    if isinstance(value, (int, Direction)):
+        return itertools.repeat(value), 1
+    if isinstance(value, distributions.Distribution):
+        return value.values(generator), None
+    if isinstance(value, Sequence):
+        return itertools.cycle(value), len(value)
+    return iter(value), None
 
 
 # !! scanning_process is in a development state !!
+@instrument.instrumented
+@cache.cached
 def scanning_process(
-    original_stream: stream.Stream,
+    original_stream: Union[stream.Stream, tools.NoteIndex],
     direction: Direction = Direction.FORWARD,
-    step_value: Union[int, Sequence[int]] = 1,
+    step_value: Union[int, Iterable[int]] = 1,
     step_mode: StepMode = StepMode.RELATIVE,
     window_size: Union[int, Sequence[int]] = 2,
-    repetitions: Union[int, Sequence[int]] = 1,
+    repetitions: Union[int, Iterable[int]] = 1,
     iterations_start: Optional[int] = None,
     iterations_end: Optional[int] = None,
+    progress: Optional[Callable[[int], Any]] = None,
 ) -> stream.Stream:
     """Applies a scanning process to a stream.
 
@@ -361,7 +490,7 @@ def scanning_process(
     TODO: include list[int] option for window_size
 
     Args:
-        original_stream: The original stream to process.
+        original_stream: The original stream to process, or its NoteIndex.
         direction: Optional; The direction of the scanning process. Default is Direction.FORWARD.
         sequence: Optional; Determines the number sequence governing the starting position of the
           window for each step of the scanning process.
@@ -376,22 +505,25 @@ def scanning_process(
           scanning processes start at iteration 1.
         iterations_end: Optional; Stops the process at the specified iteration. By default, the
           process runs until the original stream is entierly traversed.
+        progress: Optional; A function called with the number of completed iterations after each
+          iteration. It can stop the process by raising an exception.
 
 
     Returns:
         The new stream created by the subtractive process.
     """
 
-    post_stream = stream.Stream()
-    original_notes = original_stream.flat.notes
+    original_notes = tools.note_index(original_stream)
     original_length = len(original_notes)
+    ppq = _ticks_per_quarter(original_notes)
+    builder = tools.StreamBuilder(ppq=ppq)
     progression_index = 0
     start_position = 0
     end_position = 0
     current_position = 0
 
     while current_position < original_length:
-        current_stream = stream.Stream()
+        current_segment = tools.StreamBuilder(ppq=ppq)
         if direction is Direction.FORWARD:
             start_position = current_position
             end_position = current_position + window_size
@@ -403,12 +535,14 @@ def scanning_process(
         if end_position > original_length:
             end_position = original_length
         for i in range(start_position, end_position):
-            current_stream.append(copy.deepcopy(original_notes[i]))
-        post_stream.append(current_stream)
+            current_segment.append(copy.deepcopy(original_notes[i]))
+        builder.append(current_segment.commit())
         progression_index += 1
+        if progress is not None:
+            progress(progression_index)
         if isinstance(step_value, int):
             current_position = progression_index * step_value
 
         #current_position = sequence(progression_index)
 
-    return post_stream
+    return builder.commit()
@@ -0,0 +1,290 @@
+"""
+Lazy streams generated by the processes.
+
+Called with lazy=True, the processes of the minimalism module and create_isorhythm() don't
+build their output: they record a plan, the sequence of source notes to copy, and return a
+ProcessStream. Its length, highest time and duration are computed from the plan, and passing it
+to another process only indexes the plan. The notes are built the first time the elements of
+the stream are accessed (iterating, indexing, flattening, writing...), or one iteration at a
+time with iteration():
+
+    section = minimalism.additive_process(pattern, lazy=True)
+    section.highestTime  # no notes built
+    for index in range(section.iteration_count):
+        play(section.iteration(index))
+
+A materialized ProcessStream is an ordinary stream, identical to the one returned without lazy.
+"""
+
+from __future__ import annotations
+
+import array
+import copy
+import fractions
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+import numpy
+from music21 import common
+from music21 import duration
+from music21 import note
+from music21 import stream
+
+from arvo import tools
+
+
+__all__ = ["Plan", "ProcessStream"]
+
+
+class Plan:
+    """Elements of a generated stream, as references to source notes.
+
+    Elements are copies of the source notes, placed one after another. Elements can also take one
+    of the source durations in place of the duration of their note.
+
+    Args:
+        notes: Optional; The source notes and chords. They are copied, so that later changes to
+          the notes don't affect the plan.
+        durations: Optional; The source durations, copied as well.
+    """
+
+    def __init__(
+        self,
+        notes: Iterable[note.GeneralNote] = (),
+        durations: Optional[Iterable[duration.Duration]] = None,
+    ):
+        self.notes: List[note.GeneralNote] = list(copy.deepcopy(tuple(notes)))
+        self.durations: Optional[List[duration.Duration]] = (
+            None if durations is None else list(copy.deepcopy(tuple(durations)))
+        )
+        self._indices = array.array("q")
+        self._duration_indices = array.array("q")
+        self._iteration_ends = array.array("q")
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def add_note(self, note_: note.GeneralNote) -> int:
+        """Adds a source note, without copying it.
+
+        Args:
+            note_: The note or chord.
+
+        Returns:
+            The index of the note in the plan.
+        """
+        self.notes.append(note_)
+        return len(self.notes) - 1
+
+    def add_duration(self, duration_: duration.Duration) -> int:
+        """Adds a source duration, without copying it.
+
+        Args:
+            duration_: The duration.
+
+        Returns:
+            The index of the duration in the plan.
+        """
+        if self.durations is None:
+            self.durations = []
+        self.durations.append(duration_)
+        return len(self.durations) - 1
+
+    def append(self, note_index: int, duration_index: Optional[int] = None):
+        """Adds an element at the end of the plan.
+
+        Args:
+            note_index: The index of the source note of the element.
+            duration_index: Optional; The index of the source duration of the element. By
+              default, the element keeps the duration of its note. Plans either give a duration
+              to all their elements or to none.
+        """
+        self._indices.append(note_index)
+        if duration_index is not None:
+            self._duration_indices.append(duration_index)
+
+    def extend(self, note_indices: Iterable[int]):
+        """Adds elements keeping the durations of their notes at the end of the plan.
+
+        Args:
+            note_indices: The indices of the source notes of the elements.
+        """
+        self._indices.extend(note_indices)
+
+    def end_iteration(self):
+        """Marks the end of an iteration of the process. Empty iterations are ignored."""
+        if len(self._indices) > (self._iteration_ends[-1] if self._iteration_ends else 0):
+            self._iteration_ends.append(len(self._indices))
+
+    def element(self, index: int) -> note.GeneralNote:
+        """Builds an element of the plan.
+
+        Args:
+            index: The index of the element.
+
+        Returns:
+            A new note or chord.
+        """
+        element = copy.deepcopy(self.notes[self._indices[index]])
+        if self._duration_indices:
+            element.duration = self.durations[self._duration_indices[index]]
+        return element
+
+    @property
+    def iteration_ends(self) -> Sequence[int]:
+        """The index of the element following each iteration. The last iteration ends with the
+        plan, even if end_iteration() wasn't called."""
+        ends = list(self._iteration_ends)
+        if not ends or ends[-1] != len(self):
+            ends.append(len(self))
+        return ends if len(self) else []
+
+
+class ProcessStream(stream.Stream):
+    """Stream built from a plan the first time its elements are accessed.
+
+    Args:
+        plan: Optional; The plan of the stream. It must not be changed afterwards. By default, the
+          stream is an empty stream.
+        **keywords: The keyword arguments of music21 streams.
+    """
+
+    # Set once the stream is initialized, and cleared when it is materialized
+    _plan: Optional[Plan] = None
+
+    def __init__(self, plan: Optional[Plan] = None, **keywords):
+        super().__init__(**keywords)
+        if plan is None:
+            return
+        if plan.durations is not None and len(plan._duration_indices):
+            source_lengths = [duration_.quarterLength for duration_ in plan.durations]
+            indices = numpy.frombuffer(plan._duration_indices, dtype=numpy.int64)
+        else:
+            source_lengths = [note_.duration.quarterLength for note_ in plan.notes]
+            indices = numpy.frombuffer(plan._indices, dtype=numpy.int64)
+        self._ppq = tools.ticks_per_quarter(source_lengths)
+        source_ticks = numpy.array(
+            [round(quarter_length * self._ppq) for quarter_length in source_lengths],
+            dtype=numpy.int64,
+        )
+        self._ticks = source_ticks[indices] if len(indices) else numpy.zeros(0, numpy.int64)
+        self._plan = plan
+
+    # music21 reaches the elements of streams through _elements, so the stream is materialized
+    # the first time it is read. Replacing the elements (as shallow copies of the stream do)
+    # discards the plan.
+    @property
+    def _elements(self) -> list:
+        if self._plan is not None:
+            self._materialize()
+        return self.__dict__["_element_list"]
+
+    @_elements.setter
+    def _elements(self, elements: list):
+        self.__dict__["_element_list"] = elements
+        self._plan = None
+
+    @property
+    def materialized(self) -> bool:
+        """Whether the elements of the stream have been built."""
+        return self._plan is None
+
+    def __len__(self) -> int:
+        if self._plan is not None:
+            return len(self._plan)
+        return super().__len__()
+
+    def __bool__(self) -> bool:
+        if self._plan is not None:
+            return len(self._plan) > 0
+        return super().__bool__()
+
+    def __deepcopy__(self, memo=None):
+        if self._plan is None:
+            return super().__deepcopy__(memo)
+        # Copies of a pending stream share its plan, which doesn't change, and stay pending
+        memo = {} if memo is None else memo
+        memo[id(self._plan)] = self._plan
+        return self._deepcopySubclassable(memo, removeFromIgnore={"_elements"})
+
+    def _deepcopySubclassable(self, memo=None, ignoreAttributes=None, removeFromIgnore=None):
+        # The elements are copied by music21, not with the other attributes
+        ignoreAttributes = {"_element_list"} | (ignoreAttributes or set())
+        return super()._deepcopySubclassable(memo, ignoreAttributes, removeFromIgnore)
+
+    @property
+    def highestTime(self):
+        if self._plan is not None:
+            return common.opFrac(fractions.Fraction(int(self._ticks.sum()), self._ppq))
+        return super().highestTime
+
+    @property
+    def iteration_count(self) -> int:
+        """The number of iterations of the process."""
+        if self._plan is None:
+            return 1 if len(self) else 0
+        return len(self._plan.iteration_ends)
+
+    def iteration(self, index: int) -> stream.Stream:
+        """Builds one iteration of the process, without materializing the stream.
+
+        Once the stream is materialized, the whole stream is its only iteration.
+
+        Args:
+            index: The index of the iteration, from 0.
+
+        Returns:
+            A new Stream containing the notes of the iteration, starting at offset 0.
+
+        Raises:
+            IndexError: If there is no such iteration.
+        """
+        if self._plan is None:
+            if index != 0 or not len(self):
+                raise IndexError("iteration index out of range")
+            return copy.deepcopy(self)
+        ends = self._plan.iteration_ends
+        start = 0 if index == 0 else ends[index - 1]
+        builder = tools.StreamBuilder(ppq=self._ppq)
+        for element_index in range(start, ends[index]):
+            builder.append(self._plan.element(element_index))
+        return builder.commit()
+
+    def iterations(self) -> Iterator[stream.Stream]:
+        """Generates the iterations of the process one at a time (see iteration())."""
+        for index in range(self.iteration_count):
+            yield self.iteration(index)
+
+    def note_index(self) -> tools.NoteIndex:
+        """Returns the note index of the stream.
+
+        Before the stream is materialized, the index is computed from the plan and refers to the
+        source notes of the plan, which must not be modified.
+        """
+        if self._plan is None:
+            return tools.NoteIndex(self)
+        plan = self._plan
+        if len(plan._duration_indices):
+            # Elements with their own durations need their own notes
+            elements = [plan.element(index) for index in range(len(plan))]
+        else:
+            elements = [plan.notes[index] for index in plan._indices]
+        # Note indexes leave out rests
+        is_note = numpy.fromiter(
+            (isinstance(element, note.NotRest) for element in elements), bool, len(elements)
+        )
+        offsets = (numpy.cumsum(self._ticks) - self._ticks) / self._ppq
+        return tools.NoteIndex.from_notes(
+            self,
+            [element for element, kept in zip(elements, is_note) if kept],
+            offsets[is_note],
+            self._ticks[is_note] / self._ppq,
+        )
+
+    def _materialize(self):
+        # Shallow copies share the element list, which is replaced rather than extended
+        plan = self._plan
+        self._elements = []
+        builder = tools.StreamBuilder(self, ppq=self._ppq)
+        for index in range(len(plan)):
+            builder.append(plan.element(index))
+        builder.commit()
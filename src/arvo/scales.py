@@ -2,12 +2,74 @@
 Module that extends music 21 scales system.
 """
 
-__all__ = ["AbstractPentatonicScale", "PentatonicScale"]
+__all__ = [
+    "AbstractPentatonicScale",
+    "PentatonicScale",
+    "AbstractIntervalScale",
+    "IntervalScale",
+    "ScaleSteps",
+    "locked",
+    "ScaleMatch",
+    "register",
+    "identify",
+]
+
+import contextlib
+import copy
+import functools
+import threading
+import types
+import weakref
+from typing import (
+    Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple,
+    Union,
+)
 
 import music21
+from music21 import interval
+from music21 import pitch
 from music21.scale import intervalNetwork
 
 
+def _synchronized(method: Callable) -> Callable:
+    # Runs a method of an interval network with the network locked.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with _network_state(self).lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class _IntervalNetwork(intervalNetwork.IntervalNetwork):
+    # The networks of the abstract scales of this module are shared by all the scales built on
+    # them, possibly in several threads. music21 fills caches while realizing pitches, so the
+    # methods called by scales lock the network. music21 also hands out the pitches of its cached
+    # realizations and nextPitch() then changes their octave in place, corrupting the cache, so
+    # copies are returned instead.
+    @_synchronized
+    def getPitchFromNodeDegree(self, *args, **kwargs):
+        return copy.deepcopy(super().getPitchFromNodeDegree(*args, **kwargs))
+
+    realizePitch = _synchronized(intervalNetwork.IntervalNetwork.realizePitch)
+    realizeIntervals = _synchronized(intervalNetwork.IntervalNetwork.realizeIntervals)
+    realizePitchByDegree = _synchronized(intervalNetwork.IntervalNetwork.realizePitchByDegree)
+    realizeMinMax = _synchronized(intervalNetwork.IntervalNetwork.realizeMinMax)
+    realizeTermini = _synchronized(intervalNetwork.IntervalNetwork.realizeTermini)
+    getRelativeNodeDegree = _synchronized(intervalNetwork.IntervalNetwork.getRelativeNodeDegree)
+    nextPitch = _synchronized(intervalNetwork.IntervalNetwork.nextPitch)
+    match = _synchronized(intervalNetwork.IntervalNetwork.match)
+    find = _synchronized(intervalNetwork.IntervalNetwork.find)
+    findMissing = _synchronized(intervalNetwork.IntervalNetwork.findMissing)
+
+
+@functools.lru_cache(maxsize=None)
+def _abstract_scale(abstract_class, mode):
+    # Abstract scales only depend on their type and mode, so a single instance (and its interval
+    # network) is shared by all the concrete scales built on it.
+    return abstract_class(mode=mode)
+
+
 class AbstractPentatonicScale(music21.scale.AbstractScale):
     def __init__(self, mode=None):
         super().__init__()
@@ -38,7 +100,7 @@ class AbstractPentatonicScale(music21.scale.AbstractScale):
             raise music21.scale.ScaleException(
                 f"cannot create a scale of the following mode: {mode}"
             )
-        self._net = intervalNetwork.IntervalNetwork(
+        self._net = _IntervalNetwork(
             interval_list,
             octaveDuplicating=self.octaveDuplicating,
             pitchSimplification="none",
@@ -51,5 +113,553 @@ class PentatonicScale(music21.scale.ConcreteScale):
 
     def __init__(self, tonic=None, mode=None):
         super().__init__(tonic=tonic)
-        self._abstract = AbstractPentatonicScale(mode=mode)
+        self._abstract = _abstract_scale(AbstractPentatonicScale, mode)
         self.type = "Pentatonic"
+
+
+class AbstractIntervalScale(music21.scale.AbstractScale):
+    """Octave-repeating abstract scale built from any list of intervals.
+
+    Args:
+        mode: Tuple of intervals between successive degrees, either as semitones (int) or as
+          interval names ("M2", "m3"...). If the intervals do not complete an octave, the
+          remaining interval is added.
+    """
+
+    def __init__(self, mode=None):
+        super().__init__()
+        self.type = "Abstract Interval"
+        self.octaveDuplicating = True
+        self.buildNetwork(mode=mode)
+
+    def buildNetwork(self, mode=None):
+        if not mode:
+            raise music21.scale.ScaleException("cannot create a scale without intervals")
+        interval_list = [interval.Interval(interval_) for interval_ in mode]
+        semitones = sum(interval_.semitones for interval_ in interval_list)
+        if semitones < 12:
+            interval_list.append(interval.Interval(12 - semitones))
+        elif semitones > 12:
+            raise music21.scale.ScaleException(
+                f"intervals must not exceed an octave: {mode}"
+            )
+        self.tonicDegree = 1
+        # Spell numeric intervals with the most common names, named intervals as given.
+        self._net = _IntervalNetwork(
+            [interval_.name for interval_ in interval_list],
+            octaveDuplicating=self.octaveDuplicating,
+            pitchSimplification=(
+                "mostCommon" if any(isinstance(i, int) for i in mode) else "none"
+            ),
+        )
+
+
+class _ScaleTables(NamedTuple):
+    # Degree tables of an octave-repeating scale. They are never modified, so all the copies of a
+    # scale, in all threads, share them.
+    reference_ps: float
+    semitones: Tuple[float, ...]
+    semitone_degrees: Mapping[float, int]
+    spellings: Mapping[str, Tuple[Tuple[str, Optional[str], int], ...]]
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+@functools.lru_cache(maxsize=None)
+def _scale_tables(intervals: Tuple[Union[int, str], ...], reference_name: str) -> _ScaleTables:
+    abstract = _abstract_scale(AbstractIntervalScale, intervals)
+    # Interval scales always transpose the pitches spelled as in their tables with the tables
+    return _compile_tables(abstract, pitch.Pitch(reference_name), check_network=False)
+
+
+def _compile_tables(
+    abstract: music21.scale.AbstractScale, reference: pitch.Pitch, check_network: bool = True
+) -> Optional[_ScaleTables]:
+    # Compiles the tables of an abstract scale realized from a reference pitch, or returns None if
+    # the scale doesn't repeat the same degrees and spellings in every octave, or if its network
+    # doesn't transpose them as the tables do. Realizing pitches fills the caches of the interval
+    # network, which change the results of music21 for some pitches outside the scale, so tables
+    # are compiled from a copy of the network.
+    network = abstract._net
+    if not abstract.octaveDuplicating or not network.deterministic:
+        return None
+    with _network_state(network).lock:
+        network = copy.deepcopy(network)
+    abstract = copy.copy(abstract)
+    abstract._net = network
+    ascending_pitches = abstract.getRealization(reference, abstract.tonicDegree)
+    if ascending_pitches[-1].ps - reference.ps != 12:
+        return None
+    semitones = tuple(p.ps - reference.ps for p in ascending_pitches[:-1])
+    tables = _ScaleTables(
+        reference.ps,
+        semitones,
+        types.MappingProxyType(
+            {semitones_: degree for degree, semitones_ in enumerate(semitones)}
+        ),
+        {},
+    )
+    # The interval network may spell degrees differently depending on the direction.
+    spellings = {}
+    for direction in (
+        music21.scale.DIRECTION_ASCENDING,
+        music21.scale.DIRECTION_DESCENDING,
+    ):
+        degree_pitches = abstract.getRealization(
+            reference,
+            abstract.tonicDegree,
+            minPitch=reference.transpose(-13),
+            maxPitch=reference.transpose(13),
+            direction=direction,
+        )
+        spellings[direction] = _spelling_table(tables, degree_pitches)
+        if check_network and None in spellings[direction]:
+            return None
+    tables = tables._replace(spellings=types.MappingProxyType(spellings))
+    if not check_network:
+        return tables
+    # Some networks move pitches spelled as in one direction by another interval when going in
+    # the other direction, in which case the network is used for all the pitches.
+    for table in spellings.values():
+        for degree, spelling in enumerate(table):
+            pitch_ = _spelled_pitch(spelling)
+            for steps in (1, -1):
+                next_pitch = abstract.nextPitch(
+                    reference, abstract.tonicDegree, pitch_, _direction(steps)
+                )
+                if next_pitch != _pitch_in_tables(tables, degree + steps, _direction(steps)):
+                    return None
+    return tables
+
+
+def _spelling_table(tables: _ScaleTables, degree_pitches) -> tuple:
+    # Maps each degree of the tonic octave to its (step, accidental, octave) spelling.
+    table = [None] * len(tables.semitones)
+    for pitch_ in degree_pitches:
+        degree = _degree_in_tables(tables, pitch_)
+        if degree is not None and table[degree % len(table)] is None:
+            octaves, index = divmod(degree, len(table))
+            table[index] = (pitch_.step, _accidental_name(pitch_), pitch_.octave - octaves)
+    return tuple(table)
+
+
+def _degree_in_tables(tables: _ScaleTables, pitch_: pitch.Pitch) -> Optional[int]:
+    octaves, semitones = divmod(pitch_.ps - tables.reference_ps, 12)
+    degree = tables.semitone_degrees.get(semitones)
+    if degree is None:
+        return None
+    return int(octaves) * len(tables.semitones) + degree
+
+
+def _pitch_in_tables(tables: _ScaleTables, degree: int, direction: str) -> pitch.Pitch:
+    octaves, index = divmod(degree, len(tables.semitones))
+    return _spelled_pitch(tables.spellings[direction][index], octaves)
+
+
+def _spelled_pitch(spelling: Tuple[str, Optional[str], int], octaves: int = 0) -> pitch.Pitch:
+    step, accidental, octave = spelling
+    pitch_ = pitch.Pitch(step)
+    if accidental is not None:
+        pitch_.accidental = accidental
+    pitch_.octave = octave + octaves
+    return pitch_
+
+
+def _spelled_degree_in_tables(tables: _ScaleTables, pitch_: pitch.Pitch) -> Optional[int]:
+    # Returns the degree of pitches with an explicit octave spelled as in one of the tables,
+    # which are the ones transposed identically by the tables and by the interval network.
+    if pitch_.octave is None:
+        return None
+    degree = _degree_in_tables(tables, pitch_)
+    if degree is None:
+        return None
+    spelling = (pitch_.step, _accidental_name(pitch_))
+    index = degree % len(tables.semitones)
+    for table in tables.spellings.values():
+        if table[index][:2] == spelling:
+            return degree
+    return None
+
+
+def _accidental_name(pitch_: pitch.Pitch) -> Optional[str]:
+    if pitch_.accidental is None or pitch_.accidental.name == "natural":
+        return None
+    return pitch_.accidental.name
+
+
+def _reference_pitch(scale_: music21.scale.ConcreteScale) -> pitch.Pitch:
+    # The tonic from which scales realize their pitches, in its implicit octave if it has none.
+    reference = scale_.tonic
+    if reference.octave is None:
+        reference = pitch.Pitch(reference.name, octave=reference.implicitOctave)
+    return reference
+
+
+def _direction(steps: int) -> str:
+    if steps > 0:
+        return music21.scale.DIRECTION_ASCENDING
+    return music21.scale.DIRECTION_DESCENDING
+
+
+class IntervalScale(music21.scale.ConcreteScale):
+    """Concrete octave-repeating scale built from any list of intervals.
+
+    Besides the usual music21 scale interface, the scale precomputes tables of its degrees, so
+    pitches can be located and transposed in scale space without going through the interval
+    network. Degrees are numbered from 0 (the tonic) and extend over all octaves.
+
+    Args:
+        intervals: Intervals between successive degrees, either as semitones (int) or as
+          interval names ("M2", "m3"...). If the intervals do not complete an octave, the
+          remaining interval is added.
+        tonic: Optional; The tonic of the scale. Default is C4.
+    """
+
+    usePitchDegreeCache = True
+
+    def __init__(
+        self,
+        intervals: Sequence[Union[int, str]],
+        tonic: Optional[Union[str, pitch.Pitch]] = None,
+    ):
+        super().__init__(tonic="C4" if tonic is None else tonic)
+        self._abstract = _abstract_scale(AbstractIntervalScale, tuple(intervals))
+        self.type = "Interval"
+        self.intervals = tuple(intervals)
+        self._tables = _scale_tables(self.intervals, _reference_pitch(self).nameWithOctave)
+
+    def __deepcopy__(self, memo=None):
+        # music21 copies scales by calling their class without arguments. Copies get their own
+        # interval network, and share the compiled tables.
+        new = type(self)(self.intervals, copy.deepcopy(self.tonic, memo))
+        new._abstract = AbstractIntervalScale(mode=self.intervals)
+        return new
+
+    @property
+    def degree_count(self) -> int:
+        """The number of degrees in one octave of the scale."""
+        return len(self._tables.semitones)
+
+    def degree_of(self, pitch_: Union[str, pitch.Pitch]) -> Optional[int]:
+        """Returns the degree of a pitch in the scale.
+
+        Args:
+            pitch_: The pitch to locate. Enharmonic spellings are accepted.
+
+        Returns:
+            The degree of the pitch, counted from the tonic (0) in the tonic's octave, or None if
+            the pitch does not belong to the scale.
+        """
+        if isinstance(pitch_, str):
+            pitch_ = pitch.Pitch(pitch_)
+        return _degree_in_tables(self._tables, pitch_)
+
+    def pitch_at(
+        self, degree: int, direction: str = music21.scale.DIRECTION_ASCENDING
+    ) -> pitch.Pitch:
+        """Returns the pitch at a degree of the scale.
+
+        Args:
+            degree: The degree, counted from the tonic (0) in the tonic's octave.
+            direction: Optional; The direction of the realization, which can influence the
+              spelling. Default is ascending.
+
+        Returns:
+            A new Pitch object, spelled as in the scale.
+        """
+        return _pitch_in_tables(self._tables, degree, direction)
+
+    def transpose_pitch(self, pitch_: pitch.Pitch, steps: int) -> pitch.Pitch:
+        """Transposes a pitch by a number of scale steps.
+
+        Equivalent to next(pitch_, direction, abs(steps)), but pitches spelled as in the scale
+        are transposed with the precomputed tables. Other pitches are delegated to next().
+
+        Args:
+            pitch_: The pitch to transpose.
+            steps: The number of steps. Positive values transpose up, negative values transpose
+              down.
+
+        Returns:
+            A new Pitch object.
+        """
+        degree = _spelled_degree_in_tables(self._tables, pitch_)
+        if degree is None:
+            return self.next(pitch_, _direction(steps), abs(steps))
+        return self.pitch_at(degree + steps, _direction(steps))
+
+    def distance(self, pitch_a: pitch.Pitch, pitch_b: pitch.Pitch) -> Optional[int]:
+        """Returns the number of scale steps from one pitch to another.
+
+        Args:
+            pitch_a: The starting pitch. Must be spelled as in the scale.
+            pitch_b: The target pitch. Enharmonic spellings are accepted.
+
+        Returns:
+            The signed number of steps, 0 if pitch_b does not belong to the scale, or None if
+            pitch_a is not spelled as in the scale.
+        """
+        degree_a = _spelled_degree_in_tables(self._tables, pitch_a)
+        if degree_a is None:
+            return None
+        degree_b = self.degree_of(pitch_b)
+        if degree_b is None:
+            return 0
+        return degree_b - degree_a
+
+
+# Number of steps after which ScaleSteps.distance() gives up stepping through a network
+_MAX_DISTANCE = 1000
+
+
+def _network_tables(scale_: music21.scale.ConcreteScale) -> Optional[_ScaleTables]:
+    # Returns the tables of a scale, compiled once for each tonic of its interval network.
+    abstract = getattr(scale_, "_abstract", None)
+    network = getattr(abstract, "_net", None)
+    if network is None or scale_.tonic is None:
+        return None
+    reference = _reference_pitch(scale_)
+    key = (reference.nameWithOctave, abstract.tonicDegree, network.pitchSimplification)
+    state = _network_state(network)
+    with state.lock:
+        if key not in state.tables:
+            state.tables[key] = _compile_tables(abstract, reference)
+        return state.tables[key]
+
+
+class _NetworkState(NamedTuple):
+    # Lock of an interval network, and the tables compiled from it by tonic
+    lock: threading.RLock
+    tables: Dict[tuple, Optional[_ScaleTables]]
+
+
+# States of the interval networks in use, by id of the network
+_network_states: Dict[int, _NetworkState] = {}
+_network_states_lock = threading.Lock()
+
+
+def _network_state(network: intervalNetwork.IntervalNetwork) -> _NetworkState:
+    # Interval networks can't be hashed, so their states are dropped along with them
+    with _network_states_lock:
+        state = _network_states.get(id(network))
+        if state is None:
+            state = _network_states[id(network)] = _NetworkState(threading.RLock(), {})
+            weakref.finalize(network, _network_states.pop, id(network), None)
+    return state
+
+
+class ScaleSteps:
+    """Steps through the scale space of any music21 scale, from any number of threads.
+
+    Scales repeating the same degrees and spellings in every octave are compiled into tables,
+    which are shared by the scales with the same interval network and tonic and never modified.
+    Pitches spelled as in the scale are transposed with the tables. Other pitches, and the other
+    scales, go through the interval network of the scale, locked with locked().
+
+    Args:
+        scale_: The scale. Changes to its tonic after the ScaleSteps is created are ignored.
+    """
+
+    def __init__(self, scale_: music21.scale.ConcreteScale):
+        self.scale = scale_
+        if isinstance(scale_, IntervalScale):
+            self._tables = _scale_tables(scale_.intervals, _reference_pitch(scale_).nameWithOctave)
+        else:
+            self._tables = _network_tables(scale_)
+
+    @property
+    def compiled(self) -> bool:
+        """Whether the scale is transposed with compiled tables."""
+        return self._tables is not None
+
+    def transpose_pitch(self, pitch_: pitch.Pitch, steps: int) -> pitch.Pitch:
+        """Transposes a pitch by a number of scale steps, as scale.next() does.
+
+        Args:
+            pitch_: The pitch to transpose.
+            steps: The number of steps. Positive values transpose up, negative values transpose
+              down.
+
+        Returns:
+            A new Pitch object.
+        """
+        degree = None
+        if self._tables is not None:
+            degree = _spelled_degree_in_tables(self._tables, pitch_)
+        if degree is None:
+            with locked(self.scale):
+                return self.scale.next(pitch_, _direction(steps), abs(steps))
+        return _pitch_in_tables(self._tables, degree + steps, _direction(steps))
+
+    def distance(self, pitch_a: pitch.Pitch, pitch_b: pitch.Pitch) -> int:
+        """Returns the number of scale steps from one pitch to another.
+
+        Args:
+            pitch_a: The starting pitch.
+            pitch_b: The target pitch. Enharmonic spellings are accepted.
+
+        Returns:
+            The signed number of steps, or 0 if pitch_b can't be reached from pitch_a.
+        """
+        if pitch_a.ps == pitch_b.ps:
+            return 0
+        if self._tables is not None:
+            degree_a = _spelled_degree_in_tables(self._tables, pitch_a)
+            if degree_a is not None:
+                degree_b = _degree_in_tables(self._tables, pitch_b)
+                return 0 if degree_b is None else degree_b - degree_a
+        # Step through the scale until the target is found
+        direction = _direction(pitch_b.ps - pitch_a.ps)
+        with locked(self.scale):
+            for steps in range(1, _MAX_DISTANCE + 1):
+                if self.scale.next(pitch_a, direction, steps).ps == pitch_b.ps:
+                    return steps if direction == music21.scale.DIRECTION_ASCENDING else -steps
+        return 0
+
+
+@contextlib.contextmanager
+def locked(scale_: music21.scale.ConcreteScale) -> Iterator[music21.scale.ConcreteScale]:
+    """Context manager giving the calling thread exclusive use of the interval network of a scale.
+
+    music21 scales cache the pitches they realize in their interval networks, and change some of
+    them in place while finding the next pitch, so a network must not be used by several threads
+    at once. Threads using scales that share a network, or the same scale, take turns. The scales
+    of this module lock their networks themselves, and ScaleSteps locks the networks of the
+    other scales when it uses them.
+
+    Args:
+        scale_: The scale.
+
+    Yields:
+        The scale.
+    """
+    network = getattr(getattr(scale_, "_abstract", None), "_net", None)
+    if network is None:
+        yield scale_
+        return
+    with _network_state(network).lock:
+        yield scale_
+
+
+class ScaleMatch(NamedTuple):
+    """A scale of the catalog containing an identified pitch collection."""
+
+    name: str
+    tonic: str
+    scale: music21.scale.ConcreteScale
+
+
+_TONIC_NAMES = ("C", "C#", "D", "E-", "E", "F", "F#", "G", "G#", "A", "B-", "B")
+
+
+# Catalog of (name, factory) pairs, where the factory builds the scale from a tonic name.
+_catalog: List[Tuple[str, Callable[[str], music21.scale.ConcreteScale]]] = [
+    ("major", music21.scale.MajorScale),
+    ("dorian", music21.scale.DorianScale),
+    ("phrygian", music21.scale.PhrygianScale),
+    ("lydian", music21.scale.LydianScale),
+    ("mixolydian", music21.scale.MixolydianScale),
+    ("minor", music21.scale.MinorScale),
+    ("locrian", music21.scale.LocrianScale),
+    *(
+        (f"pentatonic {mode}", functools.partial(PentatonicScale, mode=mode))
+        for mode in range(1, 6)
+    ),
+    *(
+        (f"octatonic {mode}", functools.partial(music21.scale.OctatonicScale, mode=mode))
+        for mode in (1, 2)
+    ),
+    ("whole-tone", music21.scale.WholeToneScale),
+]
+
+
+def register(name: str, intervals: Sequence[Union[int, str]]):
+    """Adds an interval scale to the catalog used by identify().
+
+    Args:
+        name: The name under which matches of the scale are reported.
+        intervals: Intervals between successive degrees, as accepted by IntervalScale.
+    """
+    intervals = tuple(intervals)
+    # Validate the intervals now rather than on the next identification
+    AbstractIntervalScale(mode=intervals)
+    _catalog.append((name, functools.partial(IntervalScale, intervals)))
+    _rotations.cache_clear()
+    _matches.cache_clear()
+    _catalog_scale.cache_clear()
+
+
+def identify(
+    pitches: Union[music21.stream.Stream, Iterable[Union[str, int, pitch.Pitch]]],
+    exact: bool = False,
+) -> List[ScaleMatch]:
+    """Finds the scales of the catalog that contain a pitch collection.
+
+    The catalog contains the diatonic modes, the pentatonic modes, the two octatonic modes, the
+    whole-tone scale and the scales added with register(), in all 12 transpositions. Lookups go
+    through a precomputed index of pitch-class sets, so identifying many fragments is cheap.
+
+    Args:
+        pitches: The pitches to identify, either as a stream or as an iterable of Pitch objects,
+          pitch names or MIDI numbers.
+        exact: Optional; If true, only the scales made of exactly the pitch classes of the
+          collection are returned. By default, all the scales containing them are.
+
+    Returns:
+        A list of ScaleMatch tuples, from the smallest scales to the largest ones, and in catalog
+        order within a size.
+    """
+    if isinstance(pitches, music21.stream.Stream):
+        pitches = pitches.pitches
+    mask = 0
+    for pitch_ in pitches:
+        if isinstance(pitch_, pitch.Pitch):
+            mask |= 1 << pitch_.pitchClass
+        elif isinstance(pitch_, int):
+            mask |= 1 << pitch_ % 12
+        else:
+            mask |= 1 << _name_pitch_class(pitch_)
+    return [
+        ScaleMatch(_catalog[entry][0], _TONIC_NAMES[tonic], _catalog_scale(entry, tonic))
+        for entry, tonic, scale_mask in _matches(mask)
+        if not exact or scale_mask == mask
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def _name_pitch_class(name: str) -> int:
+    return pitch.Pitch(name).pitchClass
+
+
+def _pitch_class_mask(scale_: music21.scale.ConcreteScale) -> int:
+    mask = 0
+    for pitch_ in scale_.pitches:
+        mask |= 1 << pitch_.pitchClass
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def _rotations() -> Tuple[Tuple[int, int, int], ...]:
+    # (entry, tonic, pitch-class mask) of every transposition of the catalog scales, sorted by size.
+    rotations = []
+    for entry, (_, factory) in enumerate(_catalog):
+        mask = _pitch_class_mask(factory("C"))
+        for tonic in range(12):
+            rotations.append((entry, tonic, (mask << tonic | mask >> (12 - tonic)) & 0xFFF))
+    rotations.sort(key=lambda rotation: bin(rotation[2]).count("1"))
+    return tuple(rotations)
+
+
+@functools.lru_cache(maxsize=4096)
+def _matches(mask: int) -> Tuple[Tuple[int, int, int], ...]:
+    # Every 12-bit pitch-class set is resolved once, so later lookups are a dictionary access.
+    return tuple(rotation for rotation in _rotations() if mask & ~rotation[2] == 0)
+
+
+@functools.lru_cache(maxsize=None)
+def _catalog_scale(entry: int, tonic: int) -> music21.scale.ConcreteScale:
+    return _catalog[entry][1](_TONIC_NAMES[tonic])
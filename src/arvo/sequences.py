@@ -1,346 +1,479 @@
+"""
+Useful integer sequences for music composition, like primes, fibonacci, kolakoski...
+
+The named sequences (LINEAR, PRIMES, PRIME_POWERS, FIBONACCI, TRIBONACCI and DIVISORS) are
+unbounded. Their terms are only computed when first accessed and are then memoized, so they
+can be indexed (PRIMES[10_000]), sliced (PRIMES[:10]) and iterated like lists without any
+cost at import time.
+"""
+
+from __future__ import annotations
+
+import collections
+import heapq
 import itertools
+import math
+import operator
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+from arvo import _lazy
+
+numpy = _lazy.load("numpy")
+
+
+__all__ = [
+    "LazySequence",
+    "LINEAR",
+    "PRIMES",
+    "PRIME_POWERS",
+    "FIBONACCI",
+    "TRIBONACCI",
+    "DIVISORS",
+    "kolakoski",
+    "kolakoski_array",
+    "kolakoski_iterator",
+    "map_values",
+    "mod",
+    "scale",
+    "clip",
+    "interleave",
+    "zip_sum",
+    "take_while",
+    "differences",
+    "cumulative_sums",
+]
+
+# Number of odd integers sieved at once by the segmented prime sieve, and number of integers
+# processed at once by the divisor counting sieve.
+_PRIME_SEGMENT_SIZE = 1 << 15
+_DIVISOR_SEGMENT_SIZE = 1 << 14
+
+# Number of runs expanded at once by the Kolakoski generator.
+_KOLAKOSKI_BLOCK_SIZE = 1 << 10
+
+
+class LazySequence:
+    """Unbounded integer sequence whose terms are computed on demand.
+
+    Terms are either produced by a generator function, in which case they are memoized as they
+    are computed, or by a closed-form formula of the index. Indices start at 0 and negative
+    indices are not supported, since the sequence has no end. Sequences can be shared between
+    threads.
+
+    Args:
+        generator_function: Optional; Function returning a fresh iterator over the terms of
+          the sequence.
+        formula: Optional; Function returning the term at a given index.
+    """
+
+    def __init__(
+        self,
+        generator_function: Optional[Callable[[], Iterator[int]]] = None,
+        formula: Optional[Callable[[int], int]] = None,
+    ):
+        if (generator_function is None) == (formula is None):
+            raise ValueError("provide either a generator function or a formula")
+        self._generator_function = generator_function
+        self._formula = formula
+        self._terms = []
+        self._iterator = None
+        # Generators can't be advanced by two threads at once
+        self._lock = threading.Lock()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[int, List[int], LazySequence]:
+        if isinstance(index, slice):
+            return self._slice(index)
+        if index < 0:
+            raise IndexError("negative indices are not supported by unbounded sequences")
+        if self._formula is not None:
+            return self._formula(index)
+        self._compute(index + 1)
+        return self._terms[index]
+
+    def __iter__(self) -> Iterator[int]:
+        if self._formula is not None:
+            yield from map(self._formula, itertools.count())
+            return
+        index = 0
+        while True:
+            if index == len(self._terms):
+                self._compute(index + 1)
+            yield self._terms[index]
+            index += 1
+
+    def __repr__(self) -> str:
+        return f"LazySequence({self[:5]!r}...)"
+
+    def _compute(self, count: int):
+        # Pulls terms from the generator until at least count terms are memoized.
+        if count <= len(self._terms):
+            return
+        with self._lock:
+            if self._iterator is None:
+                self._iterator = self._generator_function()
+            missing = count - len(self._terms)
+            if missing > 0:
+                self._terms.extend(itertools.islice(self._iterator, missing))
+
+    def _slice(self, index: slice) -> Union[List[int], LazySequence]:
+        start, stop, step = index.start or 0, index.stop, index.step or 1
+        if start < 0 or (stop is not None and stop < 0) or step < 1:
+            raise ValueError("unbounded sequences only support non-negative slice bounds")
+        if stop is None:
+            # An open-ended slice is itself unbounded.
+            return LazySequence(lambda: itertools.islice(iter(self), start, None, step))
+        if self._formula is not None:
+            return [self._formula(i) for i in range(start, stop, step)]
+        self._compute(stop)
+        return self._terms[start:stop:step]
+
+
+def _odd_primes_up_to(limit: int) -> List[int]:
+    # Plain sieve of Eratosthenes over odd numbers, used for the base primes of the segments.
+    if limit < 3:
+        return []
+    sieve = bytearray([1]) * ((limit - 1) // 2)  # sieve[i] represents 2 * i + 3
+    for i in range(math.isqrt(limit) // 2):
+        if sieve[i]:
+            prime = 2 * i + 3
+            first = (prime * prime - 3) // 2
+            sieve[first::prime] = bytes(len(range(first, len(sieve), prime)))
+    return list(itertools.compress(range(3, limit + 1, 2), sieve))
+
+
+def _prime_generator() -> Iterator[int]:
+    # Incremental segmented sieve of Eratosthenes over odd numbers.
+    yield 2
+    base_primes = []
+    base_limit = 1
+    low = 3
+    while True:
+        high = low + 2 * _PRIME_SEGMENT_SIZE
+        limit = math.isqrt(high)
+        if limit > base_limit:
+            base_limit = 2 * limit
+            base_primes = _odd_primes_up_to(base_limit)
+        segment = bytearray([1]) * _PRIME_SEGMENT_SIZE  # segment[i] represents low + 2 * i
+        for prime in base_primes:
+            if prime > limit:
+                break
+            first = max(prime * prime, (low + prime - 1) // prime * prime)
+            if first % 2 == 0:
+                first += prime
+            first = (first - low) // 2
+            segment[first::prime] = bytes(len(range(first, _PRIME_SEGMENT_SIZE, prime)))
+        yield from itertools.compress(range(low, high, 2), segment)
+        low = high
+
+
+def _prime_power_generator() -> Iterator[int]:
+    # Merges the primes with their higher powers. A prime only enters the heap of pending
+    # powers once its square is reached, so the heap stays small.
+    pending_powers = []
+    square_bases = iter(PRIMES)
+    square_base = next(square_bases)
+    for prime in PRIMES:
+        while square_base * square_base < prime:
+            heapq.heappush(pending_powers, (square_base * square_base, square_base))
+            square_base = next(square_bases)
+        while pending_powers and pending_powers[0][0] < prime:
+            power, base = pending_powers[0]
+            yield power
+            heapq.heapreplace(pending_powers, (power * base, base))
+        yield prime
+
+
+def _divisor_count_generator() -> Iterator[int]:
+    # Segmented sieve counting the divisor pairs (d, n / d) with d <= sqrt(n).
+    low = 1
+    while True:
+        high = low + _DIVISOR_SEGMENT_SIZE
+        counts = numpy.zeros(_DIVISOR_SEGMENT_SIZE, dtype=numpy.int64)
+        for divisor in range(1, math.isqrt(high - 1) + 1):
+            square = divisor * divisor
+            first = max(square + divisor, (low + divisor - 1) // divisor * divisor)
+            counts[first - low :: divisor] += 2
+            if square >= low:
+                counts[square - low] += 1
+        yield from counts.tolist()
+        low = high
+
+
+def _linear_recurrence_generator(*initial_terms: int) -> Callable[[], Iterator[int]]:
+    # Sequences where each term is the sum of the previous len(initial_terms) terms.
+    def generator():
+        terms = collections.deque(initial_terms)
+        yield from terms
+        while True:
+            terms.append(sum(terms))
+            terms.popleft()
+            yield terms[-1]
+
+    return generator
+
 
 # Linear sequence
-_linearList = []
-for i in range(1, 200):
-    _linearList.append(i)
-LINEAR = _linearList
+LINEAR = LazySequence(formula=lambda index: index + 1)
 
 # Prime numbers
-PRIMES = [
-    2,
-    3,
-    5,
-    7,
-    11,
-    13,
-    17,
-    19,
-    23,
-    29,
-    31,
-    37,
-    41,
-    43,
-    47,
-    53,
-    59,
-    61,
-    67,
-    71,
-    73,
-    79,
-    83,
-    89,
-    97,
-    101,
-    103,
-    107,
-    109,
-    113,
-    127,
-    131,
-    137,
-    139,
-    149,
-    151,
-    157,
-    163,
-    167,
-    173,
-    179,
-    181,
-    191,
-    193,
-    197,
-    199,
-    211,
-    223,
-    227,
-    229,
-    233,
-    239,
-    241,
-    251,
-    257,
-    263,
-    269,
-    271,
-]
+PRIMES = LazySequence(_prime_generator)
 
-PRIME_POWERS = [
-    2,
-    3,
-    4,
-    5,
-    7,
-    8,
-    9,
-    11,
-    13,
-    16,
-    17,
-    19,
-    23,
-    25,
-    27,
-    29,
-    31,
-    32,
-    37,
-    41,
-    43,
-    47,
-    49,
-    53,
-    59,
-    61,
-    64,
-    67,
-    71,
-    73,
-    79,
-    81,
-    83,
-    89,
-    97,
-    101,
-    103,
-    107,
-    109,
-    113,
-    121,
-    125,
-    127,
-    128,
-    131,
-    137,
-    139,
-    149,
-    151,
-    157,
-    163,
-    167,
-    169,
-    173,
-    179,
-    181,
-    191,
-    193,
-    197,
-    199,
-    211,
-]
+PRIME_POWERS = LazySequence(_prime_power_generator)
 
 # Fibonacci & Tribonacci numbers
-FIBONACCI = [
-    1,
-    1,
-    2,
-    3,
-    5,
-    8,
-    13,
-    21,
-    34,
-    55,
-    89,
-    144,
-    233,
-    377,
-    610,
-    987,
-    1597,
-    2584,
-    4181,
-    6765,
-    10946,
-    17711,
-    28657,
-    46368,
-    75025,
-    121393,
-    196418,
-    317811,
-    514229,
-    832040,
-    1346269,
-    2178309,
-    3524578,
-    5702887,
-    9227465,
-    14930352,
-    24157817,
-    39088169,
-    63245986,
-    102334155,
-]
+FIBONACCI = LazySequence(_linear_recurrence_generator(1, 1))
 
-TRIBONACCI = [
-    1,
-    1,
-    2,
-    4,
-    7,
-    13,
-    24,
-    44,
-    81,
-    149,
-    274,
-    504,
-    927,
-    1705,
-    3136,
-    5768,
-    10609,
-    19513,
-    35890,
-    66012,
-    121415,
-    223317,
-    410744,
-    755476,
-    1389537,
-    2555757,
-    4700770,
-    8646064,
-    15902591,
-    29249425,
-    53798080,
-    98950096,
-    181997601,
-    334745777,
-    615693474,
-    1132436852,
-]
+TRIBONACCI = LazySequence(_linear_recurrence_generator(1, 1, 2))
 
 # Divisors
-DIVISORS = [
-    1,
-    2,
-    2,
-    3,
-    2,
-    4,
-    2,
-    4,
-    3,
-    4,
-    2,
-    6,
-    2,
-    4,
-    4,
-    5,
-    2,
-    6,
-    2,
-    6,
-    4,
-    4,
-    2,
-    8,
-    3,
-    4,
-    4,
-    6,
-    2,
-    8,
-    2,
-    6,
-    4,
-    4,
-    4,
-    9,
-    2,
-    4,
-    4,
-    8,
-    2,
-    8,
-    2,
-    6,
-    6,
-    4,
-    2,
-    10,
-    3,
-    6,
-    4,
-    6,
-    2,
-    8,
-    4,
-    8,
-    4,
-    4,
-    2,
-    12,
-    2,
-    4,
-    6,
-    7,
-    4,
-    8,
-    2,
-    6,
-    4,
-    8,
-    2,
-    12,
-    2,
-    4,
-    6,
-    6,
-    4,
-    8,
-    2,
-    10,
-    5,
-    4,
-    2,
-    12,
-    4,
-    4,
-    4,
-    8,
-    2,
-    12,
-    4,
-    6,
-    4,
-    4,
-    4,
-    12,
-    2,
-    6,
-    6,
-    9,
-    2,
-    8,
-    2,
-    8,
-]
+DIVISORS = LazySequence(_divisor_count_generator)
 
 
-# Kolakoski sequences (credit to rosettacode.org)
-def _cycler(start_items):
-    return itertools.cycle(start_items).__next__
+# Kolakoski sequences
+def _kolakoski_prefix(start_items, slack):
+    # Builds the self-referential beginning of the sequence run by run, until it contains at
+    # least slack more terms than runs.
+    symbols = itertools.cycle(start_items)
+    prefix = []
+    runs = 0
+    while runs == 0 or len(prefix) - runs < slack:
+        symbol = next(symbols)
+        prefix.append(symbol)
+        prefix += [symbol] * (max(1, prefix[runs]) - 1)
+        runs += 1
+    return prefix, runs
 
 
 def _kolakoski_gen(start_items):
-    s, k = [], 0
-    c = _cycler(start_items)
+    # Each run k of the sequence repeats the k-th cycled symbol s[k] times (at least once), where
+    # s[k] is read from the sequence itself. After a bootstrapped prefix, the run lengths are
+    # read from a nested copy of the sequence, which advances more slowly than its parent, so
+    # only O(log n) copies are alive after n terms.
+    if max(start_items) <= 1:
+        # Every run has length one, so the sequence is the cycle of symbols itself.
+        return itertools.cycle(start_items)
+    prefix, runs = _kolakoski_prefix(start_items, _KOLAKOSKI_BLOCK_SIZE)
+    return _kolakoski_copy(start_items, prefix, runs)
+
+
+def _kolakoski_copy(start_items, prefix, runs):
+    # The nested copy is only created once the prefix has been consumed. Since the prefix holds
+    # at least one block of terms more than it has runs, each copy needs fewer blocks from its
+    # own nested copy than its parent does, which keeps the recursion finite.
+    nested_copy = itertools.chain.from_iterable(
+        map(_kolakoski_copy, [start_items], [prefix], [runs])
+    )
+    run_lengths = itertools.islice(nested_copy, runs, None)
+    return itertools.chain(
+        prefix, itertools.chain.from_iterable(_kolakoski_blocks(start_items, run_lengths, runs))
+    )
+
+
+def _kolakoski_blocks(start_items, run_lengths, first_run):
+    # Expands the run lengths into terms, one block of runs at a time.
+    symbols = numpy.array(start_items)
+    run = first_run
     while True:
-        c_next = c()
-        s.append(c_next)
-        sk = s[k]
-        yield sk
-        if sk > 1:
-            s += [c_next] * (sk - 1)
-        k += 1
+        lengths = numpy.fromiter(
+            itertools.islice(run_lengths, _KOLAKOSKI_BLOCK_SIZE), dtype=numpy.int64
+        )
+        run_symbols = symbols[numpy.arange(run, run + len(lengths)) % len(symbols)]
+        yield numpy.repeat(run_symbols, numpy.maximum(lengths, 1)).tolist()
+        run += len(lengths)
+
+
+def kolakoski_iterator(start_items=(1, 2)):
+    """Returns an unbounded iterator over a Kolakoski sequence.
+
+    Memory use grows logarithmically with the number of terms consumed.
+
+    Args:
+        start_items: Optional; The alphabet of the sequence, cycled through run by run. Default
+          is (1, 2).
+
+    Returns:
+        An iterator over the terms of the sequence.
+    """
+    return _kolakoski_gen(start_items)
 
 
 def kolakoski(start_items=(1, 2), length=100):
+    """Returns the first terms of a Kolakoski sequence.
+
+    Args:
+        start_items: Optional; The alphabet of the sequence, cycled through run by run. Default
+          is (1, 2).
+        length: Optional; The number of terms to return. Default is 100.
+
+    Returns:
+        A list containing the first terms of the sequence.
+    """
     return list(itertools.islice(_kolakoski_gen(start_items), length))
+
+
+def kolakoski_array(length, start_items=(1, 2)):
+    """Returns the first terms of a Kolakoski sequence as a NumPy int8 array.
+
+    The sequence is built in bulk by repeatedly expanding the known prefix into its runs, which
+    is much faster than kolakoski() for long sequences.
+
+    Args:
+        length: The number of terms to return.
+        start_items: Optional; The alphabet of the sequence, cycled through run by run. Default
+          is (1, 2). Symbols must fit in an int8.
+
+    Returns:
+        A NumPy int8 array containing the first terms of the sequence.
+    """
+    symbols = numpy.asarray(start_items, dtype=numpy.int64)
+    if symbols.min() < -128 or symbols.max() > 127:
+        raise ValueError("Kolakoski symbols must fit in an int8")
+    symbols = symbols.astype(numpy.int8)
+    if symbols.max() <= 1:
+        return numpy.resize(symbols, length)
+    # Start from the bootstrapped prefix, which contains more terms than runs.
+    terms = numpy.array(_kolakoski_prefix(start_items, 1)[0], dtype=numpy.int8)
+    while len(terms) < length:
+        runs = min(len(terms), length)
+        run_symbols = symbols[numpy.arange(runs) % len(symbols)]
+        terms = numpy.repeat(run_symbols, numpy.maximum(terms[:runs], 1))
+    return terms[:length].copy()
+
+
+# Lazy sequence algebra. These functions accept any iterable, including the unbounded sequences
+# above and generators, and return iterators: nothing is computed until values are consumed.
+def map_values(function: Callable[[int], int], values: Iterable[int]) -> Iterator[int]:
+    """Applies a function to each value of a sequence.
+
+    Args:
+        function: The function to apply.
+        values: The sequence to transform.
+
+    Returns:
+        An iterator over the transformed values.
+    """
+    return map(function, values)
+
+
+def mod(values: Iterable[int], modulus: int, offset: int = 0) -> Iterator[int]:
+    """Wraps each value of a sequence in the range [offset, offset + modulus).
+
+    Args:
+        values: The sequence to transform.
+        modulus: The size of the range.
+        offset: Optional; The lowest value of the range. Default is 0, use 1 to get values
+          usable as step values or repetitions.
+
+    Returns:
+        An iterator over the wrapped values.
+    """
+    return ((value - offset) % modulus + offset for value in values)
+
+
+def scale(values: Iterable[int], factor: Union[int, float]) -> Iterator[Union[int, float]]:
+    """Multiplies each value of a sequence by a factor.
+
+    Args:
+        values: The sequence to transform.
+        factor: The factor to multiply the values with. Integer factors keep integer values.
+
+    Returns:
+        An iterator over the scaled values.
+    """
+    return map(operator.mul, values, itertools.repeat(factor))
+
+
+def clip(
+    values: Iterable[int], minimum: Optional[int] = None, maximum: Optional[int] = None
+) -> Iterator[int]:
+    """Limits the values of a sequence to a range.
+
+    Args:
+        values: The sequence to transform.
+        minimum: Optional; The lowest allowed value. By default, values are not limited below.
+        maximum: Optional; The highest allowed value. By default, values are not limited above.
+
+    Returns:
+        An iterator over the clipped values.
+    """
+    if minimum is not None:
+        values = map(max, values, itertools.repeat(minimum))
+    if maximum is not None:
+        values = map(min, values, itertools.repeat(maximum))
+    return iter(values)
+
+
+def interleave(*sequences: Iterable[int]) -> Iterator[int]:
+    """Alternates between the values of several sequences.
+
+    Provided [1, 2, 3] and [10, 20, 30], returns 1, 10, 2, 20, 3, 30. Stops as soon as one of
+    the sequences is exhausted.
+
+    Args:
+        *sequences: The sequences to interleave.
+
+    Returns:
+        An iterator over the interleaved values.
+    """
+    return itertools.chain.from_iterable(zip(*sequences))
+
+
+def zip_sum(*sequences: Iterable[int]) -> Iterator[int]:
+    """Adds the values of several sequences term by term.
+
+    Stops as soon as one of the sequences is exhausted.
+
+    Args:
+        *sequences: The sequences to add.
+
+    Returns:
+        An iterator over the sums.
+    """
+    return map(sum, zip(*sequences))
+
+
+def take_while(predicate: Callable[[int], bool], values: Iterable[int]) -> Iterator[int]:
+    """Returns the values of a sequence as long as they satisfy a predicate.
+
+    This is the usual way to bound an unbounded sequence, for example
+    take_while(lambda x: x < 100, PRIMES).
+
+    Args:
+        predicate: The condition the values must satisfy.
+        values: The sequence to bound.
+
+    Returns:
+        An iterator over the values preceding the first value that fails the predicate.
+    """
+    return itertools.takewhile(predicate, values)
+
+
+def differences(values: Iterable[int]) -> Iterator[int]:
+    """Returns the differences between consecutive values of a sequence.
+
+    Provided 1, 2, 4, 7, returns 1, 2, 3.
+
+    Args:
+        values: The sequence to differentiate.
+
+    Returns:
+        An iterator over the differences.
+    """
+    previous_values, next_values = itertools.tee(values)
+    next(next_values, None)
+    return map(operator.sub, next_values, previous_values)
+
+
+def cumulative_sums(values: Iterable[int]) -> Iterator[int]:
+    """Returns the running totals of a sequence.
+
+    Provided 1, 2, 3, returns 1, 3, 6.
+
+    Args:
+        values: The sequence to accumulate.
+
+    Returns:
+        An iterator over the running totals.
+    """
+    return itertools.accumulate(values)
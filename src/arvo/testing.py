@@ -0,0 +1,368 @@
+"""
+Differential testing of fast code paths against reference implementations.
+
+compare() calls two implementations of the same operation, typically the music21-based
+reference and a faster path (event tables, note indexes, scale tables...), on randomly generated
+inputs, and checks that they return the same notes:
+
+    testing.compare(
+        lambda s, steps, scale_: transformations.scalar_transposition(s, steps, scale_),
+        lambda s, steps, scale_: transformations.scalar_transposition(
+            io.EventTable.from_stream(s), steps, scale_
+        ),
+        lambda rng: (testing.random_stream(rng), rng.randint(-8, 8), testing.random_scale(rng)),
+    )
+
+The inputs are generated from seeded random generators, so failures can be reproduced. When the
+implementations differ, the failing input is minimized (notes and list items are removed and
+numbers brought closer to zero while the difference persists) before a MismatchError is raised.
+"""
+
+from __future__ import annotations
+
+import copy
+import fractions
+import random
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+from arvo import _lazy
+
+chord = _lazy.load("music21.chord")
+common = _lazy.load("music21.common")
+duration = _lazy.load("music21.duration")
+note = _lazy.load("music21.note")
+pitch = _lazy.load("music21.pitch")
+scale = _lazy.load("music21.scale")
+stream = _lazy.load("music21.stream")
+tie = _lazy.load("music21.tie")
+numpy = _lazy.load("numpy")
+io = _lazy.load("arvo.io")
+scales = _lazy.load("arvo.scales")
+tools = _lazy.load("arvo.tools")
+
+
+__all__ = [
+    "MismatchError",
+    "compare",
+    "summarize",
+    "random_pitch",
+    "random_stream",
+    "random_scale",
+    "random_t_chord",
+    "QUARTER_LENGTHS",
+]
+
+# Durations used by random_stream(), including a triplet value
+QUARTER_LENGTHS = (0.25, 0.5, 1, 1.5, 2, fractions.Fraction(1, 3))
+
+# Maximum number of calls to the implementations while minimizing a failing input
+_MAX_SHRINK_CALLS = 1000
+
+_STEPS = "CDEFGAB"
+
+
+class MismatchError(AssertionError):
+    """Raised when two implementations return different results.
+
+    Attributes:
+        arguments: The minimized arguments on which the implementations differ.
+        reference: The summarized result of the reference implementation.
+        fast: The summarized result of the fast implementation.
+        seed: The seed of the comparison.
+        example: The index of the example that failed first.
+    """
+
+    def __init__(self, args: tuple, reference: Any, fast: Any, seed: Any, example: int):
+        self.arguments = args
+        self.reference = reference
+        self.fast = fast
+        self.seed = seed
+        self.example = example
+        arguments = "\n".join(f"    {_describe(value)}" for value in args)
+        super().__init__(
+            f"implementations differ on example {example} (seed {seed!r}), minimized to:\n"
+            f"  arguments:\n{arguments}\n"
+            f"  reference: {reference!r}\n"
+            f"  fast:      {fast!r}"
+        )
+
+
+def compare(
+    reference_fn: Callable[..., Any],
+    fast_fn: Callable[..., Any],
+    generator: Callable[[random.Random], Sequence[Any]],
+    examples: int = 100,
+    seed: Any = 0,
+    normalize: Optional[Callable[[Any], Any]] = None,
+) -> int:
+    """Checks that two implementations return the same results on random inputs.
+
+    Each implementation is called with its own copy of the arguments, so functions modifying
+    their inputs can be compared. Implementations raising the same type of exception are
+    considered equal.
+
+    Args:
+        reference_fn: The reference implementation.
+        fast_fn: The implementation to check.
+        generator: A function returning the positional arguments of an example, given a
+          random.Random generator.
+        examples: Optional; The number of examples. Default is 100.
+        seed: Optional; The seed of the random generators. Default is 0.
+        normalize: Optional; The function converting results to comparable values. By default,
+          summarize() is used.
+
+    Returns:
+        The number of examples checked.
+
+    Raises:
+        MismatchError: If the implementations differ on an example.
+    """
+    if normalize is None:
+        normalize = summarize
+
+    def outcomes(args):
+        return _outcome(reference_fn, args, normalize), _outcome(fast_fn, args, normalize)
+
+    def fails(args):
+        reference, fast = outcomes(args)
+        return reference != fast
+
+    for example in range(examples):
+        args = tuple(generator(random.Random(f"{seed}:{example}")))
+        if fails(args):
+            args = _minimize(args, fails)
+            reference, fast = outcomes(args)
+            raise MismatchError(args, reference, fast, seed, example)
+    return examples
+
+
+def summarize(value: Any) -> Any:
+    """Converts a result to a comparable value.
+
+    Streams, note indexes and event tables become lists of (offset, quarter length, class name,
+    pitches, tie type) tuples, one per note, chord and rest. Pitches become their names with
+    octave, durations their quarter lengths, and NumPy arrays lists.
+
+    Args:
+        value: The value to convert.
+
+    Returns:
+        The comparable value.
+    """
+    if isinstance(value, io.EventTable):
+        value = value.to_stream()
+    if isinstance(value, (stream.Stream, tools.NoteIndex)):
+        flat_stream = tools.source_stream(value).flat
+        return [
+            (
+                common.opFrac(flat_stream.elementOffset(element)),
+                common.opFrac(element.quarterLength),
+                type(element).__name__,
+                tuple(pitch_.nameWithOctave for pitch_ in getattr(element, "pitches", ())),
+                None if element.tie is None else element.tie.type,
+            )
+            for element in flat_stream.notesAndRests
+        ]
+    if isinstance(value, pitch.Pitch):
+        return value.nameWithOctave
+    if isinstance(value, duration.Duration):
+        return common.opFrac(value.quarterLength)
+    if isinstance(value, numpy.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [summarize(item) for item in value]
+    return value
+
+
+def random_pitch(rng: random.Random, lowest: int = 2, highest: int = 6) -> pitch.Pitch:
+    """Returns a random pitch, with a random accidental one time out of three.
+
+    Args:
+        rng: The random generator.
+        lowest: Optional; The lowest octave. Default is 2.
+        highest: Optional; The highest octave. Default is 6.
+
+    Returns:
+        A new Pitch object.
+    """
+    pitch_ = pitch.Pitch(rng.choice(_STEPS), octave=rng.randint(lowest, highest))
+    if rng.random() < 1 / 3:
+        pitch_.accidental = rng.choice(["sharp", "flat"])
+    return pitch_
+
+
+def random_stream(
+    rng: random.Random,
+    max_length: int = 16,
+    chords: bool = True,
+    rests: bool = True,
+    ties: bool = True,
+    quarter_lengths: Sequence[float] = QUARTER_LENGTHS,
+    pitches: Optional[Sequence[pitch.Pitch]] = None,
+) -> stream.Stream:
+    """Returns a random flat stream of notes, chords and rests.
+
+    Args:
+        rng: The random generator.
+        max_length: Optional; The maximum number of elements. Default is 16.
+        chords: Optional; If true, the stream contains chords. Default is True.
+        rests: Optional; If true, the stream contains rests. Default is True.
+        ties: Optional; If true, some notes are tied to the next one. Default is True.
+        quarter_lengths: Optional; The durations to choose from. By default, QUARTER_LENGTHS.
+        pitches: Optional; The pitches to choose from, for example the pitches of a scale. By
+          default, pitches are drawn with random_pitch().
+
+    Returns:
+        A new Stream.
+    """
+    if pitches is None:
+        pitches_ = lambda: random_pitch(rng)
+    else:
+        pitches_ = lambda: copy.deepcopy(rng.choice(pitches))
+    result = stream.Stream()
+    previous = None
+    for _ in range(rng.randint(1, max_length)):
+        quarter_length = rng.choice(quarter_lengths)
+        kind = rng.random()
+        if rests and kind < 0.15:
+            element = note.Rest(quarterLength=quarter_length)
+        elif ties and previous is not None and kind < 0.25:
+            # Tie the previous note or chord to a repetition of its pitches
+            element = copy.deepcopy(previous)
+            element.quarterLength = quarter_length
+            previous.tie = tie.Tie("start" if previous.tie is None else "continue")
+            element.tie = tie.Tie("stop")
+        elif chords and kind < 0.4:
+            chord_pitches = {pitches_().nameWithOctave for _ in range(rng.randint(2, 4))}
+            element = chord.Chord(sorted(chord_pitches), quarterLength=quarter_length)
+        else:
+            element = note.Note(pitches_(), quarterLength=quarter_length)
+        result.append(element)
+        previous = None if element.isRest else element
+    return result
+
+
+def random_scale(rng: random.Random) -> scale.ConcreteScale:
+    """Returns a random concrete scale.
+
+    The scale is a music21 major or minor scale, an arvo pentatonic scale in a random mode, or an
+    IntervalScale of random intervals, on a random tonic.
+
+    Args:
+        rng: The random generator.
+
+    Returns:
+        A new ConcreteScale.
+    """
+    tonic = random_pitch(rng, 3, 4)
+    kind = rng.randrange(4)
+    if kind == 0:
+        return scale.MajorScale(tonic)
+    if kind == 1:
+        return scale.MinorScale(tonic)
+    if kind == 2:
+        return scales.PentatonicScale(tonic=tonic, mode=rng.randint(1, 5))
+    intervals = []
+    while sum(intervals) < 10:
+        intervals.append(rng.randint(1, min(3, 11 - sum(intervals))))
+    return scales.IntervalScale(intervals, tonic=tonic)
+
+
+def random_t_chord(rng: random.Random) -> List[str]:
+    """Returns the pitch names of a random major or minor triad, for the tintinnabuli functions.
+
+    Args:
+        rng: The random generator.
+
+    Returns:
+        A list of three pitch names.
+    """
+    root = random_pitch(rng)
+    third = root.transpose("M3" if rng.random() < 0.5 else "m3")
+    fifth = root.transpose("P5")
+    return [root.name, third.name, fifth.name]
+
+
+def _outcome(function: Callable[..., Any], args: tuple, normalize: Callable[[Any], Any]):
+    try:
+        result = function(*copy.deepcopy(args))
+    except Exception as exception:
+        return ("raised", type(exception).__name__)
+    return ("returned", normalize(result))
+
+
+def _minimize(args: tuple, fails: Callable[[tuple], bool]) -> tuple:
+    # Greedily replaces arguments with smaller candidates on which the implementations still
+    # differ, until no candidate fails or the call budget is spent.
+    calls = 0
+    improved = True
+    while improved and calls < _MAX_SHRINK_CALLS:
+        improved = False
+        for index, value in enumerate(args):
+            for candidate in _shrink(value):
+                calls += 1
+                candidate_args = args[:index] + (candidate,) + args[index + 1:]
+                if fails(candidate_args):
+                    args = candidate_args
+                    improved = True
+                    break
+                if calls >= _MAX_SHRINK_CALLS:
+                    return args
+            if improved:
+                break
+    return args
+
+
+def _shrink(value) -> Iterator[Any]:
+    # Generates smaller versions of a value, the smallest first
+    if isinstance(value, bool):
+        return
+    if isinstance(value, int):
+        for candidate in (0, value // 2, value - (1 if value > 0 else -1)):
+            if abs(candidate) < abs(value):
+                yield candidate
+    elif isinstance(value, float):
+        for candidate in (0.0, float(round(value))):
+            if abs(candidate) < abs(value):
+                yield candidate
+    elif isinstance(value, (list, tuple)):
+        for items in _shorter(list(value)):
+            yield type(value)(items)
+        for index, item in enumerate(value):
+            for candidate in _shrink(item):
+                yield type(value)(list(value[:index]) + [candidate] + list(value[index + 1:]))
+    elif isinstance(value, stream.Stream) and value.isFlat:
+        elements = [
+            (value.elementOffset(element), element) for element in value.notesAndRests
+        ]
+        if len(elements) != len(value):
+            return
+        # The remaining elements keep their offsets
+        for items in _shorter(elements):
+            shorter = stream.Stream()
+            for offset, element in items:
+                element_copy = copy.deepcopy(element)
+                element_copy.activeSite = None
+                shorter.insert(offset, element_copy)
+            yield shorter
+
+
+def _shorter(items: list) -> Iterator[list]:
+    # Removes halves, then single items
+    if len(items) > 1:
+        half = len(items) // 2
+        yield items[half:]
+        yield items[:half]
+    for index in range(len(items)):
+        yield items[:index] + items[index + 1:]
+
+
+def _describe(value) -> str:
+    if isinstance(value, stream.Stream):
+        return f"{type(value).__name__}({summarize(value)!r})"
+    if isinstance(value, scale.ConcreteScale):
+        pitches = " ".join(p.nameWithOctave for p in value.pitches)
+        return f"{type(value).__name__}({pitches})"
+    if isinstance(value, pitch.Pitch):
+        return f"Pitch({value.nameWithOctave})"
+    return repr(value)
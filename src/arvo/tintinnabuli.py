@@ -3,13 +3,21 @@
 Functions for generating Arvo Pärt-inspired tintinnabuli.
 
 """
+
+from __future__ import annotations
+
 import enum
 from typing import Union, Sequence
 
-from music21 import stream
-from music21 import chord
-from music21 import pitch
-from music21 import note
+from arvo import _lazy
+from arvo import cache
+from arvo import instrument
+from arvo import tools
+
+stream = _lazy.load("music21.stream")
+chord = _lazy.load("music21.chord")
+pitch = _lazy.load("music21.pitch")
+note = _lazy.load("music21.note")
 
 
 __all__ = ["Direction", "TMode", "create_t_voice"]
@@ -33,8 +41,10 @@ class TMode(enum.Enum):
     CHROMATIC = 2
 
 
+@instrument.instrumented
+@cache.cached
 def create_t_voice(
-    m_voice: stream.Stream,
+    m_voice: Union[stream.Stream, tools.NoteIndex],
     t_chord: Union[Sequence[int], Sequence[str], chord.Chord],
     position: int = 1,
     direction: Direction = Direction.UP,
@@ -43,7 +53,8 @@ def create_t_voice(
     """Generates a t-voice melodic stream from a m-voice melodic stream.
 
     Args:
-        m_voice: The stream containing the melody to use as the basis for the tintinnabuli.
+        m_voice: The stream containing the melody to use as the basis for the tintinnabuli, or
+          its NoteIndex.
         t_chord: A list of pitch-classes to use as the basis of the t-voice. Accepts letter names or
           numeric pitch classes. Can also be a music21 Chord object.
         position: Optional; The position of the t-voice. Default is 1.
@@ -58,7 +69,7 @@ def create_t_voice(
         A stream that contains the new t-voice.
     """
     # Create t-voice stream
-    t_voice = stream.Stream()
+    t_voice = tools.StreamBuilder()
 
     # Create t-voice pitch-class lists
     if isinstance(t_chord, chord.Chord):
@@ -83,7 +94,9 @@ def create_t_voice(
 
     temp_pitch = pitch.Pitch()
 
-    for m_note in m_voice.flat.notes:
+    m_index = tools.note_index(m_voice)
+    # Offsets are converted to Python floats, which the builder makes exact as music21 does
+    for m_note, m_offset in zip(m_index.notes, m_index.offsets.tolist()):
         temp_pitch.ps = m_note.pitch.ps
         position_index = 0
         while position_index < position:
@@ -100,8 +113,8 @@ def create_t_voice(
         t_note = note.Note()
         t_note.pitch.ps = temp_pitch.ps
         t_note.duration = m_note.duration
-        t_voice.insert(m_note.offset, t_note)
+        t_voice.insert(m_offset, t_note)
         if direction is Direction.UP_ALTERNATE or direction is Direction.DOWN_ALTERNATE:
             pitch_delta *= -1
 
-    return t_voice
+    return t_voice.commit()
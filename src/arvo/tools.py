@@ -2,31 +2,59 @@
 Convenient helper functions for quickly manipulating and combining music21 elements.
 """
 
+from __future__ import annotations
+
+import copy
+import fractions
+import functools
+import math
 import numbers
-from typing import Union, Sequence, Optional, Type
-from music21 import duration
-from music21 import note
-from music21 import stream
-from music21 import pitch
-from music21 import chord
+from typing import Any, Iterable, Iterator, List, NamedTuple, Union, Sequence, Optional, Tuple, Type
+
+from arvo import _lazy
+from arvo import instrument
+
+duration = _lazy.load("music21.duration")
+note = _lazy.load("music21.note")
+stream = _lazy.load("music21.stream")
+pitch = _lazy.load("music21.pitch")
+chord = _lazy.load("music21.chord")
+base = _lazy.load("music21.base")
+common = _lazy.load("music21.common")
+numpy = _lazy.load("numpy")
+meter = _lazy.load("music21.meter")
+tie = _lazy.load("music21.tie")
+spanner = _lazy.load("music21.spanner")
+
 
 __all__ = [
     "convert_stream",
     "notes_to_stream",
     "durations_to_stream",
+    "to_note",
+    "to_duration",
     "merge_streams",
-    "append_stream"
+    "append_stream",
+    "StreamBuilder",
+    "ticks_per_quarter",
+    "bar",
+    "NoteIndex",
+    "note_index",
+    "source_stream",
+    "OffsetIndex",
+    "Sonority",
 ]
 
 
+@instrument.instrumented
 def convert_stream(
-    original_stream: stream.Stream,
+    original_stream: Union[stream.Stream, NoteIndex],
     stream_class: Type[Union[stream.Voice, stream.Part, stream.Score]],
 ) -> stream.Stream:
     """Converts a stream to a the specified type
 
     Args:
-        original_stream: The Stream to convert.
+        original_stream: The Stream to convert, or its NoteIndex.
         stream_class: The type of stream to convert to (Score, Part or Voice).
 
     Returns:
@@ -39,11 +67,12 @@ def convert_stream(
     elif stream_class is stream.Voice:
         post_stream = stream.Voice()
 
-    for element in original_stream.elements:
+    for element in source_stream(original_stream).elements:
         post_stream.append(element)
     return post_stream
 
 
+@instrument.instrumented
 def notes_to_stream(
     pitches: Sequence[Union[numbers.Number, str, pitch.Pitch, note.Note, chord.Chord]]
 ) -> stream.Stream:
@@ -57,20 +86,44 @@ def notes_to_stream(
     Returns:
         Stream containing a sequence of notes with the corresponding pitches.
     """
-    post_stream = stream.Stream()
-    for pitch_ in pitches:
-        if isinstance(pitch_, (str, pitch.Pitch)):
-            post_stream.append(note.Note(pitch_))
-        elif isinstance(pitch_, numbers.Number):
-            note_ = note.Note(pitch_)
-            if note_.pitch.accidental.name == "natural":
-                note_.pitch.accidental = None
-            post_stream.append(note_)
-        elif isinstance(pitch_, (note.Note, chord.Chord)):
-            post_stream.append(pitch_)
-    return post_stream
+    builder = StreamBuilder()
+    # The values are checked before being converted, so iterators are read once
+    pitches = list(pitches)
+    if _is_numeric_sequence(pitches):
+        # Homogeneous numeric sequences skip the type checks of to_note()
+        for pitch_ in pitches:
+            builder.append(note.Note(_clone_pitch(_pitch_prototype(pitch_))))
+    else:
+        for pitch_ in pitches:
+            note_ = to_note(pitch_)
+            if note_ is not None:
+                builder.append(note_)
+    return builder.commit()
 
 
+def to_note(
+    pitch_: Union[numbers.Number, str, pitch.Pitch, note.Note, chord.Chord]
+) -> Optional[Union[note.Note, chord.Chord]]:
+    """Converts a single pitch value to a note.
+
+    Args:
+        pitch_: Pitch class (0-11), midi note number (12+), note name (str), music21 Pitch
+          object, music21 Note object or music21 Chord object. Note and Chord objects are
+          returned as is.
+
+    Returns:
+        The corresponding Note or Chord, or None if the value isn't a recognized pitch value.
+    """
+    if isinstance(pitch_, (str, numbers.Number)):
+        return note.Note(_clone_pitch(_pitch_prototype(pitch_)))
+    elif isinstance(pitch_, pitch.Pitch):
+        return note.Note(pitch_)
+    elif isinstance(pitch_, (note.Note, chord.Chord)):
+        return pitch_
+    return None
+
+
+@instrument.instrumented
 def durations_to_stream(
     durations: Sequence[Union[numbers.Number, duration.Duration, note.Note]]
 ):
@@ -83,23 +136,81 @@ def durations_to_stream(
     Returns:
         Stream containing a sequence of notes with the corresponding durations.
     """
-    post_stream = stream.Stream()
-    for duration_ in durations:
-        if isinstance(duration_, numbers.Number):
-            new_note = note.Note()
-            new_note.duration = duration.Duration(duration_)
-            post_stream.append(new_note)
-        elif isinstance(duration_, duration.Duration):
-            new_note = note.Note()
-            new_note.duration = duration_
-            post_stream.append(new_note)
-        elif isinstance(duration_, note.Note):
-            post_stream.append(duration_)
-    return post_stream
+    builder = StreamBuilder()
+    durations = list(durations)
+    if _is_numeric_sequence(durations):
+        # Homogeneous numeric sequences skip the type checks of to_duration()
+        for duration_ in durations:
+            builder.append(note.Note(duration=copy.deepcopy(_duration_prototype(duration_))))
+    else:
+        for duration_ in durations:
+            if isinstance(duration_, note.Note):
+                builder.append(duration_)
+            elif isinstance(duration_, (numbers.Number, duration.Duration)):
+                builder.append(note.Note(duration=to_duration(duration_)))
+    return builder.commit()
+
+
+def to_duration(
+    duration_: Union[numbers.Number, duration.Duration, note.Note]
+) -> Optional[duration.Duration]:
+    """Converts a single duration value to a Duration object.
 
+    Args:
+        duration_: Numeric value (1 = quarter note), music21 Duration object or music21 Note
+          object. Duration objects are returned as is, and the duration of Note objects is
+          returned.
+
+    Returns:
+        The corresponding Duration, or None if the value isn't a recognized duration value.
+    """
+    if isinstance(duration_, numbers.Number):
+        return copy.deepcopy(_duration_prototype(duration_))
+    elif isinstance(duration_, duration.Duration):
+        return duration_
+    elif isinstance(duration_, note.GeneralNote):
+        return duration_.duration
+    return None
 
+
+def _is_numeric_sequence(values: Sequence[Any]) -> bool:
+    value_types = set(map(type, values))
+    return value_types == {int} or value_types == {float}
+
+
+@functools.lru_cache(maxsize=1024)
+def _pitch_prototype(value: Union[numbers.Number, str]) -> pitch.Pitch:
+    # Generated material repeats a small set of values, so each value is only parsed once.
+    pitch_ = pitch.Pitch(value)
+    if isinstance(value, numbers.Number) and pitch_.accidental.name == "natural":
+        pitch_.accidental = None
+    return pitch_
+
+
+def _clone_pitch(prototype: pitch.Pitch) -> pitch.Pitch:
+    # Shallow copy with its own accidental and microtone, a lot cheaper than a deepcopy. The
+    # prototypes are never attached to a note, so they carry no other mutable state.
+    pitch_ = pitch.Pitch.__new__(pitch.Pitch)
+    pitch_.__dict__.update(prototype.__dict__)
+    if prototype.accidental is not None:
+        pitch_.accidental = pitch.Accidental(prototype.accidental.name)
+    if prototype._microtone is not None:
+        pitch_._microtone = copy.deepcopy(prototype._microtone)
+    return pitch_
+
+
+@functools.lru_cache(maxsize=1024)
+def _duration_prototype(quarter_length: numbers.Number) -> duration.Duration:
+    duration_ = duration.Duration(quarter_length)
+    # Resolve the type, dots and tuplets once, which can be very slow for tuplets, as the copies
+    # share the result.
+    duration_.type  # pylint: disable=pointless-statement
+    return duration_
+
+
+@instrument.instrumented
 def merge_streams(
-    *streams: stream.Stream,
+    *streams: Union[stream.Stream, NoteIndex],
     stream_class: Optional[Type[Union[stream.Voice, stream.Part, stream.Score]]] = None
 ) -> stream.Stream:
     """
@@ -107,7 +218,7 @@ def merge_streams(
     Creates a new stream by combining streams vertically.
 
     Args:
-        *streams: Streams to merge.
+        *streams: Streams to merge, or their NoteIndex.
         stream_class: Optional; The type of stream to convert to (Score, Part or Voice). By
         default, a generic Stream is returned.
 
@@ -122,21 +233,626 @@ def merge_streams(
         post_stream = stream.Part()
     elif stream_class is stream.Voice:
         post_stream = stream.Voice()
+    builder = StreamBuilder(post_stream)
     for stream_ in streams:
-        post_stream.insert(0, stream_)
-    return post_stream
+        builder.insert(0, source_stream(stream_))
+    return builder.commit()
 
 
-def append_stream(original_stream: stream.Stream, *streams: stream.Stream):
+@instrument.instrumented
+def append_stream(
+    original_stream: Union[stream.Stream, NoteIndex], *streams: Union[stream.Stream, NoteIndex]
+):
     """
 
     Appends all elements of one or more streams at the end of a stream.
 
     Args:
-        original_stream: The stream to append to.
-        *streams: Any number of streams to be appended to the original stream.
+        original_stream: The stream to append to, or its NoteIndex.
+        *streams: Any number of streams to be appended to the original stream, or their NoteIndex.
     """
+    builder = StreamBuilder(source_stream(original_stream))
     for stream_ in streams:
-        h_offset = original_stream.highestTime
+        builder.append_stream(source_stream(stream_))
+    builder.commit()
+
+
+class StreamBuilder:
+    """Collects elements and their offsets, then adds them to a stream all at once.
+
+    Every Stream.insert() invalidates the caches of the stream, so computing its highest time
+    between insertions makes building long streams quadratic. The builder keeps track of the
+    highest time itself and adds the elements the way Stream.append() does, updating the stream a
+    single time on commit.
+
+    Offsets are kept exact, as with Stream.append(). If a resolution is given, the builder keeps
+    its timeline in integer ticks instead, which avoids fractional arithmetic on every element;
+    offsets are only converted to quarter lengths on commit.
+
+    Args:
+        target: Optional; The stream to add the elements to. By default, a new Stream is created.
+        ppq: Optional; The resolution of the timeline, in ticks per quarter note. All offsets
+          and durations must then be whole numbers of ticks (see ticks_per_quarter()). By
+          default, offsets are kept as music21 quarter lengths.
+    """
+
+    def __init__(self, target: Optional[stream.Stream] = None, ppq: Optional[int] = None):
+        self.stream = stream.Stream() if target is None else target
+        self.ppq = ppq
+        self._ticks = {}
+        self._highest_position = self._position(self.stream.highestTime)
+        self._elements = []
+        self._sorted = self.stream.isSorted
+        self._last = None
+        if self.stream._elements:
+            last_element = self.stream._elements[-1]
+            self._last = (self._position(self.stream.elementOffset(last_element)), last_element)
+
+    @property
+    def highest_time(self) -> Union[float, fractions.Fraction]:
+        """The highest time of the stream, including the collected elements."""
+        return self._quarter_length(self._highest_position)
+
+    def insert(self, offset: Union[float, fractions.Fraction], element: base.Music21Object):
+        """Adds an element at the specified offset.
+
+        Args:
+            offset: The offset of the element in the stream.
+            element: The element to add.
+        """
+        self._insert_at(self._position(offset), element)
+
+    def append(self, element: base.Music21Object):
+        """Adds an element at the end of the stream.
+
+        Args:
+            element: The element to add.
+        """
+        self._insert_at(self._highest_position, element)
+
+    def append_stream(self, stream_: stream.Stream):
+        """Adds all elements of a stream at the end of the stream, keeping their relative offsets.
+
+        Args:
+            stream_: The stream whose elements to add.
+        """
+        start = self._highest_position
         for element in stream_.elements:
-            original_stream.insert(element.offset + h_offset, element)
+            self._insert_at(start + self._position(stream_.elementOffset(element)), element)
+
+    def commit(self) -> stream.Stream:
+        """Adds the collected elements to the stream.
+
+        Returns:
+            The stream.
+        """
+        contains_streams = False
+        for position, element in self._elements:
+            # Stream.coreInsert() would round the offset to a float.
+            self.stream.coreGuardBeforeAddElement(element)
+            self.stream.setElementOffset(
+                element, self._quarter_length(position), addElement=True
+            )
+            element.sites.add(self.stream)
+            self.stream._elements.append(element)
+            contains_streams = contains_streams or element.isStream
+        self.stream.coreElementsChanged(updateIsFlat=contains_streams)
+        self.stream.isSorted = self._sorted
+        self._elements = []
+        return self.stream
+
+    def _insert_at(self, position, element):
+        # Same test as Stream.coreInsert(): elements added after the end keep the stream sorted.
+        if self._sorted and position <= self._highest_position:
+            if position < self._highest_position:
+                self._sorted = False
+            elif self._last is not None and self._last[0] == position:
+                last_position, last_element = self._last
+                if not _sort_tuple_at(
+                    last_element, self._quarter_length(last_position)
+                ) < _sort_tuple_at(element, self._quarter_length(position)):
+                    self._sorted = False
+        self._elements.append((position, element))
+        self._last = (position, element)
+        end = position + self._position(element.duration.quarterLength)
+        if self.ppq is None:
+            end = common.opFrac(end)
+        if end > self._highest_position:
+            self._highest_position = end
+
+    def _position(self, quarter_length):
+        # Converts a quarter length to a position on the timeline of the builder.
+        if self.ppq is None:
+            return common.opFrac(quarter_length)
+        ticks = self._ticks.get(quarter_length)
+        if ticks is None:
+            ticks = fractions.Fraction(quarter_length) * self.ppq
+            if ticks.denominator != 1:
+                raise ValueError(
+                    f"{quarter_length} is not a whole number of ticks at {self.ppq} PPQ"
+                )
+            ticks = self._ticks[quarter_length] = int(ticks)
+        return ticks
+
+    def _quarter_length(self, position):
+        if self.ppq is None:
+            return position
+        return common.opFrac(fractions.Fraction(position, self.ppq))
+
+
+def ticks_per_quarter(quarter_lengths: Iterable[Union[float, fractions.Fraction]]) -> int:
+    """Returns the lowest resolution at which quarter lengths are whole numbers of ticks.
+
+    The resolution is the least common multiple of the denominators of the quarter lengths, so
+    that a talea of triplets and sixteenths, for example, gives 12 ticks per quarter note.
+
+    Args:
+        quarter_lengths: The quarter lengths to represent.
+
+    Returns:
+        The number of ticks per quarter note.
+    """
+    ppq = 1
+    for quarter_length in quarter_lengths:
+        denominator = common.opFrac(quarter_length).as_integer_ratio()[1]
+        if ppq % denominator:
+            ppq = ppq * denominator // math.gcd(ppq, denominator)
+    return ppq
+
+
+class NoteIndex:
+    """Flattened notes of a stream, with their offsets and durations.
+
+    Flattening a stream and iterating over its notes is costly, so a stream that is processed
+    several times can be indexed once, and the index passed to the arvo functions in place of the
+    stream. An index reflects the stream at the time it was built: note_index() returns an index
+    that is rebuilt whenever the stream changes.
+
+    Args:
+        stream_: The stream to index.
+    """
+
+    def __init__(self, stream_: stream.Stream):
+        self.stream = stream_
+        flat_stream = stream_.flat
+        self.notes = tuple(flat_stream.notes)
+        self.offsets = numpy.fromiter(
+            (flat_stream.elementOffset(note_) for note_ in self.notes),
+            dtype=float,
+            count=len(self.notes),
+        )
+        self.durations = numpy.fromiter(
+            (note_.duration.quarterLength for note_ in self.notes),
+            dtype=float,
+            count=len(self.notes),
+        )
+
+    @classmethod
+    def from_notes(
+        cls,
+        stream_: stream.Stream,
+        notes: Iterable[note.NotRest],
+        offsets: Sequence[float],
+        durations: Sequence[float],
+    ) -> NoteIndex:
+        """Builds the index of a stream from its notes, without flattening the stream.
+
+        Args:
+            stream_: The indexed stream.
+            notes: The notes and chords of the flattened stream, in order.
+            offsets: The offsets of the notes in the flattened stream.
+            durations: The quarter lengths of the notes.
+
+        Returns:
+            A new NoteIndex.
+        """
+        index = cls.__new__(cls)
+        index.stream = stream_
+        index.notes = tuple(notes)
+        index.offsets = numpy.asarray(offsets, dtype=float)
+        index.durations = numpy.asarray(durations, dtype=float)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __getitem__(self, index):
+        return self.notes[index]
+
+    def __iter__(self):
+        return iter(self.notes)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} of {self.stream!r}: {len(self.notes)} notes>"
+
+
+# Key of the note index in the cache of music21 streams, which is cleared on every change of the
+# stream or of its substreams.
+_NOTE_INDEX_CACHE_KEY = "arvo.noteIndex"
+
+
+def note_index(stream_: Union[stream.Stream, NoteIndex]) -> NoteIndex:
+    """Returns the note index of a stream.
+
+    The index is cached on the stream and only rebuilt after the stream changes. Streams with a
+    note_index() method, such as the lazy streams of the plans module, build their own index.
+
+    Args:
+        stream_: The stream to index. Indexes are returned as is.
+
+    Returns:
+        The NoteIndex of the stream.
+    """
+    if isinstance(stream_, NoteIndex):
+        return stream_
+    index = stream_._cache.get(_NOTE_INDEX_CACHE_KEY)
+    if index is None:
+        index = stream_.note_index() if hasattr(stream_, "note_index") else NoteIndex(stream_)
+        stream_._cache[_NOTE_INDEX_CACHE_KEY] = index
+    return index
+
+
+def source_stream(stream_: Union[stream.Stream, NoteIndex]) -> stream.Stream:
+    """Returns the stream of a note index, or the stream itself.
+
+    Args:
+        stream_: A stream or a NoteIndex.
+
+    Returns:
+        The indexed stream.
+    """
+    if isinstance(stream_, NoteIndex):
+        return stream_.stream
+    return stream_
+
+
+class Sonority(NamedTuple):
+    """Notes sounding together between two changes of the texture.
+
+    Attributes:
+        offset: The offset at which the sonority starts.
+        quarter_length: The duration of the sonority.
+        notes: The notes and chords sounding, ordered by offset, then by part.
+    """
+
+    offset: Union[float, fractions.Fraction]
+    quarter_length: Union[float, fractions.Fraction]
+    notes: Tuple[note.NotRest, ...]
+
+
+# Number of notes per block of the offset index. Queries check the highest end of each block, then
+# the notes of the blocks that can contain matches.
+_OFFSET_INDEX_BLOCK = 64
+
+
+class OffsetIndex:
+    """Notes of a stream and of its parts, indexed by the time span during which they sound.
+
+    music21 offset queries and chordify() walk the whole stream on each call, which is too slow to
+    check the notes sounding under every note of a long score. The index sorts the notes of all
+    parts once by offset, and keeps the highest end of each block of notes, so that queries only
+    look at the blocks which can contain notes sounding at the requested time.
+
+    Like the NoteIndex, the index reflects the stream at the time it was built.
+
+    Args:
+        stream_: The stream to index, or a NoteIndex. Streams containing parts, such as scores,
+          have their parts numbered in order; the notes of other streams all belong to part 0.
+
+    Attributes:
+        notes: The notes and chords of the stream, ordered by offset, then by part.
+        offsets: The offsets of the notes.
+        ends: The offsets at which the notes stop sounding.
+        parts: The number of the part of each note.
+    """
+
+    def __init__(self, stream_: Union[stream.Stream, NoteIndex]):
+        if isinstance(stream_, NoteIndex):
+            notes = list(stream_.notes)
+            offsets = stream_.offsets
+            durations = stream_.durations
+            parts = [0] * len(notes)
+        else:
+            if stream_.hasPartLikeStreams():
+                part_streams = list(stream_.getElementsByClass(stream.Stream))
+            else:
+                part_streams = [stream_]
+            notes, offsets, durations, parts = [], [], [], []
+            for part_number, part in enumerate(part_streams):
+                start = 0 if part is stream_ else stream_.elementOffset(part)
+                flat_part = part.flat
+                for note_ in flat_part.notes:
+                    notes.append(note_)
+                    offsets.append(start + flat_part.elementOffset(note_))
+                    durations.append(note_.duration.quarterLength)
+                    parts.append(part_number)
+        # Offsets and ends are kept in integer ticks, so that triplets compare exactly
+        offsets = numpy.asarray(offsets, dtype=float)
+        durations = numpy.asarray(durations, dtype=float)
+        self._ppq = _array_ticks_per_quarter(durations, offsets)
+        offset_ticks = numpy.rint(offsets * self._ppq).astype(numpy.int64)
+        end_ticks = offset_ticks + numpy.rint(durations * self._ppq).astype(numpy.int64)
+        order = numpy.argsort(offset_ticks, kind="stable")
+        self.notes = tuple(notes[index] for index in order)
+        self._offset_ticks = offset_ticks[order]
+        self._end_ticks = end_ticks[order]
+        self.offsets = self._offset_ticks / self._ppq
+        self.ends = self._end_ticks / self._ppq
+        self.parts = numpy.asarray(parts, dtype=int)[order]
+        if len(self.notes):
+            self._block_ends = numpy.maximum.reduceat(
+                self._end_ticks, numpy.arange(0, len(self.notes), _OFFSET_INDEX_BLOCK)
+            )
+        else:
+            self._block_ends = numpy.zeros(0, dtype=numpy.int64)
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def __repr__(self) -> str:
+        part_count = len(numpy.unique(self.parts))
+        return f"<{type(self).__name__}: {len(self.notes)} notes in {part_count} parts>"
+
+    def indices_at(self, offset: Union[float, fractions.Fraction]) -> numpy.ndarray:
+        """Returns the positions in notes of the notes sounding at an offset.
+
+        Notes sound from their offset, included, to their end, excluded.
+
+        Args:
+            offset: The offset.
+
+        Returns:
+            The sorted positions of the notes.
+        """
+        # Notes start and end on whole ticks, so a note sounds at an offset between two ticks
+        # if it sounds at the tick before.
+        tick = math.floor(self._ticks(offset))
+        indices = self._candidates(numpy.searchsorted(self._offset_ticks, tick, "right"), tick)
+        return indices[self._end_ticks[indices] > tick]
+
+    def indices_overlapping(
+        self, start: Union[float, fractions.Fraction], end: Union[float, fractions.Fraction]
+    ) -> numpy.ndarray:
+        """Returns the positions in notes of the notes sounding between two offsets.
+
+        Notes without duration, such as grace notes, are included when their offset is within
+        the range. Empty ranges contain no notes.
+
+        Args:
+            start: The start of the range, included.
+            end: The end of the range, excluded.
+
+        Returns:
+            The sorted positions of the notes.
+
+        Raises:
+            ValueError: If end is before start.
+        """
+        start_ticks, end_ticks = self._ticks(start), self._ticks(end)
+        if end_ticks < start_ticks:
+            raise ValueError(f"end {end} is before start {start}")
+        if end_ticks == start_ticks:
+            return numpy.zeros(0, dtype=int)
+        after = math.floor(start_ticks)
+        indices = self._candidates(
+            numpy.searchsorted(self._offset_ticks, math.ceil(end_ticks), "left"), after
+        )
+        ends = self._end_ticks[indices]
+        offsets = self._offset_ticks[indices]
+        return indices[(ends > after) | ((ends == offsets) & (offsets >= math.ceil(start_ticks)))]
+
+    def sounding_at(self, offset: Union[float, fractions.Fraction]) -> List[note.NotRest]:
+        """Returns the notes sounding at an offset (see indices_at()).
+
+        Args:
+            offset: The offset.
+
+        Returns:
+            The notes and chords, ordered by offset, then by part.
+        """
+        return [self.notes[index] for index in self.indices_at(offset)]
+
+    def overlapping(
+        self, start: Union[float, fractions.Fraction], end: Union[float, fractions.Fraction]
+    ) -> List[note.NotRest]:
+        """Returns the notes sounding between two offsets (see indices_overlapping()).
+
+        Args:
+            start: The start of the range, included.
+            end: The end of the range, excluded.
+
+        Returns:
+            The notes and chords, ordered by offset, then by part.
+        """
+        return [self.notes[index] for index in self.indices_overlapping(start, end)]
+
+    def sonorities(self) -> Iterator[Sonority]:
+        """Generates the successive sonorities of the stream, like a chordified stream.
+
+        A new sonority starts whenever a note starts or stops. Silences and notes without
+        duration are left out.
+
+        Yields:
+            The Sonority of each time span during which the same notes sound.
+        """
+        sounding = numpy.flatnonzero(self._end_ticks > self._offset_ticks)
+        boundaries = numpy.unique(
+            numpy.concatenate([self._offset_ticks[sounding], self._end_ticks[sounding]])
+        )
+        starts = numpy.searchsorted(boundaries, self._offset_ticks[sounding])
+        stops = numpy.searchsorted(boundaries, self._end_ticks[sounding])
+        starting = _group_by(starts, sounding, len(boundaries))
+        stopping = _group_by(stops, sounding, len(boundaries))
+        active = set()
+        for position in range(len(boundaries) - 1):
+            active.difference_update(stopping[position])
+            active.update(starting[position])
+            if active:
+                offset = common.opFrac(fractions.Fraction(int(boundaries[position]), self._ppq))
+                end = common.opFrac(fractions.Fraction(int(boundaries[position + 1]), self._ppq))
+                yield Sonority(
+                    offset,
+                    common.opFrac(end - offset),
+                    tuple(self.notes[index] for index in sorted(active)),
+                )
+
+    def _ticks(self, offset: Union[float, fractions.Fraction]) -> fractions.Fraction:
+        # The exact position of an offset in ticks, which may fall between two ticks
+        return fractions.Fraction(common.opFrac(offset)) * self._ppq
+
+    def _candidates(self, stop: int, after: int) -> numpy.ndarray:
+        # Positions before stop, in the blocks that contain notes ending at or after a tick
+        full_blocks = stop // _OFFSET_INDEX_BLOCK
+        blocks = numpy.flatnonzero(self._block_ends[:full_blocks] >= after)
+        indices = (
+            blocks[:, numpy.newaxis] * _OFFSET_INDEX_BLOCK + numpy.arange(_OFFSET_INDEX_BLOCK)
+        ).ravel()
+        return numpy.concatenate(
+            [indices, numpy.arange(full_blocks * _OFFSET_INDEX_BLOCK, stop)]
+        ).astype(int)
+
+
+def _array_ticks_per_quarter(*quarter_lengths: numpy.ndarray) -> int:
+    # ticks_per_quarter() of arrays of quarter lengths. Only the distinct values which aren't
+    # whole numbers of ticks at the resolution found so far are converted to fractions.
+    ppq = 1
+    for values in quarter_lengths:
+        scaled = values * ppq
+        inexact = numpy.unique(values[numpy.abs(scaled - numpy.rint(scaled)) > 1e-6])
+        ppq = math.lcm(ppq, ticks_per_quarter(inexact.tolist()))
+    return ppq
+
+
+def _group_by(keys: numpy.ndarray, values: numpy.ndarray, count: int) -> List[List[int]]:
+    # Groups values by integer keys between 0 and count
+    groups = [[] for _ in range(count)]
+    for key_, value in zip(keys.tolist(), values.tolist()):
+        groups[key_].append(value)
+    return groups
+
+
+@instrument.instrumented
+def bar(
+    original_stream: Union[stream.Stream, NoteIndex],
+    time_signatures: Union[
+        str, meter.TimeSignature, Sequence[Tuple[float, Union[str, meter.TimeSignature]]]
+    ],
+    in_place: bool = False,
+) -> stream.Part:
+    """Splits a stream into measures.
+
+    A faster alternative to music21's makeMeasures() and makeTies() for generated streams, which
+    places all elements in a single sweep over the stream, given its time signatures. Notes and
+    rests crossing barlines are split, and the notes are tied over the barlines.
+
+    Args:
+        original_stream: The stream to split into measures, or its NoteIndex.
+        time_signatures: The time signature of the stream, or a sequence of (offset, time
+          signature) pairs, starting at offset 0. Time signatures can be music21 TimeSignature
+          objects or strings ("3/4"). Time signature changes should fall on barlines: otherwise,
+          the preceding measure is left incomplete.
+        in_place: Optional; If true, the elements of the original stream are placed in the
+          measures instead of copies of them, and notes crossing barlines are shortened. By
+          default, the original stream is left untouched.
+
+    Returns:
+        A new Part containing the measures.
+    """
+    original_stream = source_stream(original_stream)
+    if not in_place:
+        original_stream = copy.deepcopy(original_stream)
+    flat_stream = original_stream.flat
+
+    # Compute the offsets and time signatures of all measures.
+    if isinstance(time_signatures, (str, meter.TimeSignature)):
+        time_signatures = [(0, time_signatures)]
+    changes = sorted(
+        (common.opFrac(offset), meter.TimeSignature(ts) if isinstance(ts, str) else ts)
+        for offset, ts in time_signatures
+    )
+    if not changes or changes[0][0] != 0:
+        raise ValueError("the first time signature must be at offset 0")
+    highest_time = flat_stream.highestTime
+    measure_starts = []
+    measure_ends = []
+    measures = []
+    for change_index, (offset, time_signature) in enumerate(changes):
+        next_change = (
+            changes[change_index + 1][0] if change_index + 1 < len(changes) else None
+        )
+        bar_duration = time_signature.barDuration.quarterLength
+        first = True
+        while (next_change is None and (offset < highest_time or not measures)) or (
+            next_change is not None and offset < next_change
+        ):
+            measure = stream.Measure(number=len(measures) + 1)
+            if first:
+                measure.timeSignature = copy.deepcopy(time_signature)
+                first = False
+            measures.append(StreamBuilder(measure))
+            measure_starts.append(offset)
+            offset = common.opFrac(offset + bar_duration)
+            if next_change is not None and offset > next_change:
+                offset = next_change
+            measure_ends.append(offset)
+
+    # Sweep over the elements, which are sorted by offset.
+    post_stream = StreamBuilder(stream.Part())
+    measure_index = 0
+    for element in flat_stream.elements:
+        if isinstance(element, meter.TimeSignature) or "Barline" in element.classes:
+            continue
+        if isinstance(element, spanner.Spanner):
+            post_stream.insert(0, element)
+            continue
+        offset = flat_stream.elementOffset(element)
+        while (
+            measure_index + 1 < len(measure_starts)
+            and measure_starts[measure_index + 1] <= offset
+        ):
+            measure_index += 1
+        if not isinstance(element, note.GeneralNote):
+            measures[measure_index].insert(offset - measure_starts[measure_index], element)
+            continue
+        _bar_note(element, offset, measure_index, measures, measure_starts, measure_ends)
+
+    for measure in measures:
+        post_stream.append(measure.commit())
+    measures[-1].stream.rightBarline = "final"
+    return post_stream.commit()
+
+
+def _bar_note(note_, offset, measure_index, measures, measure_starts, measure_ends):
+    # Places a note or rest in its measure, splitting it and tying it over the next barlines.
+    end = common.opFrac(offset + note_.duration.quarterLength)
+    original_tie = None if note_.isRest or note_.tie is None else note_.tie.type
+    piece = note_
+    while True:
+        measure_start = measure_starts[measure_index]
+        measure_end = measure_ends[measure_index]
+        is_last = end <= measure_end or measure_index + 1 == len(measures)
+        if not is_last:
+            next_piece = copy.deepcopy(piece)
+            piece.duration = copy.deepcopy(
+                _duration_prototype(common.opFrac(measure_end - offset))
+            )
+            if not piece.isRest:
+                piece.tie = tie.Tie(
+                    "start" if original_tie in (None, "start") and piece is note_ else "continue"
+                )
+        elif piece is not note_:
+            piece.duration = copy.deepcopy(_duration_prototype(common.opFrac(end - offset)))
+            if not piece.isRest:
+                piece.tie = tie.Tie("stop" if original_tie in (None, "stop") else "continue")
+        measures[measure_index].insert(common.opFrac(offset - measure_start), piece)
+        if is_last:
+            return
+        offset = measure_end
+        measure_index += 1
+        piece = next_piece
+
+
+def _sort_tuple_at(element, offset):
+    sort_tuple = list(element.sortTuple())
+    sort_tuple[1] = offset
+    return tuple(sort_tuple)
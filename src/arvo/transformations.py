@@ -1,101 +1,146 @@
 """
 Module for transformations such as transposition and inversion.
+
+The transformations can run concurrently, for example from a thread pool exporting several
+sections. Reference scales are shared between threads safely: scales that repeat at the octave
+(including the default chromatic scale) are compiled into tables that are never modified, and the
+interval networks of the other scales, or used for pitches outside the scale, are only used
+locked (see scales.ScaleSteps).
 """
+
+from __future__ import annotations
+
 import copy
-from typing import Union
+import functools
+from typing import Callable, Iterable, List, Optional, Union
+
+from arvo import _lazy
+from arvo import cache
+from arvo import instrument
+from arvo import tools
+
+pitch = _lazy.load("music21.pitch")
+scale = _lazy.load("music21.scale")
+stream = _lazy.load("music21.stream")
+scales = _lazy.load("arvo.scales")
+io = _lazy.load("arvo.io")
+numpy = _lazy.load("numpy")
+
 
-from music21 import pitch
-from music21 import scale
-from music21 import stream
+__all__ = ["scalar_transposition", "scalar_inversion", "octave_shift", "Variation", "variations"]
 
-__all__ = ["scalar_transposition", "scalar_inversion", "octave_shift"]
+# Columns of event tables describing the spelling of pitches, which variations may change
+_PITCH_COLUMNS = ("midi", "step", "alter", "octave", "microtone")
 
 
+@instrument.instrumented
+@cache.cached
 def scalar_transposition(
-    original_stream: stream.Stream,
+    original_stream: Union[stream.Stream, tools.NoteIndex, io.EventTable],
     steps: int,
-    reference_scale: scale.ConcreteScale = scale.ChromaticScale("C"),
+    reference_scale: Optional[scale.ConcreteScale] = None,
     in_place: bool = False,
-) -> stream.Stream:
+) -> Union[stream.Stream, io.EventTable]:
     """Performs scale-space transpotition on a stream.
 
     Transposes all notes in a stream by a specified amount of scale steps in a specific scale space.
 
     Args:
-        original_stream: The stream to process.
+        original_stream: The stream to process, its NoteIndex, or an EventTable.
         steps: The amount of steps to transpose. Positive values transpose up, negative values
           transpose down.
         reference_scale: Optional; The scale to use as reference. By default, the chromatic scale
           is used.
         in_place: Optional; If true, the operation is done in place on the original stream. By
-          default, a new Stream object is returned.
+          default, a new Stream object is returned. Event tables are never modified in place.
 
     Returns:
         The transposed stream.
     """
+    scale_steps = _scale_steps(reference_scale)
+
+    if isinstance(original_stream, io.EventTable):
+        return original_stream.map_pitches(
+            lambda pitch_: _transpose_pitch_in_scale_space(pitch_, steps, scale_steps)
+        )
+
     # Check if stream is to be processed in place
+    original_stream = tools.source_stream(original_stream)
     post_stream = original_stream if in_place else copy.deepcopy(original_stream)
 
     # Transpose all individual pitches
     for pitch_ in post_stream.pitches:
-        _transpose_pitch_in_scale_space(pitch_, steps, reference_scale)
+        _transpose_pitch_in_scale_space(pitch_, steps, scale_steps)
 
     return post_stream
 
 
+@instrument.instrumented
+@cache.cached
 def scalar_inversion(
-    original_stream: stream.Stream,
+    original_stream: Union[stream.Stream, tools.NoteIndex, io.EventTable],
     inversion_axis: Union[str, pitch.Pitch],
-    reference_scale: scale.ConcreteScale = scale.ChromaticScale("C"),
+    reference_scale: Optional[scale.ConcreteScale] = None,
     in_place: bool = False,
-) -> stream.Stream:
+) -> Union[stream.Stream, io.EventTable]:
     """Performs a scale-space inversion on a stream.
 
     Args:
-        original_stream: The stream to process.
+        original_stream: The stream to process, its NoteIndex, or an EventTable.
         inversion_axis: The pitch around which to execute the inversion.
         reference_scale: Optional; The scale to use as reference. By default, the chromatic scale is
           used.
         in_place: Optional; If true, the operation is done in place on the original stream. By
-          default, a new Stream object is returned.
+          default, a new Stream object is returned. Event tables are never modified in place.
 
     Returns:
         The inverted stream.
     """
-    # Check if stream is to be processed in place
-    post_stream = original_stream if in_place else copy.deepcopy(original_stream)
+    scale_steps = _scale_steps(reference_scale)
 
     # Check if inversion_axis is Pitch
     if isinstance(inversion_axis, str):
         inversion_axis = pitch.Pitch(inversion_axis)
 
+    def invert_pitch(pitch_):
+        distance_from_axis = scale_steps.distance(inversion_axis, pitch_)
+        _transpose_pitch_in_scale_space(pitch_, distance_from_axis * -2, scale_steps)
+
+    if isinstance(original_stream, io.EventTable):
+        return original_stream.map_pitches(invert_pitch)
+
+    # Check if stream is to be processed in place
+    original_stream = tools.source_stream(original_stream)
+    post_stream = original_stream if in_place else copy.deepcopy(original_stream)
+
     # Invert all individual pitches
     for pitch_ in post_stream.pitches:
-        distance_from_axis = _get_scale_distance(
-            inversion_axis, pitch_, reference_scale
-        )
-        _transpose_pitch_in_scale_space(
-            pitch_, distance_from_axis * -2, reference_scale
-        )
+        invert_pitch(pitch_)
 
     return post_stream
 
 
+@instrument.instrumented
+@cache.cached
 def retrograde(
-    original_stream: stream.Stream,
+    original_stream: Union[stream.Stream, tools.NoteIndex, io.EventTable],
     in_place: bool = False,
-) -> stream.Stream:
+) -> Union[stream.Stream, io.EventTable]:
     """Performs a retrograde operation on a Stream.
 
     Args:
-        original_stream: The Stream to process.
+        original_stream: The Stream to process, its NoteIndex, or an EventTable.
         in_place: Optional; If true, the operation is done in place on the original stream. By
-          default, a new Stream object is returned.
+          default, a new Stream object is returned. Event tables are never modified in place.
 
     Returns:
         The reversed Stream.
     """
+    if isinstance(original_stream, io.EventTable):
+        return _retrograde_events(original_stream)
+
     # Check if stream is to be processed in place
+    original_stream = tools.source_stream(original_stream)
     post_stream = original_stream if in_place else copy.deepcopy(original_stream)
 
     # Extract list of notes and clear stream of bars and notes
@@ -104,14 +149,13 @@ def retrograde(
     post_stream.removeByClass("Measure")
     post_stream.remove(notes, recurse=True)
 
-    # Build new stream of notes in reverse order
-    reverse_stream = stream.Stream()
+    # Put back notes in the stream in reverse order
+    builder = tools.StreamBuilder(post_stream)
+    offset = 0.0
     for note_ in reversed(notes):
-        reverse_stream.append(note_)
-
-    # Put back notes in the stream
-    for note_ in reverse_stream.notes:
-        post_stream.insert(note_.offset, note_)
+        builder.insert(offset, note_)
+        offset += note_.duration.quarterLength
+    builder.commit()
 
     post_stream.sort()
     #post_stream.makeMeasures(inPlace=True)
@@ -119,20 +163,32 @@ def retrograde(
     return post_stream
 
 
-def octave_shift(original_stream: stream.Stream, octave_interval, in_place=False):
+@instrument.instrumented
+@cache.cached
+def octave_shift(
+    original_stream: Union[stream.Stream, tools.NoteIndex, io.EventTable],
+    octave_interval,
+    in_place=False,
+):
     """Transpooses a Stream up or down by a number of octaves
 
     Args:
-        original_stream: Stream to process.
+        original_stream: Stream to process, its NoteIndex, or an EventTable.
         octave_interval: The octave shift. Postive numbers transpose up, negative numbers transpose
           down.
         in_place: Optional; If true, the operation is done in place on the original stream. By
-          default, a new Stream object is returned.
+          default, a new Stream object is returned. Event tables are never modified in place.
 
     Returns:
         The transposed Stream.
     """
+    if isinstance(original_stream, io.EventTable):
+        return original_stream.map_pitches(
+            lambda pitch_: setattr(pitch_, "ps", pitch_.ps + 12 * octave_interval)
+        )
+
     # Check if stream is to be processed in place
+    original_stream = tools.source_stream(original_stream)
     post_stream = original_stream if in_place else copy.deepcopy(original_stream)
 
     # Transpose all individual pitches
@@ -142,47 +198,191 @@ def octave_shift(original_stream: stream.Stream, octave_interval, in_place=False
     return post_stream
 
 
+class Variation:
+    """Variation of a base stream, stored as the pitches that differ from the base.
+
+    Variations keep the rhythm of their base stream: they share the stream and its event table,
+    and only store the rows of the table whose pitch changed, so their size grows with the number
+    of changed pitches rather than with the length of the stream.
+
+    Attributes:
+        base: The base stream, or the base EventTable.
+        base_events: The EventTable of the base.
+        rows: The rows of base_events whose pitch differs in the variation.
+        changes: The rows of the variation at those positions, as an EventTable.
+    """
+
+    def __init__(
+        self,
+        base: Union[stream.Stream, io.EventTable],
+        base_events: io.EventTable,
+        rows: numpy.ndarray,
+        changes: io.EventTable,
+    ):
+        self.base = base
+        self.base_events = base_events
+        self.rows = rows
+        self.changes = changes
+
+    def __repr__(self) -> str:
+        return (
+            f"<{type(self).__name__}: {len(self.rows)} of {len(self.base_events)} pitches changed>"
+        )
+
+    @property
+    def events(self) -> io.EventTable:
+        """The EventTable of the variation, sharing the rhythm columns of the base table."""
+        columns = {}
+        for name in _PITCH_COLUMNS:
+            column = self.base_events[name].copy()
+            column[self.rows] = self.changes[name]
+            columns[name] = column
+        return self.base_events.replace(**columns)
+
+    def to_stream(self) -> stream.Stream:
+        """Creates the stream of the variation.
+
+        Streams are copies of the base stream, with the other elements of the base, such as time
+        signatures. Variations of event tables create their notes with EventTable.to_stream().
+
+        Returns:
+            A new Stream.
+        """
+        if isinstance(self.base, io.EventTable):
+            return self.events.to_stream()
+        post_stream = copy.deepcopy(self.base)
+        elements = io.event_elements(post_stream)
+        _, first_rows = numpy.unique(self.base_events["event"], return_index=True)
+        for change, row in enumerate(self.rows.tolist()):
+            event = int(self.base_events["event"][row])
+            target = elements[event].pitches[row - first_rows[event]]
+            _set_spelling(target, self.changes.pitch(change))
+        return post_stream
+
+
+@instrument.instrumented
+def variations(
+    base: Union[stream.Stream, tools.NoteIndex, io.EventTable],
+    transforms: Iterable[Callable[[io.EventTable], Union[io.EventTable, stream.Stream]]],
+) -> List[Variation]:
+    """Creates variations of the pitches of a stream.
+
+    Each transform receives the event table of the base and returns the transformed table or
+    stream, without changing its rhythm. The transformations of this module accept event tables:
+
+        sections = transformations.variations(
+            melody,
+            [
+                functools.partial(transformations.scalar_transposition, steps=steps,
+                                  reference_scale=reference_scale)
+                for steps in range(0, -16, -2)
+            ],
+        )
+
+    Transforms working on streams can convert the table with EventTable.to_stream(). Only the
+    pitches which differ from the base are kept, and streams are created on demand with
+    Variation.to_stream().
+
+    Args:
+        base: The base stream, its NoteIndex, or an EventTable.
+        transforms: The functions creating the variations.
+
+    Returns:
+        The variations, in the order of the transforms.
+
+    Raises:
+        ValueError: If a transform changes the rhythm, ties or voices of the base.
+    """
+    if not isinstance(base, io.EventTable):
+        base = tools.source_stream(base)
+        base_events = io.EventTable.from_stream(base)
+    else:
+        base_events = base
+    sounding = base_events["kind"] != io.REST
+    result = []
+    for transform in transforms:
+        events = transform(base_events)
+        if not isinstance(events, io.EventTable):
+            events = io.EventTable.from_stream(events)
+        if not _same_rhythm(base_events, events):
+            raise ValueError(f"{transform!r} changes the rhythm of the base")
+        changed = numpy.zeros(len(base_events), dtype=bool)
+        for name in _PITCH_COLUMNS:
+            before, after = base_events[name], events[name]
+            same = before == after
+            if before.dtype.kind == "f":
+                same |= numpy.isnan(before) & numpy.isnan(after)
+            changed |= ~same
+        rows = numpy.flatnonzero(changed & sounding)
+        changes = io.EventTable(
+            {name: events[name][rows] for name, _ in io.COLUMNS}, base_events.ppq
+        )
+        result.append(Variation(base, base_events, rows, changes))
+    return result
+
+
+def _same_rhythm(events: io.EventTable, other: io.EventTable) -> bool:
+    # Compares the columns of two tables other than pitches, offsets at their own resolutions
+    if len(events) != len(other):
+        return False
+    for name in ("offset", "duration"):
+        if not numpy.array_equal(events[name] * other.ppq, other[name] * events.ppq):
+            return False
+    return all(
+        numpy.array_equal(events[name], other[name]) for name in ("event", "kind", "voice", "tie")
+    )
+
+
+def _set_spelling(target: pitch.Pitch, source: pitch.Pitch):
+    # Copies the spelling of a pitch, keeping the Pitch object held by its note or chord
+    target.step = source.step
+    target.octave = source.octave
+    target.accidental = source.accidental
+    target.microtone = source.microtone
+
+
+def _retrograde_events(events: io.EventTable) -> io.EventTable:
+    # Reverses the notes and chords of an event table, like retrograde() does with streams: rests
+    # keep their offsets.
+    sounding = events["kind"] != io.REST
+    event_numbers, first_rows = numpy.unique(events["event"][sounding], return_index=True)
+    if not len(event_numbers):
+        return events
+    durations = events["duration"][sounding][first_rows]
+    # The offsets of the events once reversed, in their original order
+    reversed_offsets = numpy.concatenate([[0], numpy.cumsum(durations[::-1])[:-1]])[::-1]
+    offsets = events["offset"].copy()
+    offsets[sounding] = reversed_offsets[
+        numpy.searchsorted(event_numbers, events["event"][sounding])
+    ]
+    # Rests come first at equal offsets, as they do once the stream is sorted
+    order = numpy.lexsort((sounding, offsets))
+    columns = {name: events[name][order] for name, _ in io.COLUMNS}
+    columns["offset"] = offsets[order]
+    return io.EventTable(columns, events.ppq)
+
+
+def _scale_steps(reference_scale: Optional[scale.ConcreteScale]) -> scales.ScaleSteps:
+    if reference_scale is None:
+        return _default_scale_steps()
+    return scales.ScaleSteps(reference_scale)
+
+
+@functools.lru_cache(maxsize=None)
+def _default_scale_steps() -> scales.ScaleSteps:
+    # Built on first use rather than as a default argument, so importing the module stays cheap.
+    # The chromatic interval scale spells like music21's ChromaticScale, but transposes with tables.
+    return scales.ScaleSteps(scales.IntervalScale([1] * 12, "C"))
+
+
 def _transpose_pitch_in_scale_space(
     original_pitch: pitch.Pitch,
     steps: int,
-    reference_scale: scale.ConcreteScale,
+    scale_steps: scales.ScaleSteps,
 ) -> pitch.Pitch:
     if steps == 0:
         return
-    if steps > 0:
-        direction = "ascending"
-    else:
-        direction = "descending"
-        steps *= -1
-    new_pitch = reference_scale.next(original_pitch, direction, steps)
+    new_pitch = scale_steps.transpose_pitch(original_pitch, steps)
     original_pitch.step = new_pitch.step
     original_pitch.octave = new_pitch.octave
     original_pitch.accidental = new_pitch.accidental
-
-
-def _get_scale_distance(pitch_a, pitch_b, reference_scale):
-    if isinstance(pitch_a, str):
-        pitch_a = pitch.Pitch(pitch_a)
-    if isinstance(pitch_b, str):
-        pitch_b = pitch.Pitch(pitch_b)
-
-    if pitch_a.ps == pitch_b.ps:
-        return 0
-
-    direction = "ascending"
-    if pitch_b.ps < pitch_a.ps:
-        direction = "descending"
-
-    scale_distance = 0
-    while True:
-        scale_distance += 1
-        next_pitch = reference_scale.next(pitch_a, direction, scale_distance)
-        if next_pitch.ps == pitch_b.ps:
-            break
-        if scale_distance > 1000:
-            return 0
-
-    if direction == "descending":
-        scale_distance *= -1
-
-    return scale_distance
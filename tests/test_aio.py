@@ -0,0 +1,110 @@
+import asyncio
+import concurrent.futures
+
+import pytest
+from arvo import aio
+from arvo import cache
+from arvo import instrument
+from arvo import minimalism
+from arvo import tools
+from arvo import transformations
+
+
+def _names(s):
+    return [(n.offset, n.nameWithOctave) for n in s.notes]
+
+
+def test_same_results():
+    pattern = tools.notes_to_stream(["C4", "D4", "E4", "F4", "G4"])
+
+    async def generate():
+        return await asyncio.gather(
+            aio.additive_process(pattern, minimalism.Direction.INWARD),
+            aio.retrograde(pattern),
+            aio.scalar_transposition(pattern, 2),
+        )
+
+    results = asyncio.run(generate())
+    assert _names(results[0]) == _names(
+        minimalism.additive_process(pattern, minimalism.Direction.INWARD)
+    )
+    assert _names(results[1]) == _names(transformations.retrograde(pattern))
+    assert _names(results[2]) == _names(transformations.scalar_transposition(pattern, 2))
+
+
+def test_progress():
+    pattern = tools.notes_to_stream(["C4", "D4", "E4", "F4", "G4"])
+    reported = []
+
+    async def generate():
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            result = await aio.subtractive_process(
+                pattern, executor=executor, progress=reported.append
+            )
+            # Let the event loop run the pending callbacks
+            await asyncio.sleep(0)
+            return result
+
+    asyncio.run(generate())
+    assert reported == [1, 2, 3, 4, 5, 6]
+
+
+def test_cache_used(tmp_path):
+    pattern = tools.notes_to_stream(["C4", "D4", "E4"])
+
+    async def generate():
+        await aio.retrograde(pattern)
+        await aio.retrograde(pattern)
+
+    with cache.use(tmp_path) as c:
+        asyncio.run(generate())
+    assert (c.hits, c.misses) == (1, 1)
+
+
+def test_calls_recorded():
+    pattern = tools.notes_to_stream(["C4", "D4", "E4"])
+    reported = []
+
+    async def generate():
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            await aio.retrograde(pattern)
+            await aio.subtractive_process(pattern, executor=executor, progress=reported.append)
+
+    with instrument.record() as stats:
+        asyncio.run(generate())
+    assert [call.function for call in stats.calls if call.depth == 0] == [
+        "arvo.transformations.retrograde",
+        "arvo.minimalism.subtractive_process",
+    ]
+
+
+def test_progress_not_supported():
+    pattern = tools.notes_to_stream(["C4"])
+    with pytest.raises(TypeError):
+        asyncio.run(aio.retrograde(pattern, progress=print))
+
+
+def test_cancellation():
+    pattern = tools.notes_to_stream([60 + i % 12 for i in range(400)])
+    reported = []
+
+    async def generate():
+        started = asyncio.Event()
+
+        def report(iteration):
+            reported.append(iteration)
+            started.set()
+
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            task = asyncio.ensure_future(
+                aio.additive_process(pattern, executor=executor, progress=report)
+            )
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # The executor waits for the cancelled process to stop
+        return len(reported)
+
+    reported_count = asyncio.run(generate())
+    assert reported_count < 400
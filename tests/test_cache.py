@@ -0,0 +1,159 @@
+import os
+
+import numpy
+import pytest
+from arvo import cache
+from arvo import distributions
+from arvo import io
+from arvo import minimalism
+from arvo import tools
+from arvo import transformations
+from music21 import articulations
+from music21 import chord
+from music21 import converter
+from music21 import stream
+
+
+def _pattern():
+    s = converter.parse("tinyNotation: 8 C D~ D E-4 r8 G4 F#8 G3").flat.notesAndRests.stream()
+    # tinyNotation has no chords
+    s.replace(s.notes[4], chord.Chord(["C3", "E3", "G3"]))
+    return s
+
+
+def _summary(s):
+    return [(e.offset, e.quarterLength, e.fullName, e.tie and e.tie.type) for e in s.elements]
+
+
+def test_cached_result_identical(tmp_path):
+    original = _pattern()
+    expected = minimalism.additive_process(original, minimalism.Direction.INWARD)
+    with cache.use(tmp_path) as c:
+        first = minimalism.additive_process(original, minimalism.Direction.INWARD)
+        second = minimalism.additive_process(original, minimalism.Direction.INWARD)
+    assert (c.hits, c.misses) == (1, 1)
+    assert _summary(first) == _summary(expected)
+    assert _summary(second) == _summary(expected)
+    assert [p.nameWithOctave for p in second.pitches] == [
+        p.nameWithOctave for p in expected.pitches
+    ]
+
+
+def test_changed_parameters_recompute(tmp_path):
+    original = _pattern()
+    with cache.use(tmp_path) as c:
+        transformations.scalar_transposition(original, 1)
+        transformations.scalar_transposition(original, 2)
+        transformations.scalar_transposition(tools.note_index(original), 1)
+        original.notes[0].pitch.octave = 5
+        transformations.scalar_transposition(original, 1)
+    assert (c.hits, c.misses) == (1, 3)
+
+
+def test_uncacheable_calls_bypass_cache(tmp_path):
+    original = _pattern()
+    with cache.use(tmp_path) as c:
+        minimalism.additive_process(original, step_value=iter([1, 2, 3]))
+        transformations.octave_shift(original, 1, in_place=True)
+    assert (c.hits, c.misses) == (0, 0)
+
+
+def test_random_calls_need_a_seed(tmp_path):
+    original = _pattern()
+    steps = distributions.Poisson(1, offset=1)
+    with cache.use(tmp_path) as c:
+        minimalism.additive_process(original, step_value=steps)
+        assert (c.hits, c.misses) == (0, 0)
+        first = minimalism.additive_process(original, step_value=steps, seed=1)
+        second = minimalism.additive_process(original, step_value=steps, seed=1)
+        minimalism.additive_process(original, step_value=distributions.Poisson(2), seed=1)
+    assert (c.hits, c.misses) == (1, 2)
+    assert _summary(second) == _summary(first)
+
+
+def _annotated_part(lyric):
+    part = stream.Part(_pattern().notes)
+    part.notes[0].lyric = lyric
+    part.notes[1].articulations.append(articulations.Staccato())
+    part.notes[2].volume.velocity = 30
+    return part
+
+
+def test_result_class_kept(tmp_path):
+    original = _pattern()
+    with cache.use(tmp_path) as c:
+        for stream_class in (stream.Stream, stream.Part):
+            first = transformations.retrograde(stream_class(original.elements))
+            second = transformations.retrograde(stream_class(original.elements))
+            assert type(first) is type(second)
+            assert _summary(second) == _summary(first)
+    assert c.hits == 2
+
+
+def test_lossy_results_not_stored(tmp_path):
+    with cache.use(tmp_path) as c:
+        results = [
+            transformations.retrograde(_annotated_part(lyric)) for lyric in ("la", "la", "lo")
+        ]
+    assert c.hits == 0
+    for result, lyric in zip(results, ("la", "la", "lo")):
+        assert isinstance(result, stream.Part)
+        assert [n.lyric for n in result.notes if n.lyric] == [lyric]
+        assert any(n.articulations for n in result.notes)
+        assert 30 in [n.volume.velocity for n in result.notes]
+
+
+def test_extra_data_fingerprinted():
+    plain = cache.key("f", s=_pattern())
+    assert cache.key("f", s=_pattern()) == plain
+    keys = {plain}
+    for lyric in ("la", "lo"):
+        annotated = _pattern()
+        annotated.notes[0].lyric = lyric
+        keys.add(cache.key("f", s=annotated))
+    staccato = _pattern()
+    staccato.notes[0].articulations.append(articulations.Staccato())
+    keys.add(cache.key("f", s=staccato))
+    assert len(keys) == 4
+
+
+def test_disabled_outside_context(tmp_path):
+    with cache.use(tmp_path):
+        assert cache.active_cache() is not None
+    assert cache.active_cache() is None
+
+
+def test_non_flat_results_not_stored(tmp_path):
+    c = cache.Cache(tmp_path)
+    assert not c.put("ab" * 32, stream.Score([stream.Part()]))
+    assert c.get("ab" * 32) is None
+
+
+def test_eviction(tmp_path):
+    c = cache.Cache(tmp_path)
+    class_name = type(_pattern()).__name__
+    for i in range(4):
+        c.put(f"{i:064x}", _pattern())
+        os.utime(c._path(f"{i:064x}", class_name), (i, i))
+    c.get(f"{0:064x}")
+    c.max_size = 2 * os.path.getsize(c._path(f"{0:064x}", class_name))
+    c.evict()
+    assert c.get(f"{0:064x}") is not None
+    assert c.get(f"{3:064x}") is not None
+    assert c.get(f"{1:064x}") is None
+    assert c.get(f"{2:064x}") is None
+
+
+def test_key_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        cache.key("f", value=object())
+
+
+def test_event_tables_stay_tables(tmp_path):
+    events = io.EventTable.from_stream(_pattern())
+    with cache.use(tmp_path) as c:
+        first = transformations.retrograde(events)
+        second = transformations.retrograde(events)
+    assert (c.hits, c.misses) == (1, 1)
+    assert isinstance(second, io.EventTable)
+    assert numpy.array_equal(second["midi"], first["midi"], equal_nan=True)
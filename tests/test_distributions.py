@@ -0,0 +1,67 @@
+import collections
+
+import pytest
+from arvo import distributions
+
+
+def test_poisson():
+    generator, = distributions.generators(0, 1)
+    values = distributions.Poisson(2, offset=1).sample(generator, 10_000)
+    assert min(values) >= 1
+    assert sum(values) / len(values) == pytest.approx(3, abs=0.1)
+    with pytest.raises(ValueError):
+        distributions.Poisson(-1)
+
+
+def test_uniform():
+    generator, = distributions.generators(0, 1)
+    assert set(distributions.Uniform(2, 4).sample(generator, 1000)) == {2, 3, 4}
+    with pytest.raises(ValueError):
+        distributions.Uniform(4, 2)
+
+
+def test_choice():
+    generator, = distributions.generators(0, 1)
+    counts = collections.Counter(
+        distributions.Choice(["a", "b", "c"], weights=[3, 1, 0]).sample(generator, 10_000)
+    )
+    assert set(counts) == {"a", "b"}
+    assert counts["a"] / counts["b"] == pytest.approx(3, rel=0.1)
+    with pytest.raises(ValueError):
+        distributions.Choice(["a", "b"], weights=[1])
+    with pytest.raises(ValueError):
+        distributions.Choice(["a", "b"], weights=[0, 0])
+    with pytest.raises(ValueError):
+        distributions.Choice([])
+
+
+def test_batches_dont_change_values():
+    poisson = distributions.Poisson(1.5)
+    values = poisson.values(distributions.generators(7, 1)[0], batch_size=3)
+    expected = poisson.sample(distributions.generators(7, 1)[0], 20)
+    assert [next(values) for _ in range(20)] == expected
+
+
+def test_generators():
+    values = [g.integers(1000, size=5).tolist() for g in distributions.generators(3, 3)]
+    assert values == [g.integers(1000, size=5).tolist() for g in distributions.generators(3, 3)]
+    assert len({tuple(v) for v in values}) == 3
+    # Requesting more generators doesn't change the first ones
+    assert distributions.generators(3, 5)[0].integers(1000, size=5).tolist() == values[0]
+    assert distributions.generators(4, 1)[0].integers(1000, size=5).tolist() != values[0]
+
+
+def test_equality():
+    assert distributions.Poisson(2) == distributions.Poisson(2)
+    assert distributions.Poisson(2) != distributions.Poisson(2, offset=1)
+    assert distributions.Choice([1, 2]) != distributions.Uniform(1, 2)
+    assert repr(distributions.Uniform(1, 3)) == "Uniform(1, 3)"
+
+
+def test_incomplete_distribution():
+    class NoParameters(distributions.Distribution):
+        def sample(self, generator, size):
+            return [0] * size
+
+    with pytest.raises(TypeError):
+        NoParameters()
@@ -0,0 +1,84 @@
+import pytest
+from arvo import cache
+from arvo import graph
+from arvo import minimalism
+from arvo import tools
+from arvo import transformations
+from music21 import converter
+
+
+def _pattern():
+    return converter.parse("tinyNotation: 8 C D E-4 r8 F#8 G4").flat.notesAndRests.stream()
+
+
+def _names(s):
+    return [(e.offset, e.quarterLength, e.fullName) for e in s.flat.notesAndRests]
+
+
+def _sections(g):
+    pattern = g.add(tools.notes_to_stream, ["C4", "D4", "E-4", "F#4"])
+    section_a = g.add(minimalism.additive_process, pattern, minimalism.Direction.INWARD)
+    section_b = g.add(transformations.retrograde, section_a, name="retrograde")
+    section_c = g.add(transformations.scalar_inversion, section_a, "D4")
+    return pattern, section_a, section_b, section_c
+
+
+def _expected():
+    pattern = tools.notes_to_stream(["C4", "D4", "E-4", "F#4"])
+    section_a = minimalism.additive_process(pattern, minimalism.Direction.INWARD)
+    return [
+        pattern,
+        section_a,
+        transformations.retrograde(section_a),
+        transformations.scalar_inversion(section_a, "D4"),
+    ]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run(workers):
+    g = graph.Graph()
+    results = g.run(*_sections(g), workers=workers)
+    assert [_names(s) for s in results] == [_names(s) for s in _expected()]
+
+
+def test_shared_nodes_declared_once():
+    g = graph.Graph()
+    pattern = _pattern()
+    first = g.add(transformations.octave_shift, pattern, 1)
+    second = g.add(transformations.octave_shift, _pattern(), octave_interval=1)
+    third = g.add(transformations.octave_shift, pattern, -1)
+    assert g.add(transformations.octave_shift, pattern, 1) is first
+    assert second is not first
+    assert third is not first
+    assert g.add(transformations.retrograde, first) is g.add(transformations.retrograde, first)
+    assert len(g) == 4
+
+
+def test_shared_nodes_computed_once(tmp_path):
+    g = graph.Graph()
+    _, section_a, _, section_c = _sections(g)
+    with cache.use(tmp_path) as c:
+        g.run(section_a, section_c, workers=0)
+    # section_a is shared by section_c but only computed once
+    assert (c.hits, c.misses) == (0, 2)
+
+
+def test_score():
+    g = graph.Graph()
+    pattern, section_a, section_b, _ = _sections(g)
+    score = g.score({"Violin": [section_a, section_b, section_a], "Cello": [pattern]}, workers=0)
+    assert [part.partName for part in score.parts] == ["Violin", "Cello"]
+    expected = _expected()
+    violin = score.parts[0]
+    assert violin.highestTime == 2 * expected[1].highestTime + expected[2].highestTime
+    last_start = violin.highestTime - expected[1].highestTime
+    assert _names(violin)[-len(expected[1].notes):] == [
+        (e.offset + last_start, e.quarterLength, e.fullName) for e in expected[1].notes
+    ]
+
+
+def test_foreign_node():
+    g = graph.Graph()
+    node = graph.Graph().add(tools.notes_to_stream, ["C4"])
+    with pytest.raises(ValueError):
+        g.run(node, workers=0)
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Importing the core arvo modules must not pull in music21 and should stay well below the cost
+# of importing music21 itself (about 0.3s).
+IMPORT_TIME_BUDGET = 0.15
+
+MODULES = [
+    "arvo.cache",
+    "arvo.distributions",
+    "arvo.graph",
+    "arvo.instrument",
+    "arvo.io",
+    "arvo.isorhythm",
+    "arvo.live",
+    "arvo.minimalism",
+    "arvo.sequences",
+    "arvo.testing",
+    "arvo.tintinnabuli",
+    "arvo.tools",
+    "arvo.transformations",
+]
+
+
+def _run_import(script):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_defers_music21(module):
+    output = _run_import(f"import sys, {module}; print('music21' in sys.modules)")
+    assert output == ["False"]
+
+
+def test_import_time_budget():
+    script = (
+        "import time; start = time.perf_counter(); "
+        f"import {', '.join(MODULES)}; "
+        "print(time.perf_counter() - start)"
+    )
+    elapsed = float(_run_import(script)[0])
+    assert elapsed < IMPORT_TIME_BUDGET
+
+
+def test_music21_loaded_on_first_use():
+    output = _run_import(
+        "import sys; from arvo import tools; "
+        "print('music21' in sys.modules); "
+        "tools.notes_to_stream(['C4']); "
+        "print('music21' in sys.modules)"
+    )
+    assert output == ["False", "True"]
@@ -0,0 +1,140 @@
+import copy
+import threading
+
+from arvo import instrument
+from arvo import io
+from arvo import isorhythm
+from arvo import minimalism
+from arvo import tools
+from arvo import transformations
+from music21 import converter
+from music21 import scale
+from music21 import stream
+
+
+def _pattern():
+    return converter.parse("tinyNotation: 8 C D E4 r8 G4 F#8").flat.notesAndRests.stream()
+
+
+def test_records_calls():
+    pattern = _pattern()
+    with instrument.record() as stats:
+        result = minimalism.additive_process(pattern)
+    assert len(stats.calls) == 1
+    call = stats.calls[0]
+    assert call.function == "arvo.minimalism.additive_process"
+    assert call.seconds > 0
+    assert call.notes_in == 5
+    assert call.notes_out == len(result.notes)
+    assert call.depth == 0
+
+
+def test_counts_deepcopies_and_inserts():
+    pattern = _pattern()
+    with instrument.record() as stats:
+        result = minimalism.additive_process(pattern, minimalism.Direction.BACKWARD)
+    # One copy and one insertion per element, notes and rests
+    assert stats.calls[0].deepcopies == len(result)
+    assert stats.calls[0].inserts == len(result)
+
+
+def test_counts_scale_steps():
+    pattern = _pattern()
+    with instrument.record() as stats:
+        # Melodic minor scales step through their interval network
+        transformations.scalar_transposition(pattern, 2, scale.MelodicMinorScale("C"))
+        # while the major scale is compiled into tables, except for the pitches outside it
+        transformations.scalar_transposition(pattern, 2, scale.MajorScale("C"))
+    assert [call.scale_next_calls for call in stats.calls] == [5, 1]
+
+
+def test_nested_calls():
+    with instrument.record() as stats:
+        isorhythm.create_isorhythm(["C4", "D4", "E4"], [1, 2])
+    functions = [call.function for call in stats.calls]
+    assert functions[-1] == "arvo.isorhythm.create_isorhythm"
+    assert "arvo.tools.notes_to_stream" in functions
+    assert [call.depth for call in stats.calls] == [1] * (len(functions) - 1) + [0]
+    # Nested calls are counted in the outer call too
+    outer = stats.calls[-1]
+    assert outer.inserts >= sum(call.inserts for call in stats.calls[:-1])
+    assert stats.seconds == outer.seconds
+
+
+def test_callbacks():
+    received = []
+    pattern = _pattern()
+    with instrument.record(received.append) as stats:
+        transformations.retrograde(pattern)
+        tools.merge_streams(pattern, _pattern())
+    assert received == stats.calls
+    assert [call.function for call in received] == [
+        "arvo.transformations.retrograde",
+        "arvo.tools.merge_streams",
+    ]
+
+
+def test_by_function():
+    pattern = _pattern()
+    with instrument.record() as stats:
+        for _ in range(3):
+            transformations.retrograde(pattern)
+    totals = stats.by_function()
+    assert list(totals) == ["arvo.transformations.retrograde"]
+    assert totals["arvo.transformations.retrograde"].calls == 3
+    assert totals["arvo.transformations.retrograde"].notes_in == 15
+
+
+def test_nested_records():
+    pattern = _pattern()
+    with instrument.record() as outer:
+        transformations.retrograde(pattern)
+        with instrument.record() as inner:
+            transformations.octave_shift(pattern, 1)
+    assert [call.function for call in inner.calls] == ["arvo.transformations.octave_shift"]
+    assert len(outer.calls) == 2
+
+
+def test_event_table_notes():
+    events = io.EventTable.from_stream(_pattern())
+    with instrument.record() as stats:
+        transformations.octave_shift(events, 1)
+    assert stats.calls[0].notes_in == 5
+    assert stats.calls[0].notes_out == 5
+
+
+def test_not_recording():
+    original_deepcopy = copy.deepcopy
+    original_next = scale.ConcreteScale.next
+    with instrument.record() as stats:
+        assert copy.deepcopy is not original_deepcopy
+    transformations.retrograde(_pattern())
+    assert stats.calls == []
+    assert copy.deepcopy is original_deepcopy
+    assert scale.ConcreteScale.next is original_next
+
+
+def test_other_threads_not_counted():
+    pattern = _pattern()
+    started = threading.Event()
+    finished = threading.Event()
+
+    def work():
+        started.wait()
+        for _ in range(20):
+            copy.deepcopy(pattern)
+            stream.Stream().append(copy.deepcopy(pattern[0]))
+        finished.set()
+
+    with instrument.record() as expected:
+        transformations.retrograde(pattern)
+    thread = threading.Thread(target=work)
+    thread.start()
+    with instrument.record() as stats:
+        started.set()
+        finished.wait()
+        transformations.retrograde(pattern)
+    thread.join()
+    assert len(stats.calls) == 1
+    assert stats.calls[0].deepcopies == expected.calls[0].deepcopies
+    assert stats.calls[0].inserts == expected.calls[0].inserts
@@ -0,0 +1,115 @@
+import numpy
+import pytest
+from arvo import io
+from arvo import tools
+from arvo import transformations
+from music21 import chord
+from music21 import converter
+from music21 import scale
+from music21 import stream
+
+
+def _stream():
+    s = converter.parse(
+        "tinyNotation: 8 C D~ D E-4 r8 G4 trip{F#8 G A} B`4 c#'2"
+    ).flat.notesAndRests.stream()
+    # tinyNotation has no chords
+    s.replace(s.notes[4], chord.Chord(["C3", "E3", "G3"]))
+    return s
+
+
+def _summary(s):
+    return [
+        (e.offset, e.quarterLength, e.classes[0], e.fullName, e.tie and e.tie.type)
+        for e in s.flat.notesAndRests
+    ]
+
+
+def test_round_trip(tmp_path):
+    original = _stream()
+    io.save_events(original, tmp_path / "events.bin")
+    events = io.load_events(tmp_path / "events.bin")
+    assert events.ppq == 6
+    assert len(events) == 13
+    assert _summary(events.to_stream()) == _summary(original)
+
+
+def test_load_is_memory_mapped(tmp_path):
+    io.save_events(_stream(), tmp_path / "events.bin")
+    events = io.load_events(tmp_path / "events.bin")
+    assert isinstance(events["offset"].base, numpy.memmap)
+    with pytest.raises(ValueError):
+        events["midi"][0] = 0
+
+
+def test_voices(tmp_path):
+    upper = stream.Voice(converter.parse("tinyNotation: e1").flat.notes)
+    lower = stream.Voice(converter.parse("tinyNotation: C2 D2").flat.notes)
+    container = stream.Stream([stream.Measure([upper, lower])])
+    events = io.EventTable.from_stream(container)
+    assert list(events["voice"]) == [1, 2, 2]
+    voices = events.to_stream().getElementsByClass("Voice")
+    assert [[n.nameWithOctave for n in v.notes] for v in voices] == [["E4"], ["C3", "D3"]]
+
+
+def test_score_parts_stay_separate(tmp_path):
+    upper = stream.Part(converter.parse("tinyNotation: e2 f2").flat.notes)
+    lower = stream.Part(converter.parse("tinyNotation: C1").flat.notes)
+    events = io.EventTable.from_stream(stream.Score([upper, lower]))
+    assert sorted(events["voice"]) == [1, 1, 2]
+    voices = events.to_stream().getElementsByClass("Voice")
+    assert [[n.nameWithOctave for n in v.notes] for v in voices] == [["E4", "F4"], ["C3"]]
+    io.write_midi(events, tmp_path / "events.mid")
+    parsed = converter.parse(tmp_path / "events.mid")
+    assert [[p.midi for p in part.flat.pitches] for part in parsed.parts] == [[64, 65], [48]]
+
+
+def test_empty(tmp_path):
+    io.save_events(stream.Stream(), tmp_path / "events.bin")
+    events = io.load_events(tmp_path / "events.bin")
+    assert len(events) == 0
+    assert len(events.to_stream()) == 0
+
+
+def test_invalid_file(tmp_path):
+    (tmp_path / "events.bin").write_bytes(b"not an event file at all, really")
+    with pytest.raises(ValueError):
+        io.load_events(tmp_path / "events.bin")
+
+
+@pytest.mark.parametrize(
+    "transformation, arguments",
+    [
+        (transformations.scalar_transposition, (3,)),
+        (transformations.scalar_transposition, (-2, scale.MajorScale("D"))),
+        (transformations.scalar_inversion, ("E4",)),
+        (transformations.octave_shift, (-1,)),
+        (transformations.retrograde, ()),
+    ],
+)
+def test_transformations_on_events(transformation, arguments):
+    original = _stream()
+    expected = transformation(original, *arguments)
+    events = transformation(io.EventTable.from_stream(original), *arguments)
+    assert isinstance(events, io.EventTable)
+    assert _summary(events.to_stream()) == _summary(expected)
+
+
+def test_retrograde_events_rest_order():
+    # The reversed D starts where the rest is
+    original = converter.parse("tinyNotation: 4 C D r E2").flat.notesAndRests.stream()
+    expected = transformations.retrograde(original)
+    events = transformations.retrograde(io.EventTable.from_stream(original))
+    assert _summary(events.to_stream()) == _summary(expected)
+
+
+def test_write_midi(tmp_path):
+    original = _stream()
+    io.write_midi(io.EventTable.from_stream(original), tmp_path / "events.mid")
+    parsed = converter.parse(tmp_path / "events.mid")
+    expected = [p.midi for p in original.pitches]
+    # Tied notes are merged
+    del expected[2]
+    expected[-2] = round(original.pitches[-2].ps)
+    assert [p.midi for p in parsed.flat.pitches] == expected
+    assert parsed.highestTime == original.highestTime
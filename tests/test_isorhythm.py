@@ -1,6 +1,9 @@
+from fractions import Fraction
+
 import pytest
 from music21 import converter
 from arvo import isorhythm
+from arvo import sequences
 
 
 @pytest.fixture
@@ -32,3 +35,30 @@ def test_create_isorhythm_length(pitches_sequence, durations_sequence):
         """
     )
     assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+def test_create_isorhythm_durations_iterator(pitches_sequence):
+    durations = sequences.map_values(lambda x: x / 2, sequences.mod(sequences.LINEAR, 3, 1))
+    result = isorhythm.create_isorhythm(pitches_sequence, durations, 7)
+    intended_result = converter.parse("tinyNotation: C8 D4 E4. F8 G4 C4. D8")
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+def test_create_isorhythm_iterator_requires_length(pitches_sequence):
+    with pytest.raises(ValueError):
+        isorhythm.create_isorhythm(pitches_sequence, iter([1, 2]))
+
+
+def test_create_isorhythm_iterator_rejects_unsupported_items(pitches_sequence):
+    with pytest.raises(TypeError, match="None"):
+        isorhythm.create_isorhythm(iter(["C4", None]), [1, 2], length=4)
+    with pytest.raises(TypeError, match="'x'"):
+        isorhythm.create_isorhythm(pitches_sequence, iter([1, "x"]), length=4)
+
+
+def test_create_isorhythm_tuplets(pitches_sequence):
+    durations = [Fraction(1, 3), Fraction(1, 3), Fraction(1, 3), 0.25, 0.75]
+    result = isorhythm.create_isorhythm(pitches_sequence, durations, length=500)
+    assert result.highestTime == 200
+    assert result.notes[-1].offset == 199.25
+    assert result.notes[-3].offset == Fraction(596, 3)
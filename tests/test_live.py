@@ -0,0 +1,78 @@
+import pytest
+from arvo import io
+from arvo import live
+from arvo import tools
+from music21 import chord
+from music21 import converter
+
+
+class FakeClock:
+    def __init__(self, latency=0.0):
+        self.now = 100.0
+        self.latency = latency
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds + self.latency
+
+
+def _play(material, **kwargs):
+    clock = FakeClock(kwargs.pop("latency", 0.0))
+    events = []
+    stats = live.play(material, events.append, clock=clock, sleep=clock.sleep, **kwargs)
+    return events, stats
+
+
+def test_events():
+    s = converter.parse("tinyNotation: 4 c d~ d8 r8").flat.notesAndRests.stream()
+    s.append(chord.Chord(["E4", "G4"]))
+    events, stats = _play(s, bpm=60, velocity=80)
+    assert [tuple(e) for e in events] == [
+        (0.0, "note_on", 60, 80),
+        (1.0, "note_off", 60, 0),
+        (1.0, "note_on", 62, 80),
+        (2.5, "note_off", 62, 0),
+        (3.0, "note_on", 64, 80),
+        (3.0, "note_on", 67, 80),
+        (4.0, "note_off", 64, 0),
+        (4.0, "note_off", 67, 0),
+    ]
+    assert stats == live.PlaybackStats(8, 0.0, 0.0, 0.0)
+
+
+def test_event_tables_match_streams():
+    s = converter.parse("tinyNotation: 8 c d~ d e-4 r8 G4 trip{f#8 g a} b`4").flat
+    s.replace(s.notes[4], chord.Chord(["C3", "E3", "G3"]))
+    assert _play(io.EventTable.from_stream(s))[0] == _play(s)[0]
+
+
+def test_iterable_material_is_consumed_lazily():
+    clock = FakeClock()
+    pulled = []
+
+    def sections():
+        for i in range(4):
+            pulled.append(clock.now - 100.0)
+            yield tools.notes_to_stream([60 + i, 62 + i])
+
+    events = []
+    live.play(sections(), events.append, bpm=60, lookahead=0.5, clock=clock, sleep=clock.sleep)
+    assert [e.time for e in events if e.type == "note_on"] == [0, 1, 2, 3, 4, 5, 6, 7]
+    # Each section is generated within the lookahead window before it starts
+    for i, pulled_at in enumerate(pulled):
+        assert 2 * i - 1.0 <= pulled_at <= 2 * i + 0.5
+
+
+def test_jitter():
+    _, stats = _play(tools.notes_to_stream([60, 62, 64]), latency=0.002)
+    assert stats.events == 6
+    assert stats.max_jitter == pytest.approx(0.002)
+    assert stats.mean_jitter == pytest.approx(0.002)
+    assert stats.stdev_jitter == pytest.approx(0.0, abs=1e-9)
+
+
+def test_unplayable_material():
+    with pytest.raises(TypeError):
+        _play([42])
@@ -1,7 +1,13 @@
+import os
+import subprocess
+import sys
+
 import pytest
 from music21 import converter
+from arvo import distributions
 from arvo import minimalism
 from arvo import sequences
+from arvo import tools
 
 
 @pytest.fixture
@@ -138,6 +144,55 @@ def test_additive_process_step_value_sequence_absolute(example_stream):
     assert list(result.flat.notes) == list(intended_result.flat.notes)
 
 
+def test_additive_process_step_value_unbounded_sequence():
+    original_stream = tools.notes_to_stream([60] * 20)
+    result = minimalism.additive_process(
+        original_stream,
+        step_value=sequences.PRIMES[5:],
+        step_mode=minimalism.StepMode.ABSOLUTE,
+    )
+    assert len(result.flat.notes) == 13 + 17 + 19 + 20
+
+
+def test_additive_process_step_value_iterator_absolute(example_stream):
+    # Kolakoski steps never reach the end of the stream, and stop once they stop increasing
+    result = minimalism.additive_process(
+        example_stream,
+        step_value=sequences.kolakoski_iterator(),
+        step_mode=minimalism.StepMode.ABSOLUTE,
+    )
+    intended_result = converter.parse("tinyNotation: C C D")
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+def test_additive_process_step_value_sequence_algebra(example_stream):
+    steps = sequences.clip(sequences.differences(sequences.FIBONACCI), 1, 3)
+    result = minimalism.additive_process(example_stream, step_value=steps)
+    intended_result = converter.parse(
+        """tinyNotation: 
+        C
+        C D 
+        C D E 
+        C D E F G
+        C D E F G A B c
+        C D E F G A B c d e f
+        C D E F G A B c d e f g
+        """
+    )
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+def test_additive_process_step_value_iterator(example_stream):
+    result = minimalism.additive_process(example_stream, step_value=iter([2, 3]))
+    intended_result = converter.parse(
+        """tinyNotation: 
+        C D
+        C D E F G
+        """
+    )
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
 def test_additive_process_step_value_sequence_absolute_infinite_loop(example_stream):
     result = minimalism.additive_process(
         example_stream, step_value=[1, 2, 3], step_mode=minimalism.StepMode.ABSOLUTE
@@ -404,6 +459,22 @@ def test_subtractive_process_step_value_sequence_absolute(example_stream):
     assert list(result.flat.notes) == list(intended_result.flat.notes)
 
 
+def test_subtractive_process_step_value_iterator_absolute(example_stream):
+    result = minimalism.subtractive_process(
+        example_stream,
+        step_value=sequences.kolakoski_iterator(),
+        step_mode=minimalism.StepMode.ABSOLUTE,
+    )
+    intended_result = converter.parse(
+        """tinyNotation: 
+        C D E F G A B c d e f g
+        D E F G A B c d e f g
+        E F G A B c d e f g
+        """
+    )
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
 def test_subtractive_process_step_value_sequence_absolute_infinite_loop(example_stream):
     result = minimalism.subtractive_process(
         example_stream, step_value=[1, 2, 3], step_mode=minimalism.StepMode.ABSOLUTE
@@ -542,3 +613,91 @@ def test_subtractive_process_nonlinear(example_stream):
         """
     )
     assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+def test_additive_process_note_index(example_stream):
+    index = tools.note_index(example_stream)
+    result = minimalism.additive_process(index, step_value=4)
+    intended_result = minimalism.additive_process(example_stream, step_value=4)
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+# Stochastic processes
+
+
+def _random_parameters():
+    return {
+        "direction": distributions.Choice(list(minimalism.Direction), weights=[4, 2, 1, 1]),
+        "step_value": distributions.Poisson(1, offset=1),
+        "repetitions": distributions.Uniform(1, 3),
+    }
+
+
+@pytest.mark.parametrize(
+    "process", [minimalism.additive_process, minimalism.subtractive_process]
+)
+def test_seeded_processes(example_stream, process):
+    first = process(example_stream, seed=5, **_random_parameters())
+    second = process(example_stream, seed=5, **_random_parameters())
+    other = process(example_stream, seed=6, **_random_parameters())
+    assert list(first.flat.notes) == list(second.flat.notes)
+    assert list(first.flat.notes) != list(other.flat.notes)
+    lazy = process(example_stream, seed=5, lazy=True, **_random_parameters())
+    assert list(lazy.flat.notes) == list(first.flat.notes)
+
+
+def test_seeded_process_across_processes(example_stream):
+    script = (
+        "import importlib.util; "
+        "from music21 import converter; from arvo import distributions, minimalism; "
+        "s = converter.parse('tinyNotation: C D E F G A B c d e f g'); "
+        "r = minimalism.additive_process(s, seed=5, "
+        "direction=distributions.Choice(list(minimalism.Direction), weights=[4, 2, 1, 1]), "
+        "step_value=distributions.Poisson(1, offset=1), "
+        "repetitions=distributions.Uniform(1, 3)); "
+        "print(' '.join(n.nameWithOctave for n in r.flat.pitches))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    result = minimalism.additive_process(example_stream, seed=5, **_random_parameters())
+    assert output == [p.nameWithOctave for p in result.flat.pitches]
+
+
+@pytest.mark.parametrize(
+    "process", [minimalism.additive_process, minimalism.subtractive_process]
+)
+def test_random_absolute_steps_need_iterations_end(example_stream, process):
+    steps = distributions.Uniform(1, 3)
+    with pytest.raises(ValueError):
+        process(example_stream, step_value=steps, step_mode=minimalism.StepMode.ABSOLUTE, seed=1)
+    result = process(
+        example_stream,
+        step_value=steps,
+        step_mode=minimalism.StepMode.ABSOLUTE,
+        iterations_end=5,
+        seed=1,
+    )
+    assert len(result.flat.notes) > 0
+
+
+def test_parameters_drawn_independently(example_stream):
+    # Drawing the directions as well doesn't change the drawn steps
+    steps = distributions.Poisson(2)
+    result = minimalism.additive_process(example_stream, step_value=steps, seed=2)
+    forward = distributions.Choice([minimalism.Direction.FORWARD])
+    also_drawn = minimalism.additive_process(
+        example_stream, direction=forward, step_value=steps, seed=2
+    )
+    assert list(also_drawn.flat.notes) == list(result.flat.notes)
+
+
+def test_changing_directions(example_stream):
+    result = minimalism.additive_process(
+        example_stream,
+        direction=[minimalism.Direction.FORWARD, minimalism.Direction.BACKWARD],
+        iterations_end=4,
+    )
+    intended_result = converter.parse("tinyNotation: C f g C D E d e f g")
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
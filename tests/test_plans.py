@@ -0,0 +1,137 @@
+import copy
+
+import pytest
+from arvo import instrument
+from arvo import isorhythm
+from arvo import minimalism
+from arvo import plans
+from arvo import testing
+from arvo import tools
+from music21 import converter
+from music21 import stream
+
+
+def _pattern():
+    return converter.parse("tinyNotation: 8 C D E4 r8 G4 F#8 A8.. B32").flat.notesAndRests.stream()
+
+
+@pytest.mark.parametrize(
+    "process, arguments",
+    [
+        (minimalism.additive_process, {}),
+        (minimalism.additive_process, {"direction": minimalism.Direction.INWARD, "repetitions": 2}),
+        (minimalism.subtractive_process, {"direction": minimalism.Direction.OUTWARD}),
+        (minimalism.subtractive_process, {"step_value": [1, 2], "iterations_start": 2}),
+    ],
+)
+def test_lazy_processes(process, arguments):
+    eager = process(_pattern(), **arguments)
+    lazy = process(_pattern(), lazy=True, **arguments)
+    assert isinstance(lazy, plans.ProcessStream)
+    assert len(lazy) == len(eager)
+    assert lazy.highestTime == eager.highestTime
+    assert lazy.duration.quarterLength == eager.duration.quarterLength
+    assert not lazy.materialized
+    assert testing.summarize(lazy) == testing.summarize(eager)
+    assert lazy.materialized
+    assert len(lazy) == len(eager)
+
+
+def test_lazy_isorhythm():
+    pitches = ["C4", "D4", "E4", "G4", "A4"]
+    durations = [1, 0.5, 1 / 3, 1 / 3, 1 / 3, 1.5]
+    eager = isorhythm.create_isorhythm(pitches, durations)
+    lazy = isorhythm.create_isorhythm(pitches, durations, lazy=True)
+    assert lazy.highestTime == eager.highestTime
+    # One iteration per talea cycle
+    assert lazy.iteration_count == 5
+    assert testing.summarize(lazy) == testing.summarize(eager)
+
+
+def test_lazy_isorhythm_iterators():
+    eager = isorhythm.create_isorhythm(iter(["C4", "E4", "G4"]), [1, 2], length=7)
+    lazy = isorhythm.create_isorhythm(iter(["C4", "E4", "G4"]), [1, 2], length=7, lazy=True)
+    assert lazy.highestTime == eager.highestTime
+    assert testing.summarize(lazy) == testing.summarize(eager)
+
+
+def test_iterations():
+    lazy = minimalism.additive_process(_pattern(), lazy=True)
+    iterations = list(lazy.iterations())
+    assert not lazy.materialized
+    assert [len(iteration) for iteration in iterations] == list(range(1, 8))
+    assert testing.summarize(iterations[2]) == testing.summarize(
+        minimalism.additive_process(_pattern(), iterations_start=3, iterations_end=3)
+    )
+    with pytest.raises(IndexError):
+        lazy.iteration(7)
+
+
+def test_chained_processes():
+    pattern = _pattern()
+    lazy = minimalism.additive_process(pattern, lazy=True)
+    chained = minimalism.subtractive_process(lazy, minimalism.Direction.BACKWARD, lazy=True)
+    assert not lazy.materialized
+    assert not chained.materialized
+    expected = minimalism.subtractive_process(
+        minimalism.additive_process(pattern), minimalism.Direction.BACKWARD
+    )
+    assert chained.highestTime == expected.highestTime
+    assert testing.summarize(chained) == testing.summarize(expected)
+    assert not lazy.materialized
+
+
+def test_note_index():
+    lazy = minimalism.additive_process(_pattern(), lazy=True)
+    index = tools.note_index(lazy)
+    assert not lazy.materialized
+    expected = tools.NoteIndex(minimalism.additive_process(_pattern()))
+    assert index.offsets.tolist() == expected.offsets.tolist()
+    assert index.durations.tolist() == expected.durations.tolist()
+    # Materializing the stream invalidates the index built from the plan
+    lazy.notes
+    assert tools.note_index(lazy) is not index
+    assert tools.note_index(lazy).notes[0] in lazy
+
+
+def test_plan_is_a_snapshot():
+    pattern = _pattern()
+    lazy = minimalism.additive_process(pattern, lazy=True)
+    expected = testing.summarize(minimalism.additive_process(pattern))
+    pattern.notes[0].pitch.name = "B-"
+    assert testing.summarize(lazy) == expected
+
+
+def test_copies_stay_lazy():
+    lazy = minimalism.additive_process(_pattern(), lazy=True)
+    copied = copy.deepcopy(lazy)
+    assert not lazy.materialized
+    assert not copied.materialized
+    assert testing.summarize(copied) == testing.summarize(lazy)
+    materialized_copy = copy.deepcopy(lazy)
+    assert materialized_copy.materialized
+    assert len(materialized_copy) == len(lazy)
+
+
+def test_in_score():
+    lazy = minimalism.additive_process(_pattern(), lazy=True)
+    score = stream.Score([tools.convert_stream(lazy, stream.Part)])
+    assert lazy.materialized
+    assert len(score.flat.notes) == len(lazy.notes)
+
+
+def test_instrumented_without_materializing():
+    with instrument.record() as stats:
+        lazy = minimalism.additive_process(_pattern(), lazy=True)
+    assert not lazy.materialized
+    assert stats.calls[0].notes_out == len(minimalism.additive_process(_pattern()).notes)
+    assert stats.calls[0].inserts == 0
+
+
+def test_empty():
+    lazy = plans.ProcessStream(plans.Plan())
+    assert len(lazy) == 0
+    assert not lazy
+    assert lazy.highestTime == 0
+    assert lazy.iteration_count == 0
+    assert plans.ProcessStream().materialized
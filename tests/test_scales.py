@@ -0,0 +1,220 @@
+import concurrent.futures
+import copy
+import sys
+import threading
+
+import pytest
+from arvo import scales
+from music21 import converter
+from music21 import pitch
+from music21 import scale
+
+
+def test_pentatonic_scale_shares_abstract_scale():
+    assert scales.PentatonicScale("C")._abstract is scales.PentatonicScale("E")._abstract
+    assert scales.PentatonicScale("C")._abstract is not scales.PentatonicScale("C", 5)._abstract
+
+
+def test_interval_scale_pitches():
+    s = scales.IntervalScale(["M2", "M2", "m3", "M2"], "C4")
+    assert [str(p) for p in s.pitches] == ["C4", "D4", "E4", "G4", "A4", "C5"]
+
+
+def test_interval_scale_completes_octave():
+    s = scales.IntervalScale([2, 2, 1, 2, 2, 2], "C4")
+    assert s.degree_count == 7
+    assert s.intervals == (2, 2, 1, 2, 2, 2)
+
+
+def test_interval_scale_exceeding_octave():
+    with pytest.raises(scale.ScaleException):
+        scales.IntervalScale([5, 5, 5])
+
+
+def test_interval_scale_degree_of():
+    s = scales.IntervalScale(["M2", "M2", "m2", "M2", "M2", "M2"], "E-4")
+    assert s.degree_of("E-4") == 0
+    assert s.degree_of("D#4") == 0
+    assert s.degree_of("B-3") == -3
+    assert s.degree_of("G5") == 9
+    assert s.degree_of("E4") is None
+
+
+def test_interval_scale_pitch_at():
+    s = scales.IntervalScale(["m2", "A2", "m2", "M2", "m2", "M2"], "A4")
+    assert str(s.pitch_at(2)) == "C#5"
+    assert str(s.pitch_at(-6)) == "B-3"
+
+
+@pytest.mark.parametrize("tonic", ["C4", "E-4", "F#3", "C#4"])
+def test_interval_scale_transpose_pitch_matches_next(tonic):
+    s = scales.IntervalScale(["M2", "M2", "m2", "M2", "M2", "M2"], tonic)
+    reference = scale.MajorScale(tonic)
+    for name in ["C4", "D#4", "E-3", "F#5", "B2", "G--4", "A##4"]:
+        for steps in [1, 3, 8, -1, -5, -12]:
+            direction = "ascending" if steps > 0 else "descending"
+            expected = reference.next(pitch.Pitch(name), direction, abs(steps))
+            assert s.transpose_pitch(pitch.Pitch(name), steps) == expected
+
+
+def test_interval_scale_distance():
+    s = scales.IntervalScale([2, 2, 1, 2, 2, 2, 1], "C4")
+    assert s.distance(pitch.Pitch("C4"), pitch.Pitch("G3")) == -3
+    assert s.distance(pitch.Pitch("E4"), pitch.Pitch("C6")) == 12
+    assert s.distance(pitch.Pitch("E4"), pitch.Pitch("C#4")) == 0
+    assert s.distance(pitch.Pitch("F-4"), pitch.Pitch("C4")) is None
+
+
+def test_shared_network_not_corrupted_by_next():
+    s = scales.IntervalScale(["M2", "M2", "m2", "M2", "M2", "M2"], "C#4")
+    for name in ["F##2", "B#5", "E#3"]:
+        s.next(pitch.Pitch(name), "ascending", 1)
+    other = scales.IntervalScale(["M2", "M2", "m2", "M2", "M2", "M2"], "C#4")
+    assert [str(p) for p in other.pitches] == [
+        "C#4", "D#4", "E#4", "F#4", "G#4", "A#4", "B#4", "C#5"
+    ]
+
+
+def test_identify():
+    matches = scales.identify(["C4", "D4", "E4", "G4", "A4"], exact=True)
+    assert [(m.name, m.tonic) for m in matches] == [
+        ("pentatonic 1", "C"),
+        ("pentatonic 2", "D"),
+        ("pentatonic 3", "E"),
+        ("pentatonic 4", "G"),
+        ("pentatonic 5", "A"),
+    ]
+    assert isinstance(matches[0].scale, scales.PentatonicScale)
+
+
+def test_identify_subset():
+    matches = scales.identify([60, 62, 64, 66])
+    names = [(m.name, m.tonic) for m in matches]
+    assert ("whole-tone", "C") in names
+    assert ("lydian", "C") in names
+    assert ("major", "G") in names
+    assert ("major", "C") not in names
+    # Smallest scales come first
+    assert names[0] == ("whole-tone", "C")
+
+
+def test_identify_stream():
+    s = converter.parse("tinyNotation: C D E- F G A- B- c")
+    names = [(m.name, m.tonic) for m in scales.identify(s, exact=True)]
+    assert ("minor", "C") in names
+    assert ("major", "E-") in names
+
+
+def test_register():
+    scales.register("fratres", ["m2", "A2", "m2", "M2", "m2", "M2"])
+    try:
+        matches = scales.identify(["A4", "B-4", "C#5", "D5", "E5", "F5", "G5"], exact=True)
+        assert [(m.name, m.tonic) for m in matches] == [("fratres", "A")]
+        assert matches[0].scale.degree_count == 7
+    finally:
+        del scales._catalog[-1]
+        scales._rotations.cache_clear()
+        scales._matches.cache_clear()
+        scales._catalog_scale.cache_clear()
+
+
+def test_interval_scale_copies_share_tables():
+    s = scales.IntervalScale([2, 2, 1, 2, 2, 2], "D4")
+    copied = copy.deepcopy(s)
+    assert copied._tables is s._tables
+    assert copied._abstract is not s._abstract
+    assert copied.transpose_pitch(pitch.Pitch("C#4"), 2) == pitch.Pitch("E4")
+
+
+def test_locked():
+    s = scale.MajorScale("D")
+    acquired = []
+    with scales.locked(s) as locked_scale:
+        assert locked_scale is s
+        # Scales sharing the network of s wait for the lock
+        other = copy.copy(s)
+        thread = threading.Thread(
+            target=lambda: acquired.append(_acquire(other)), daemon=True
+        )
+        thread.start()
+        thread.join(0.2)
+        assert acquired == []
+        # The lock is reentrant
+        with scales.locked(s):
+            pass
+    thread.join()
+    assert acquired == [True]
+
+
+def _acquire(scale_):
+    with scales.locked(scale_):
+        return True
+
+
+@pytest.mark.parametrize(
+    "scale_, compiled",
+    [
+        (scale.MajorScale("D"), True),
+        (scale.DorianScale("E-"), True),
+        (scale.ConcreteScale(pitches=["A4", "B-4", "C#5", "D5", "E5", "F5", "G5"]), True),
+        (scales.PentatonicScale("F#", 3), True),
+        (scales.IntervalScale([2, 1, 2, 1, 2, 1, 2], "D"), True),
+        # Networks moving some pitches differently than their tables would
+        (scale.HarmonicMinorScale("A"), False),
+        (scale.OctatonicScale("D", 2), False),
+        # Networks that don't repeat at the octave
+        (scale.MelodicMinorScale("C"), False),
+        (scale.CyclicalScale("C4", ["m2", "m3"]), False),
+    ],
+)
+def test_scale_steps_match_next(scale_, compiled):
+    steps_ = scales.ScaleSteps(scale_)
+    assert steps_.compiled is compiled
+    # Compiling doesn't touch the network of the scale, whose results depend on its caches
+    reference = copy.deepcopy(scale_)
+    for name in ["C2", "D#3", "E-3", "F#4", "B4", "G--4", "A#5", "C-5"]:
+        for steps in [1, 2, 5, -1, -3, -9]:
+            direction = "ascending" if steps > 0 else "descending"
+            expected = reference.next(pitch.Pitch(name), direction, abs(steps))
+            assert steps_.transpose_pitch(pitch.Pitch(name), steps) == expected
+
+
+def test_scale_steps_distance():
+    steps_ = scales.ScaleSteps(scale.MajorScale("D"))
+    assert steps_.distance(pitch.Pitch("D4"), pitch.Pitch("A3")) == -3
+    assert steps_.distance(pitch.Pitch("F#4"), pitch.Pitch("D6")) == 12
+    assert steps_.distance(pitch.Pitch("D4"), pitch.Pitch("C4")) == 0
+    # Scales without tables step through their network
+    assert scales.ScaleSteps(scale.HarmonicMinorScale("A")).distance(
+        pitch.Pitch("A4"), pitch.Pitch("G#4")
+    ) == -1
+
+
+def test_scale_steps_share_tables():
+    s = scale.MajorScale("D")
+    assert scales.ScaleSteps(s)._tables is scales.ScaleSteps(copy.copy(s))._tables
+    assert scales.ScaleSteps(s)._tables is not scales.ScaleSteps(scale.MajorScale("E"))._tables
+
+
+def test_shared_network_used_from_threads():
+    # Pentatonic scales share their network, which may be used directly from several threads
+    tonics = ["C", "D", "E", "F#", "A-", "B"]
+
+    def walk(tonic):
+        s = scales.PentatonicScale(tonic)
+        pitch_ = pitch.Pitch(f"{tonic}3")
+        names = []
+        for _ in range(12):
+            pitch_ = s.next(pitch_, "ascending")
+            names.append(pitch_.nameWithOctave)
+        return names, [str(p) for p in s.getPitches(f"{tonic}2", f"{tonic}4")]
+
+    expected = [walk(tonic) for tonic in tonics]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-4)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(6) as executor:
+            results = list(executor.map(walk, tonics * 10))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert results == expected * 10
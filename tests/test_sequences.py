@@ -0,0 +1,171 @@
+import concurrent.futures
+import itertools
+
+import pytest
+from arvo import sequences
+
+
+def _is_prime(n):
+    return n > 1 and all(n % d for d in range(2, int(n ** 0.5) + 1))
+
+
+def test_primes():
+    assert sequences.PRIMES[:10] == [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]
+    assert sequences.PRIMES[10_000] == 104743
+
+
+def test_primes_across_segments():
+    primes = [n for n in range(2, 150_000) if _is_prime(n)]
+    assert sequences.PRIMES[: len(primes)] == primes
+
+
+def test_prime_powers():
+    assert sequences.PRIME_POWERS[:16] == [2, 3, 4, 5, 7, 8, 9, 11, 13, 16, 17, 19, 23, 25, 27, 29]
+    assert 2 ** 20 in sequences.PRIME_POWERS[:100_000]
+
+
+def test_divisors():
+    divisors = [sum(1 for d in range(1, n + 1) if n % d == 0) for n in range(1, 2000)]
+    assert sequences.DIVISORS[: len(divisors)] == divisors
+    assert sequences.DIVISORS[20_159] == 84  # 20160 = 2^6 * 3^2 * 5 * 7
+
+
+def test_fibonacci():
+    assert sequences.FIBONACCI[:10] == [1, 1, 2, 3, 5, 8, 13, 21, 34, 55]
+    assert sequences.FIBONACCI[100] == 573147844013817084101
+
+
+def test_tribonacci():
+    assert sequences.TRIBONACCI[:10] == [1, 1, 2, 4, 7, 13, 24, 44, 81, 149]
+
+
+def test_linear():
+    assert sequences.LINEAR[:5] == [1, 2, 3, 4, 5]
+    assert sequences.LINEAR[1_000_000] == 1_000_001
+
+
+def test_open_slice_is_lazy():
+    tail = sequences.PRIMES[3:]
+    assert isinstance(tail, sequences.LazySequence)
+    assert tail[:3] == [7, 11, 13]
+    assert sequences.LINEAR[::2][:3] == [1, 3, 5]
+
+
+def test_iteration():
+    assert list(itertools.islice(sequences.PRIMES, 5)) == [2, 3, 5, 7, 11]
+    assert list(zip(range(3), sequences.LINEAR)) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_negative_index():
+    with pytest.raises(IndexError):
+        sequences.PRIMES[-1]
+    with pytest.raises(ValueError):
+        sequences.PRIMES[-5:]
+
+
+def _reference_kolakoski(start_items, length):
+    # Direct construction, keeping the whole sequence in memory.
+    terms = []
+    symbols = itertools.cycle(start_items)
+    run = 0
+    while len(terms) < length:
+        symbol = next(symbols)
+        terms.append(symbol)
+        terms += [symbol] * (max(1, terms[run]) - 1)
+        run += 1
+    return terms[:length]
+
+
+@pytest.mark.parametrize("start_items", [(1, 2), (2, 1), (1, 2, 3), (3, 1, 2), (1, 1, 2), (1,)])
+def test_kolakoski(start_items):
+    assert sequences.kolakoski(start_items, 20_000) == _reference_kolakoski(start_items, 20_000)
+
+
+def test_kolakoski_default():
+    assert sequences.kolakoski(length=12) == [1, 2, 2, 1, 1, 2, 1, 2, 2, 1, 2, 2]
+
+
+@pytest.mark.parametrize("start_items", [(1, 2), (2, 1), (1, 2, 3), (1, 1, 2), (1,)])
+def test_kolakoski_array(start_items):
+    result = sequences.kolakoski_array(20_000, start_items)
+    assert result.dtype.name == "int8"
+    assert result.tolist() == _reference_kolakoski(start_items, 20_000)
+
+
+def test_kolakoski_array_matches_generator():
+    result = sequences.kolakoski_array(300_000)
+    assert result.tolist() == sequences.kolakoski(length=300_000)
+
+
+def test_kolakoski_array_symbol_range():
+    with pytest.raises(ValueError):
+        sequences.kolakoski_array(10, (1, 200))
+
+
+def test_kolakoski_iterator():
+    result = itertools.islice(sequences.kolakoski_iterator((2, 1)), 5_000)
+    assert list(result) == _reference_kolakoski((2, 1), 5_000)
+
+
+# Sequence algebra tests
+
+
+def test_map_values():
+    result = sequences.map_values(lambda x: x * x, sequences.LINEAR)
+    assert list(itertools.islice(result, 4)) == [1, 4, 9, 16]
+
+
+def test_mod():
+    assert list(sequences.mod([0, 5, 7, 12], 5)) == [0, 0, 2, 2]
+    assert list(sequences.mod([0, 5, 7, 12], 5, offset=1)) == [5, 5, 2, 2]
+
+
+def test_scale():
+    assert list(sequences.scale([1, 2, 3], 2)) == [2, 4, 6]
+
+
+def test_clip():
+    assert list(sequences.clip([1, 5, 10], 2, 8)) == [2, 5, 8]
+    assert list(sequences.clip([1, 5, 10], maximum=4)) == [1, 4, 4]
+
+
+def test_interleave():
+    result = sequences.interleave(sequences.PRIMES, sequences.FIBONACCI)
+    assert list(itertools.islice(result, 6)) == [2, 1, 3, 1, 5, 2]
+
+
+def test_zip_sum():
+    assert list(sequences.zip_sum([1, 2, 3], sequences.LINEAR)) == [2, 4, 6]
+
+
+def test_take_while():
+    assert list(sequences.take_while(lambda x: x < 20, sequences.PRIMES)) == [
+        2, 3, 5, 7, 11, 13, 17, 19
+    ]
+
+
+def test_differences():
+    result = sequences.differences(sequences.PRIMES)
+    assert list(itertools.islice(result, 5)) == [1, 2, 2, 4, 2]
+
+
+def test_cumulative_sums():
+    result = sequences.cumulative_sums(sequences.LINEAR)
+    assert list(itertools.islice(result, 5)) == [1, 3, 6, 10, 15]
+
+
+def test_combinators_are_lazy():
+    # Composing combinators over unbounded sequences must not compute anything up front.
+    result = sequences.clip(
+        sequences.mod(sequences.differences(sequences.FIBONACCI), 7, offset=1), 1, 5
+    )
+    assert list(itertools.islice(result, 6)) == [5, 1, 1, 2, 3, 5]
+
+
+def test_lazy_sequence_threads():
+    sequence = sequences.LazySequence(lambda: itertools.count())
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(
+            executor.map(lambda start: [sequence[i] for i in range(start, start + 500)], range(32))
+        )
+    assert results == [list(range(start, start + 500)) for start in range(32)]
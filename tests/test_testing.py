@@ -0,0 +1,232 @@
+import itertools
+
+import pytest
+from arvo import io
+from arvo import minimalism
+from arvo import scales
+from arvo import sequences
+from arvo import testing
+from arvo import tintinnabuli
+from arvo import tools
+from arvo import transformations
+from music21 import scale
+from music21 import stream
+
+EXAMPLES = 30
+
+
+def _table(function):
+    # Runs a transformation on the event table of its input stream
+    def fast(original_stream, *args):
+        return function(io.EventTable.from_stream(original_stream), *args)
+
+    return fast
+
+
+def _indexed(function):
+    # Runs a function on the note index of its input stream
+    def fast(original_stream, *args):
+        return function(tools.NoteIndex(original_stream), *args)
+
+    return fast
+
+
+def _stream_and_scale(rng):
+    return testing.random_stream(rng), rng.randint(-8, 8), testing.random_scale(rng)
+
+
+def _stream_axis_and_scale(rng):
+    # Pitches outside of the scale can't be inverted
+    scale_ = testing.random_scale(rng)
+    pitches = scale_.getPitches("C2", "C6")
+    return testing.random_stream(rng, pitches=pitches), rng.choice(pitches), scale_
+
+
+# Pairs of reference and fast implementations, with their input generators
+ENGINE_PAIRS = {
+    "scalar_transposition[EventTable]": (
+        transformations.scalar_transposition,
+        _table(transformations.scalar_transposition),
+        _stream_and_scale,
+    ),
+    "scalar_inversion[EventTable]": (
+        transformations.scalar_inversion,
+        _table(transformations.scalar_inversion),
+        _stream_axis_and_scale,
+    ),
+    "retrograde[EventTable]": (
+        transformations.retrograde,
+        _table(transformations.retrograde),
+        lambda rng: (testing.random_stream(rng),),
+    ),
+    "octave_shift[EventTable]": (
+        transformations.octave_shift,
+        _table(transformations.octave_shift),
+        lambda rng: (testing.random_stream(rng), rng.randint(-2, 2)),
+    ),
+    "scalar_transposition[NoteIndex]": (
+        transformations.scalar_transposition,
+        _indexed(transformations.scalar_transposition),
+        _stream_and_scale,
+    ),
+    "additive_process[NoteIndex]": (
+        minimalism.additive_process,
+        _indexed(minimalism.additive_process),
+        lambda rng: (
+            testing.random_stream(rng, max_length=8),
+            rng.choice(list(minimalism.Direction)),
+            rng.randint(1, 3),
+        ),
+    ),
+    "subtractive_process[NoteIndex]": (
+        minimalism.subtractive_process,
+        _indexed(minimalism.subtractive_process),
+        lambda rng: (
+            testing.random_stream(rng, max_length=8),
+            rng.choice(list(minimalism.Direction)),
+            rng.randint(1, 3),
+        ),
+    ),
+    "scanning_process[NoteIndex]": (
+        minimalism.scanning_process,
+        _indexed(minimalism.scanning_process),
+        lambda rng: (
+            testing.random_stream(rng, max_length=8),
+            rng.choice([minimalism.Direction.FORWARD, minimalism.Direction.BACKWARD]),
+            rng.randint(1, 3),
+        ),
+    ),
+    "create_t_voice[NoteIndex]": (
+        tintinnabuli.create_t_voice,
+        _indexed(tintinnabuli.create_t_voice),
+        lambda rng: (
+            testing.random_stream(rng, chords=False),
+            testing.random_t_chord(rng),
+            rng.choice([1, 2, -1]),
+            rng.choice(list(tintinnabuli.Direction)),
+            rng.choice(list(tintinnabuli.TMode)),
+        ),
+    ),
+    "IntervalScale.transpose_pitch": (
+        lambda scale_, pitch_, steps: scale.ConcreteScale.next(
+            scale_,
+            pitch_,
+            scale.DIRECTION_ASCENDING if steps > 0 else scale.DIRECTION_DESCENDING,
+            abs(steps),
+        ),
+        lambda scale_, pitch_, steps: scale_.transpose_pitch(pitch_, steps),
+        lambda rng: (
+            scales.IntervalScale(rng.choice([[2, 2, 1, 2, 2, 2], [2, 1, 2, 2, 1, 3], [3, 2, 2, 3]])),
+            testing.random_pitch(rng, 3, 5),
+            rng.choice([-9, -3, -1, 1, 2, 7]),
+        ),
+    ),
+    "notes_to_stream": (
+        lambda notes: _append_all([tools.to_note(value) for value in notes]),
+        tools.notes_to_stream,
+        lambda rng: (
+            [rng.randint(36, 84) for _ in range(rng.randint(1, 12))]
+            if rng.random() < 0.5
+            else [testing.random_pitch(rng).nameWithOctave for _ in range(rng.randint(1, 12))],
+        ),
+    ),
+    "EventTable round trip": (
+        lambda original_stream: original_stream,
+        lambda original_stream: io.EventTable.from_stream(original_stream).to_stream(),
+        lambda rng: (testing.random_stream(rng),),
+    ),
+    "kolakoski_array": (
+        lambda length, start_items: sequences.kolakoski(start_items, length),
+        sequences.kolakoski_array,
+        lambda rng: (rng.randint(0, 200), tuple(rng.sample(range(1, 5), rng.randint(2, 3)))),
+    ),
+}
+
+
+def _append_all(elements):
+    result = stream.Stream()
+    for element in elements:
+        result.append(element)
+    return result
+
+
+@pytest.mark.parametrize("name", ENGINE_PAIRS)
+def test_engine_pair(name):
+    reference_fn, fast_fn, generator = ENGINE_PAIRS[name]
+    assert testing.compare(reference_fn, fast_fn, generator, examples=EXAMPLES) == EXAMPLES
+
+
+def test_mismatch_is_minimized():
+    def reference(original_stream):
+        return [p.nameWithOctave for p in original_stream.pitches]
+
+    def fast(original_stream):
+        # Wrong on sharps
+        return [p.nameWithOctave.replace("#", "") for p in original_stream.pitches]
+
+    with pytest.raises(testing.MismatchError) as info:
+        testing.compare(
+            reference, fast, lambda rng: (testing.random_stream(rng, chords=False),), seed=3
+        )
+    (minimized,) = info.value.arguments
+    assert len(minimized) == 1
+    assert "#" in minimized.notes[0].pitch.nameWithOctave
+    assert info.value.seed == 3
+
+
+def test_numbers_are_minimized():
+    with pytest.raises(testing.MismatchError) as info:
+        testing.compare(
+            lambda values: sum(values),
+            lambda values: sum(value for value in values if value < 50),
+            lambda rng: ([rng.randint(0, 100) for _ in range(10)],),
+        )
+    assert info.value.arguments == ([50],)
+
+
+def test_exceptions_compared_by_type():
+    def raises_value_error(value):
+        raise ValueError(value)
+
+    assert testing.compare(raises_value_error, raises_value_error, lambda rng: (1,)) == 100
+    with pytest.raises(testing.MismatchError) as info:
+        testing.compare(raises_value_error, lambda value: value, lambda rng: (rng.random(),))
+    assert info.value.reference == ("raised", "ValueError")
+    assert info.value.arguments == (0.0,)
+
+
+def test_seeded_generation():
+    generated = []
+
+    def generator(rng):
+        generated.append(testing.summarize(testing.random_stream(rng)))
+        return ()
+
+    testing.compare(lambda: None, lambda: None, generator, examples=5, seed="a")
+    first = list(generated)
+    generated.clear()
+    testing.compare(lambda: None, lambda: None, generator, examples=5, seed="a")
+    assert generated == first
+    generated.clear()
+    testing.compare(lambda: None, lambda: None, generator, examples=5, seed="b")
+    assert generated != first
+
+
+def test_inputs_are_copied():
+    def modifies(values):
+        values.append(0)
+        return len(values)
+
+    assert testing.compare(modifies, modifies, lambda rng: ([1, 2],), examples=3) == 3
+
+
+def test_random_stream_ties():
+    rng = __import__("random").Random(0)
+    ties = [
+        element.tie.type
+        for element in itertools.chain.from_iterable(
+            testing.random_stream(rng).notes for _ in range(20)
+        )
+        if element.tie is not None
+    ]
+    assert {"start", "stop"} <= set(ties)
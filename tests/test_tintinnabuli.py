@@ -1,7 +1,10 @@
+from fractions import Fraction
+
 import pytest
 from music21 import converter
 from music21 import chord
 from arvo import tintinnabuli
+from arvo import tools
 
 
 @pytest.fixture
@@ -82,3 +85,20 @@ def test_create_t_voice_pitch_list_numeric(major_scale):
 def test_create_t_voice_tmode(major_scale, t_mode, intended_result):
     result = tintinnabuli.create_t_voice(major_scale, ("C#", "E", "A"), t_mode=t_mode)
     assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
+def test_create_t_voice_note_index(major_scale, c_major_chord):
+    index = tools.note_index(major_scale)
+    result = tintinnabuli.create_t_voice(index, c_major_chord)
+    intended_result = converter.parse("tinyNotation: E E G G c c c e")
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+    assert [n.offset for n in result.notes] == list(index.offsets)
+
+
+def test_create_t_voice_offsets(c_major_chord):
+    m_voice = converter.parse("tinyNotation: trip{C8 D E} F4").flat.notes.stream()
+    t_voice = tintinnabuli.create_t_voice(m_voice, c_major_chord)
+    offsets = [t_voice.elementOffset(n) for n in t_voice.notes]
+    assert offsets == [m_voice.elementOffset(n) for n in m_voice.notes]
+    # Offsets are music21 quarter lengths, not NumPy scalars
+    assert [type(offset) for offset in offsets] == [float, Fraction, Fraction, float]
@@ -1,8 +1,12 @@
+import random
+from fractions import Fraction
+
 import pytest
 from music21 import converter
 from music21 import pitch
 from music21 import note
 from music21 import duration
+from music21 import stream
 from arvo import tools
 
 
@@ -63,3 +67,257 @@ def test_pitches_to_stream(pitches_stream, sequence):
 def test_durations_to_stream(durations_stream, sequence):
     result = tools.durations_to_stream(sequence)
     assert list(result.flat.notes) == list(durations_stream.flat.notes)
+
+
+def test_append_stream(pitches_stream, durations_stream):
+    result = tools.notes_to_stream(["C4"])
+    tools.append_stream(
+        result, pitches_stream.flat.notes.stream(), durations_stream.flat.notes.stream()
+    )
+    assert [n.offset for n in result.notes] == [0, 1, 2, 3, 4, 5, 6, 8, 12, 13]
+    assert result.highestTime == 13.5
+    assert result.isSorted
+
+
+def test_merge_streams(pitches_stream, durations_stream):
+    result = tools.merge_streams(pitches_stream, durations_stream)
+    assert [s.offset for s in result] == [0, 0]
+    assert result.highestTime == 7.5
+
+
+def test_stream_builder():
+    builder = tools.StreamBuilder()
+    builder.append(note.Note("C4", quarterLength=2))
+    builder.insert(1, note.Note("D4"))
+    builder.append(note.Note("E4"))
+    assert builder.highest_time == 3
+    result = builder.commit()
+    assert [(n.offset, n.name) for n in result.notes] == [(0, "C"), (1, "D"), (2, "E")]
+    assert result.highestTime == 3
+
+
+def test_stream_builder_many_streams():
+    streams = [tools.notes_to_stream(["C4", "D4"]) for _ in range(1000)]
+    result = tools.notes_to_stream(["B3"])
+    tools.append_stream(result, *streams)
+    assert len(result) == 2001
+    assert result.notes[-1].offset == 2000
+
+
+def test_notes_to_stream_clones_are_independent():
+    first = tools.notes_to_stream([61, "E-4"])
+    first.notes[0].pitch.accidental = "flat"
+    first.notes[0].pitch.octave = 5
+    first.notes[1].pitch.accidental.displayStatus = True
+    second = tools.notes_to_stream([61, "E-4"])
+    assert [p.nameWithOctave for p in second.pitches] == ["C#4", "E-4"]
+    assert second.notes[1].pitch.accidental.displayStatus is None
+
+
+def test_notes_to_stream_numeric_sequences():
+    assert [p.nameWithOctave for p in tools.notes_to_stream([60, 61, 62]).pitches] == [
+        "C4", "C#4", "D4"
+    ]
+    assert [p.nameWithOctave for p in tools.notes_to_stream([60.0, 63.5]).pitches] == [
+        "C4", "E`4"
+    ]
+    assert tools.notes_to_stream([60, 61]).pitches[0].accidental is None
+
+
+def test_factories_accept_iterators():
+    result = tools.notes_to_stream(x for x in [60, 62, 64])
+    assert [p.nameWithOctave for p in result.pitches] == ["C4", "D4", "E4"]
+    result = tools.notes_to_stream(iter(["C4", 62]))
+    assert [p.nameWithOctave for p in result.pitches] == ["C4", "D4"]
+    assert [n.quarterLength for n in tools.durations_to_stream(iter([1, 2])).notes] == [1, 2]
+
+
+def test_durations_to_stream_tuplets():
+    result = tools.durations_to_stream([1 / 3, 1 / 3, 1 / 3, 1])
+    assert [n.offset for n in result.notes] == [0, Fraction(1, 3), Fraction(2, 3), 1]
+    result.notes[0].duration.tuplets[0].type = "start"
+    again = tools.durations_to_stream([1 / 3])
+    assert again.notes[0].duration.tuplets[0].type is None
+
+
+def test_note_index(durations_stream):
+    index = tools.NoteIndex(durations_stream)
+    assert len(index) == 4
+    assert list(index.offsets) == [0, 2, 6, 7]
+    assert list(index.durations) == [2, 4, 1, 0.5]
+    assert index[1] is list(durations_stream.flat.notes)[1]
+
+
+def test_note_index_cache(durations_stream):
+    index = tools.note_index(durations_stream)
+    assert tools.note_index(durations_stream) is index
+    assert tools.note_index(index) is index
+    durations_stream.flat.notes[0].duration.quarterLength = 1
+    new_index = tools.note_index(durations_stream)
+    assert new_index is not index
+    assert list(new_index.durations) == [1, 4, 1, 0.5]
+
+
+def test_ticks_per_quarter():
+    assert tools.ticks_per_quarter([1, 2, 0.5]) == 2
+    assert tools.ticks_per_quarter([Fraction(1, 3), 0.25, Fraction(2, 5)]) == 60
+    assert tools.ticks_per_quarter([]) == 1
+
+
+def test_stream_builder_ticks():
+    builder = tools.StreamBuilder(ppq=12)
+    for quarter_length in [Fraction(1, 3), 0.25, Fraction(2, 3), 0.75]:
+        builder.append(note.Note(quarterLength=quarter_length))
+    assert builder.highest_time == 2
+    result = builder.commit()
+    assert [n.offset for n in result.notes] == [0, Fraction(1, 3), Fraction(7, 12), 1.25]
+
+
+def test_stream_builder_ticks_resolution():
+    builder = tools.StreamBuilder(ppq=4)
+    with pytest.raises(ValueError):
+        builder.append(note.Note(quarterLength=Fraction(1, 3)))
+
+
+def _measure_contents(part):
+    return [
+        [(n.name, n.duration.quarterLength, n.tie.type if n.tie else None) for n in m.notes]
+        for m in part.getElementsByClass("Measure")
+    ]
+
+
+def test_bar():
+    s = tools.durations_to_stream([2, 2, 5, 1])
+    result = tools.bar(s, "3/4")
+    assert _measure_contents(result) == [
+        [("C", 2, None), ("C", 1, "start")],
+        [("C", 1, "stop"), ("C", 2, "start")],
+        [("C", 3, "stop")],
+        [("C", 1, None)],
+    ]
+    measures = result.getElementsByClass("Measure")
+    assert measures[0].timeSignature.ratioString == "3/4"
+    assert measures[-1].rightBarline.type == "final"
+    # The original stream is left untouched
+    assert [n.duration.quarterLength for n in s.notes] == [2, 2, 5, 1]
+
+
+def test_bar_time_signature_changes():
+    s = tools.durations_to_stream([3, 3, 1, 1])
+    result = tools.bar(s, [(0, "2/4"), (4, "3/4")])
+    measures = result.getElementsByClass("Measure")
+    assert [m.offset for m in measures] == [0, 2, 4, 7]
+    assert [m.timeSignature.ratioString if m.timeSignature else None for m in measures] == [
+        "2/4", None, "3/4", None
+    ]
+    assert _measure_contents(result) == [
+        [("C", 2, "start")],
+        [("C", 1, "stop"), ("C", 1, "start")],
+        [("C", 2, "stop"), ("C", 1, None)],
+        [("C", 1, None)],
+    ]
+
+
+def test_bar_existing_ties():
+    s = converter.parse("tinyNotation: 2/4 c2~ c4 d4").flat.notes.stream()
+    result = tools.bar(s, "3/4")
+    assert _measure_contents(result) == [
+        [("C", 2, "start"), ("C", 1, "stop")],
+        [("D", 1, None)],
+    ]
+
+
+def test_bar_in_place():
+    s = tools.durations_to_stream([3])
+    note_ = s.notes[0]
+    result = tools.bar(s, "2/4", in_place=True)
+    assert result.getElementsByClass("Measure")[0].notes[0] is note_
+    assert note_.duration.quarterLength == 2
+
+
+def test_bar_first_time_signature():
+    with pytest.raises(ValueError):
+        tools.bar(tools.durations_to_stream([1]), [(1, "2/4")])
+
+
+def _score(*parts):
+    score = stream.Score()
+    for notation in parts:
+        part = stream.Part()
+        for element in converter.parse("tinyNotation: " + notation).flat.notesAndRests:
+            part.append(element)
+        score.insert(0, part)
+    return score
+
+
+def test_offset_index():
+    index = tools.OffsetIndex(_score("c4 d e f", "C1", "r2 g2"))
+    assert len(index) == 6
+    assert list(index.parts) == [0, 1, 0, 0, 2, 0]
+    assert [n.nameWithOctave for n in index.sounding_at(0)] == ["C4", "C3"]
+    assert [n.nameWithOctave for n in index.sounding_at(2)] == ["C3", "E4", "G4"]
+    assert index.sounding_at(4) == []
+    assert [n.nameWithOctave for n in index.overlapping(0.5, 2)] == ["C4", "C3", "D4"]
+    assert index.overlapping(1, 1) == []
+    with pytest.raises(ValueError):
+        index.overlapping(2, 1)
+
+
+def test_offset_index_sonorities():
+    score = _score("c4 d8 e8 r4 f4", "C2 G2")
+    sonorities = list(tools.OffsetIndex(score).sonorities())
+    assert [(s.offset, s.quarter_length) for s in sonorities] == [
+        (0, 1), (1, 0.5), (1.5, 0.5), (2, 1), (3, 1)
+    ]
+    assert [len(s.notes) for s in sonorities] == [2, 2, 2, 1, 2]
+    chordified = score.chordify().flat.notes
+    assert [
+        sorted(p.nameWithOctave for n in s.notes for p in n.pitches) for s in sonorities
+    ] == [sorted(p.nameWithOctave for p in c.pitches) for c in chordified]
+
+
+def test_offset_index_note_index(durations_stream):
+    index = tools.OffsetIndex(tools.NoteIndex(durations_stream))
+    assert list(index.ends) == [2, 6, 7, 7.5]
+    assert index.sounding_at(6.5) == [index.notes[2]]
+
+
+def test_offset_index_triplets():
+    triplets = tools.durations_to_stream([Fraction(1, 3)] * 12)
+    for source in (triplets, tools.NoteIndex(triplets)):
+        index = tools.OffsetIndex(source)
+        for position in range(12):
+            offset = Fraction(position, 3)
+            assert index.sounding_at(offset) == [index.notes[position]]
+            assert index.sounding_at(float(offset)) == [index.notes[position]]
+        assert list(index.indices_overlapping(Fraction(8, 3), 3)) == [8]
+        assert list(index.indices_overlapping(2.5, 2.75)) == [7, 8]
+        sonorities = list(index.sonorities())
+        assert [s.offset for s in sonorities] == [Fraction(i, 3) for i in range(12)]
+        assert all(s.quarter_length == Fraction(1, 3) for s in sonorities)
+
+
+def test_offset_index_queries():
+    # Enough notes for several blocks, with long pedal notes
+    rng = random.Random(0)
+    score = stream.Score()
+    for _ in range(3):
+        part = stream.Part()
+        for _ in range(150):
+            quarter_length = rng.choice([0.25, 0.5, 1, Fraction(1, 3), 8, 0])
+            element = note.Note(rng.randint(40, 80), quarterLength=quarter_length)
+            part.insert(rng.randrange(0, 400) / 4, element)
+        score.insert(0, part)
+    index = tools.OffsetIndex(score)
+    for _ in range(100):
+        start = rng.randrange(0, 420) / 4
+        end = start + rng.choice([0.25, 1, 5])
+        assert list(index.indices_at(start)) == [
+            i for i in range(len(index)) if index.offsets[i] <= start < index.ends[i]
+        ]
+        assert list(index.indices_overlapping(start, end)) == [
+            i
+            for i in range(len(index))
+            if index.offsets[i] < end
+            and (index.ends[i] > start or start <= index.offsets[i] == index.ends[i])
+        ]
@@ -1,7 +1,18 @@
+import concurrent.futures
+import functools
+import random
+import sys
+
 import pytest
+from arvo import io
+from arvo import testing
+from arvo import tintinnabuli
 from arvo import transformations
 from arvo import scales
 from music21 import converter
+from music21 import meter
+from music21 import pitch
+from music21 import scale
 
 
 @pytest.fixture
@@ -41,6 +52,14 @@ def test_scalar_transposition_different_scales(major_scale):
     assert list(result.flat.notes) == list(intended_result.flat.notes)
 
 
+def test_scalar_transposition_interval_scale(major_scale):
+    result = transformations.scalar_transposition(
+        major_scale, 2, reference_scale=scales.IntervalScale(["M2", "M2", "m3", "M2"], "C")
+    )
+    intended_result = converter.parse("tinyNotation: E G A A c d d e")
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
 def test_scalar_transposition_in_place(major_scale):
     transformations.scalar_transposition(major_scale, 1, in_place=True)
     intended_result = converter.parse("tinyNotation: C# E- F F# A- B- c c#")
@@ -64,6 +83,14 @@ def test_scalar_inversion_reference_scale(pentatonic_scale):
     assert list(result.flat.notes) == list(intended_result.flat.notes)
 
 
+def test_scalar_inversion_interval_scale(major_scale):
+    result = transformations.scalar_inversion(
+        major_scale, "C3", reference_scale=scales.IntervalScale([2, 2, 1, 2, 2, 2], "C")
+    )
+    intended_result = converter.parse("tinyNotation: C BB AA GG FF EE DD CC")
+    assert list(result.flat.notes) == list(intended_result.flat.notes)
+
+
 def test_octave_shift(pentatonic_scale):
     result = transformations.octave_shift(pentatonic_scale, 1)
     intended_result = converter.parse("tinyNotation: c d e g a c'")
@@ -89,3 +116,136 @@ def test_retrograde_in_place(major_scale):
     transformations.retrograde(major_scale, in_place=True)
     intended_result = converter.parse("tinyNotation: c B A G F E D C")
     assert list(major_scale.flat.notes) == list(intended_result.flat.notes)
+
+
+# Variations Tests
+
+
+def test_variations():
+    melody = converter.parse("tinyNotation: 4/4 a4 b- c'# d' r e'2 f'4 <a c' e'>2")
+    reference_scale = scale.ConcreteScale(pitches=["A4", "B-4", "C#5", "D5", "E5", "F5", "G5"])
+    variations = transformations.variations(
+        melody,
+        [
+            functools.partial(
+                transformations.scalar_transposition, steps=steps, reference_scale=reference_scale
+            )
+            for steps in (0, -2, -4)
+        ]
+        + [lambda events: transformations.octave_shift(events, 1)],
+    )
+    assert len(variations[0].rows) == 0
+    assert variations[1].base_events is variations[2].base_events
+    for variation, expected in zip(
+        variations,
+        [
+            melody,
+            transformations.scalar_transposition(melody, -2, reference_scale),
+            transformations.scalar_transposition(melody, -4, reference_scale),
+            transformations.octave_shift(melody, 1),
+        ],
+    ):
+        result = variation.to_stream()
+        assert testing.summarize(result) == testing.summarize(expected)
+        assert testing.summarize(variation.events) == testing.summarize(expected)
+        # Other elements of the base are kept
+        assert len(result.flat.getElementsByClass(meter.TimeSignature)) == 1
+    # The base is unchanged
+    assert [p.nameWithOctave for p in melody.pitches][:2] == ["A4", "B-4"]
+
+
+def test_variations_partial_changes():
+    melody = converter.parse("tinyNotation: C D E F G A B c")
+    variation = transformations.variations(
+        melody,
+        [
+            lambda events: events.map_pitches(
+                lambda pitch_: setattr(pitch_, "octave", 4) if pitch_.step == "E" else None
+            )
+        ],
+    )[0]
+    assert variation.rows.tolist() == [2]
+    assert [p.nameWithOctave for p in variation.to_stream().pitches] == [
+        "C3", "D3", "E4", "F3", "G3", "A3", "B3", "C4"
+    ]
+
+
+def test_variations_stream_transforms():
+    melody = converter.parse("tinyNotation: a4 b- c'# d'")
+    (variation,) = transformations.variations(
+        io.EventTable.from_stream(melody),
+        [lambda events: tintinnabuli.create_t_voice(events.to_stream(), ["A", "C", "E"])],
+    )
+    assert testing.summarize(variation.to_stream()) == testing.summarize(
+        tintinnabuli.create_t_voice(melody, ["A", "C", "E"])
+    )
+
+
+def test_variations_rhythm_changes():
+    melody = converter.parse("tinyNotation: C4 D8 E2")
+    with pytest.raises(ValueError):
+        transformations.variations(melody, [transformations.retrograde])
+
+
+# Thread Safety Tests
+
+
+def _concurrent_jobs():
+    # Shared scales, with streams of their own pitches so that inversions stay in scale space
+    rng = random.Random(0)
+    reference_scales = [
+        None,
+        scale.MajorScale("D"),
+        scale.ConcreteScale(pitches=["A4", "B-4", "C#5", "D5", "E5", "F5", "G5"]),
+        scales.PentatonicScale("E", 2),
+        scales.IntervalScale([2, 1, 2, 2, 1, 3], "F#"),
+    ]
+    jobs = []
+    for index in range(40):
+        reference_scale = reference_scales[index % len(reference_scales)]
+        pitches = (reference_scale or scale.ChromaticScale("C")).getPitches("C3", "C5")
+        original_stream = testing.random_stream(rng, max_length=12, pitches=pitches)
+        jobs.append((original_stream, rng.randint(-7, 7), rng.choice(pitches), reference_scale))
+    return jobs
+
+
+def _run_job(job):
+    original_stream, steps, axis, reference_scale = job
+    return [
+        testing.summarize(result)
+        for result in (
+            transformations.scalar_transposition(original_stream, steps, reference_scale),
+            transformations.scalar_inversion(original_stream, axis, reference_scale),
+            transformations.scalar_transposition(
+                io.EventTable.from_stream(original_stream), -steps, reference_scale
+            ),
+        )
+    ]
+
+
+def test_scale_changed_between_calls():
+    original = converter.parse("tinyNotation: c d e f").flat.notes.stream()
+    reference_scale = scale.MajorScale("C")
+    first = transformations.scalar_transposition(original, 1, reference_scale)
+    assert [p.nameWithOctave for p in first.pitches] == ["D4", "E4", "F4", "G4"]
+    reference_scale.tonic = pitch.Pitch("D")
+    second = transformations.scalar_transposition(original, 1, reference_scale)
+    expected = transformations.scalar_transposition(original, 1, scale.MajorScale("D"))
+    assert [p.nameWithOctave for p in second.pitches] == [
+        p.nameWithOctave for p in expected.pitches
+    ]
+    assert [p.nameWithOctave for p in second.pitches] != ["D4", "E4", "F4", "G4"]
+
+
+def test_concurrent_transformations():
+    jobs = _concurrent_jobs()
+    expected = [_run_job(job) for job in _concurrent_jobs()]
+    switch_interval = sys.getswitchinterval()
+    # Switching threads often makes interleavings more likely
+    sys.setswitchinterval(1e-4)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(_run_job, jobs + jobs))
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert results == expected + expected